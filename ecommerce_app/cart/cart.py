@@ -1,29 +1,84 @@
-"""Session-based cart helper.
+"""Cart helper.
 
-Cart data is stored in the session and cleared when the session ends.
+Cart data is kept by a storage backend (see :mod:`cart.storage`): rows
+in the database for signed-in users, the session for everyone else.
+Each line is stored compactly as ``{product id: [quantity, price in
+cents]}``; the price is the snapshot taken when the product was added.
+Lines are materialised with their products once per request and the
+result is reused until the cart changes.
 """
 from decimal import Decimal
-from copy import deepcopy
 from product.models import Product
+from .storage import get_cart_storage
+
+# Item count kept in the session for the header badge, so rendering it
+# never loads the cart
+CART_COUNT_SESSION_KEY = 'cart_count'
+
+
+def to_cents(price):
+    """Convert a Decimal price to whole cents.
+
+    :param price: Decimal amount with at most two decimal places.
+    :return: Integer number of cents.
+    """
+    return int(price.scaleb(2).to_integral_value())
+
+
+def from_cents(cents):
+    """Convert whole cents to a Decimal amount with two decimal places.
+
+    :param cents: Integer number of cents.
+    :return: Decimal amount.
+    """
+    return Decimal(cents).scaleb(-2)
+
+
+def _compact(cart):
+    """Convert a cart stored in the old dict-per-line format.
+
+    :param cart: Session cart, in either format.
+    :return: Cart in the ``[quantity, cents]`` format.
+    """
+    return {
+        product_id: (
+            [item['quantity'], to_cents(Decimal(item['price']))]
+            if isinstance(item, dict) else item
+        )
+        for product_id, item in cart.items()
+    }
 
 
 class Cart:
-    """Session-backed shopping cart.
+    """Shopping cart backed by a pluggable storage.
 
-    :param request: Django HttpRequest used to access the session.
+    :param request: Django HttpRequest used to pick the storage.
     """
 
     def __init__(self, request):
         """Initialise the cart.
 
-        :param request: Django HttpRequest object to access session.
+        :param request: Django HttpRequest used to pick the storage.
         """
         self.session = request.session
-        cart = self.session.get('cart')
-        if not cart:
-            # Save an empty cart in the session
-            cart = self.session['cart'] = {}
+        self.storage = get_cart_storage(request)
+        cart = self.storage.load()
+        if any(isinstance(item, dict) for item in cart.values()):
+            cart = _compact(cart)
+            self.storage.save_lines(cart)
         self.cart = cart
+        # Database storage loads the products together with the lines,
+        # leaving out deleted ones
+        self._products = dict(self.storage.products or {})
+        self._loaded = set(self._products)
+        if self.storage.products is not None:
+            self._loaded |= {int(product_id) for product_id in cart}
+        self._lines = None
+        self._total_cents = None
+        if self.session.get(CART_COUNT_SESSION_KEY, 0) != len(self):
+            # Changed elsewhere, e.g. in another browser, or a product
+            # in the cart was deleted
+            self.session[CART_COUNT_SESSION_KEY] = len(self)
 
     def add(self, product, quantity=1, update_quantity=False):
         """Add a product or update its quantity.
@@ -32,68 +87,195 @@ class Cart:
         :param quantity: Quantity to add or set.
         :param update_quantity: When True, replace quantity instead of add.
         """
+        self._remember(product)
         product_id = str(product.prod_id)
-        if product_id not in self.cart:
-            self.cart[product_id] = {
-                'quantity': 0,
-                'price': str(product.price)
-            }
+        line = self.cart.setdefault(product_id, [0, to_cents(product.price)])
         if update_quantity:
-            self.cart[product_id]['quantity'] = quantity
+            line[0] = quantity
         else:
-            self.cart[product_id]['quantity'] += quantity
+            line[0] += quantity
+        self.storage.save_lines({product_id: line})
         self.save()
 
+    def _remember(self, product):
+        """Keep a product the caller already loaded, saving a query.
+
+        :param product: Product instance being put in the cart.
+        """
+        self._products[product.prod_id] = product
+        self._loaded.add(product.prod_id)
+
     def save(self):
-        """Mark the session as modified so it gets saved."""
-        self.session.modified = True
+        """Forget materialised lines and totals after a change."""
+        self._lines = None
+        self._total_cents = None
+        self.session[CART_COUNT_SESSION_KEY] = len(self)
 
-    def remove(self, product):
+    def remove(self, product_id):
         """Remove a product from the cart.
 
-        :param product: Product instance to remove.
+        Works for products that were deleted since they were added.
+
+        :param product_id: Primary key of the product to remove.
         """
-        product_id = str(product.prod_id)
+        product_id = str(product_id)
         if product_id in self.cart:
             del self.cart[product_id]
+            self.storage.delete_lines([product_id])
             self.save()
 
+    def update_prices(self, products):
+        """Replace the stored price snapshot with current prices.
+
+        :param products: Product instances whose prices changed.
+        """
+        changed = {}
+        for product in products:
+            product_id = str(product.prod_id)
+            line = self.cart.get(product_id)
+            if line is not None:
+                line[1] = to_cents(product.price)
+                changed[product_id] = line
+        self.storage.save_lines(changed)
+        self.save()
+
+    def discard(self, product_ids):
+        """Drop entries whose products no longer exist.
+
+        :param product_ids: Primary keys of the products to drop.
+        """
+        for product_id in product_ids:
+            self.cart.pop(str(product_id), None)
+        self.storage.delete_lines(product_ids)
+        self.save()
+
+    def set_quantities(self, quantities, products):
+        """Set the quantity of several lines at once.
+
+        Lines set to zero are removed; new lines take the product's
+        current price. All changes are written with one save and one
+        delete at most.
+
+        :param quantities: Dict of product id to new quantity.
+        :param products: Dict of Product instances by primary key,
+            covering every product id in ``quantities``.
+        """
+        changed = {}
+        removed = []
+        for product_id, quantity in quantities.items():
+            key = str(product_id)
+            if quantity > 0:
+                product = products[int(product_id)]
+                self._remember(product)
+                line = self.cart.setdefault(
+                    key, [0, to_cents(product.price)]
+                )
+                line[0] = quantity
+                changed[key] = line
+            elif self.cart.pop(key, None) is not None:
+                removed.append(key)
+        self.storage.save_lines(changed)
+        if removed:
+            self.storage.delete_lines(removed)
+        self.save()
+
+    def line(self, product):
+        """Describe the cart line of one product.
+
+        :param product: Product instance.
+        :return: Dict like the items of :attr:`lines`, or None if the
+            product is not in the cart.
+        """
+        entry = self.cart.get(str(product.prod_id))
+        if entry is None:
+            return None
+        quantity, cents = entry
+        return {
+            'product': product,
+            'quantity': quantity,
+            'price': from_cents(cents),
+            'total_price': from_cents(cents * quantity),
+        }
+
+    def items(self):
+        """Iterate over the raw cart lines.
+
+        :return: Iterator of (product id, quantity, price in cents).
+        """
+        for product_id, (quantity, cents) in self.cart.items():
+            yield int(product_id), quantity, cents
+
+    def products(self):
+        """Load the products in the cart, once per request.
+
+        Products of lines added after the first load are fetched on the
+        next call; products already loaded are never fetched again.
+
+        :return: Dict of Product instances by primary key.
+        """
+        wanted = {int(product_id) for product_id in self.cart}
+        pending = wanted - self._loaded
+        if pending:
+            self._products.update(Product.objects.in_bulk(list(pending)))
+            self._loaded |= pending
+        return self._products
+
+    @property
+    def lines(self):
+        """Cart lines with their products, built once until a change.
+
+        Lines whose product was deleted are left out.
+
+        :return: List of dicts with product, quantity, price and
+            total_price.
+        """
+        if self._lines is None:
+            products = self.products()
+            self._lines = [
+                self.line(products[product_id])
+                for product_id, _, _ in self.items()
+                if product_id in products
+            ]
+        return self._lines
+
     def __iter__(self):
         """Iterate over cart items with attached Product objects.
 
         :return: An iterator of cart item dictionaries.
         """
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(prod_id__in=product_ids)
-        # Use deepcopy to avoid modifying session data with Decimal objects
-        cart = deepcopy(self.cart)
+        return iter(self.lines)
 
-        for product in products:
-            cart[str(product.prod_id)]['product'] = product
+    def _live_entries(self):
+        """List the raw lines whose product still exists.
 
-        for item in cart.values():
-            item['price'] = Decimal(item['price'])
-            item['total_price'] = item['price'] * item['quantity']
-            yield item
+        :return: List of [quantity, price in cents].
+        """
+        products = self.products()
+        return [
+            entry for product_id, entry in self.cart.items()
+            if int(product_id) in products
+        ]
 
     def __len__(self):
-        """Count all items in the cart.
+        """Count the items in the cart, as listed by :attr:`lines`.
 
-        :return: Total quantity of items.
+        :return: Total quantity of items of existing products.
         """
-        return sum(item['quantity'] for item in self.cart.values())
+        return sum(quantity for quantity, _ in self._live_entries())
 
     def get_total_price(self):
-        """Calculate the total price of all items in the cart.
+        """Calculate the total price of the items in :attr:`lines`.
 
         :return: Total price as a Decimal.
         """
-        return sum(
-            Decimal(item['price']) * item['quantity']
-            for item in self.cart.values()
-        )
+        if self._total_cents is None:
+            self._total_cents = sum(
+                quantity * cents for quantity, cents in self._live_entries()
+            )
+        return from_cents(self._total_cents)
 
     def clear(self):
-        """Remove cart from session."""
-        del self.session['cart']
+        """Remove every line from the cart."""
+        self.storage.clear()
+        self.cart = {}
         self.save()
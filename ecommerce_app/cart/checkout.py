@@ -0,0 +1,198 @@
+'''Checkout pipeline
+Includes:
+- Loading every product in the cart with one query
+- Re-checking current prices against the prices stored in the cart
+- Reserving stock, then writing the order, its lines, the buyer's
+  purchases, the daily sales rollups and the confirmation email in one
+  transaction
+'''
+from collections import namedtuple
+
+from django.db import IntegrityError, transaction
+
+from outbox.mail import queue_mail
+from product.models import Product
+from product.stock import reserve_stock
+from sales.rollups import record_order
+from .cart import to_cents
+from .models import Order, OrderItem
+from .purchases import record_purchases
+
+CheckoutLine = namedtuple('CheckoutLine', 'product quantity price')
+
+
+class CheckoutError(Exception):
+    """Raised when a cart cannot be turned into an order."""
+
+
+class ProductsUnavailable(CheckoutError):
+    """Raised when products in the cart no longer exist.
+
+    :param product_ids: Primary keys of the missing products.
+    """
+
+    def __init__(self, product_ids):
+        super().__init__('Some products in your cart are no longer sold.')
+        self.product_ids = product_ids
+
+
+class PricesChanged(CheckoutError):
+    """Raised when a product's price changed since it was added.
+
+    :param lines: CheckoutLine tuples carrying the current prices.
+    """
+
+    def __init__(self, lines):
+        super().__init__('Some prices changed since you added the items.')
+        self.lines = lines
+
+
+class OutOfStock(CheckoutError):
+    """Raised when a product has fewer units left than ordered.
+
+    :param shortages: List of (CheckoutLine, units available) tuples.
+    """
+
+    def __init__(self, shortages):
+        super().__init__('Some products do not have enough stock.')
+        self.shortages = shortages
+
+
+class _Shortage(Exception):
+    """Rolls back a checkout whose stock reservation failed."""
+
+
+def load_lines(cart):
+    """Resolve cart entries into checkout lines with one product query.
+
+    :param cart: Cart of the buyer.
+    :return: List of CheckoutLine tuples in cart order.
+    :raises ProductsUnavailable: If a product was deleted.
+    :raises PricesChanged: If a current price differs from the snapshot.
+    """
+    products = cart.products()
+    missing = [pid for pid, _, _ in cart.items() if pid not in products]
+    if missing:
+        raise ProductsUnavailable(missing)
+
+    lines = []
+    changed = []
+    for pid, quantity, cents in cart.items():
+        product = products[pid]
+        line = CheckoutLine(product, quantity, product.price)
+        lines.append(line)
+        if cents != to_cents(product.price):
+            changed.append(line)
+    if changed:
+        raise PricesChanged(changed)
+    return lines
+
+
+def _shortages(lines, tracked):
+    """Find the lines that could not be reserved, after the rollback.
+
+    :param lines: CheckoutLine tuples of the failed order.
+    :param tracked: Dict of product id to units wanted.
+    :return: List of (CheckoutLine, units available) tuples.
+    """
+    available = dict(
+        Product.objects.filter(prod_id__in=list(tracked))
+        .values_list('prod_id', 'stock')
+    )
+    shortages = []
+    for line in lines:
+        product_id = line.product.prod_id
+        if product_id not in tracked:
+            continue
+        stock = available.get(product_id, 0)
+        if stock is not None and stock < line.quantity:
+            shortages.append((line, stock))
+    return shortages
+
+
+def place_order(user, lines):
+    """Reserve stock and write an order, its lines and its confirmation.
+
+    Everything happens in one transaction: stock of all tracked products
+    is taken with a single conditional UPDATE first, and a shortage on
+    any line rolls the whole order back. The products are recorded as the
+    buyer's purchases, the order is added to the daily sales rollups and
+    its confirmation email is queued in the outbox in the same
+    transaction, so the email is sent exactly when the order exists and
+    the mail server is never contacted during checkout.
+
+    :param user: Buyer placing the order.
+    :param lines: CheckoutLine tuples from :func:`load_lines`.
+    :return: The saved Order.
+    :raises OutOfStock: If a product does not have enough stock left.
+    :raises ProductsUnavailable: If a product was deleted meanwhile.
+    """
+    total = sum(line.price * line.quantity for line in lines)
+    tracked = {
+        line.product.prod_id: line.quantity
+        for line in lines if line.product.stock is not None
+    }
+    try:
+        with transaction.atomic():
+            if not reserve_stock(tracked):
+                raise _Shortage
+            order = Order.objects.create(
+                user=user, total_amount=total, status='completed'
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=line.product,
+                    quantity=line.quantity,
+                    price=line.price,
+                )
+                for line in lines
+            ])
+            record_order(order)
+            record_purchases(user.pk, [line.product.prod_id for line in lines])
+            subject, body = confirmation_email(user, order, lines)
+            queue_mail(subject, body, [user.email])
+    except _Shortage:
+        raise OutOfStock(_shortages(lines, tracked))
+    except IntegrityError:
+        raise ProductsUnavailable([])
+    return order
+
+
+def confirmation_email(user, order, lines):
+    """Build the subject and body of the order confirmation email.
+
+    :param user: Buyer who placed the order.
+    :param order: The saved Order.
+    :param lines: CheckoutLine tuples of the order.
+    :return: Tuple (subject, body).
+    """
+    subject = f'Order Confirmation - {user.username}'
+    body = f'''Hello {user.first_name} {user.last_name},
+
+Thank you for your order! Here is your order summary:
+
+ORDER DETAILS:
+-------------
+'''
+    for line in lines:
+        body += f'''
+Product: {line.product.name}
+Description: {line.product.description}
+Price: ${line.price:.2f}
+Quantity: {line.quantity}
+Subtotal: ${line.price * line.quantity:.2f}
+-------------
+'''
+    body += f'''
+
+TOTAL: ${order.total_amount:.2f}
+
+Your order has been received and will be processed shortly.
+
+Thank you for shopping with us!
+
+Best regards,
+eCommerce Team
+'''
+    return subject, body
@@ -0,0 +1,18 @@
+'''Template context for the cart.'''
+
+from .cart import CART_COUNT_SESSION_KEY
+
+
+def cart_count(request):
+    """Expose the cart's item count for the header badge.
+
+    The count is kept in the session by :class:`cart.cart.Cart`, so the
+    badge never loads the cart or its products.
+
+    :param request: Django HttpRequest.
+    :return: Dict with ``cart_count``.
+    """
+    session = getattr(request, 'session', None)
+    if session is None:
+        return {'cart_count': 0}
+    return {'cart_count': session.get(CART_COUNT_SESSION_KEY, 0)}
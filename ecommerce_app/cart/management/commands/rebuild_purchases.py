@@ -0,0 +1,33 @@
+'''Management command to recompute which users bought which products.
+
+Checkout and order status changes keep the purchases current; run this
+after imports or raw SQL changes to orders that bypass them.
+'''
+
+from django.core.management.base import BaseCommand
+
+from cart.purchases import REBUILD_CHUNK_SIZE, rebuild_purchases
+
+
+class Command(BaseCommand):
+    help = 'Recompute the verified-purchase table from completed orders.'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        :param parser: Argument parser for the command.
+        """
+        parser.add_argument(
+            '--chunk-size', type=int, default=REBUILD_CHUNK_SIZE,
+            help='Number of users checked per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        """Compare every user's purchases with their orders and fix drift.
+
+        :return: None.
+        """
+        checked, fixed = rebuild_purchases(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} users, corrected {fixed} purchases.'
+        ))
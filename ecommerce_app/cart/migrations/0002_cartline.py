@@ -0,0 +1,47 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Store the carts of signed-in users as one row per line."""
+
+    dependencies = [
+        ('cart', '0001_initial'),
+        ('product', '0004_product_price_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartLine',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('price_cents', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='+',
+                    to='product.product',
+                )),
+                ('user', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='cart_lines',
+                    to=settings.AUTH_USER_MODEL,
+                )),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('user', 'product'),
+                        name='cartline_user_product_uniq',
+                    ),
+                ],
+            },
+        ),
+    ]
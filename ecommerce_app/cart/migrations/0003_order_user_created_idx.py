@@ -0,0 +1,22 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Index orders by user and date for the order history API."""
+
+    dependencies = [
+        ('cart', '0002_cartline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(
+                fields=['user', 'created_at'],
+                name='order_user_created_idx'),
+        ),
+    ]
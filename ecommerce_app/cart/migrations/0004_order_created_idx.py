@@ -0,0 +1,21 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Index orders by date for rebuilding the daily sales rollups."""
+
+    dependencies = [
+        ('cart', '0003_order_user_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(
+                fields=['created_at'], name='order_created_idx'),
+        ),
+    ]
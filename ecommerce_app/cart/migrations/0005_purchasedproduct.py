@@ -0,0 +1,68 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_purchases(apps, schema_editor):
+    """Record the products bought in completed orders placed so far.
+
+    :param apps: Historical app registry.
+    :param schema_editor: Schema editor in use.
+    """
+    OrderItem = apps.get_model('cart', 'OrderItem')
+    PurchasedProduct = apps.get_model('cart', 'PurchasedProduct')
+    pairs = (
+        OrderItem.objects.filter(order__status='completed')
+        .order_by()
+        .values_list('order__user_id', 'product_id')
+        .distinct()
+    )
+    batch = []
+    for user_id, product_id in pairs.iterator():
+        batch.append(PurchasedProduct(user_id=user_id, product_id=product_id))
+        if len(batch) >= 1000:
+            PurchasedProduct.objects.bulk_create(batch)
+            batch = []
+    PurchasedProduct.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    """Keep one row per user and product bought in a completed order."""
+
+    dependencies = [
+        ('cart', '0004_order_created_idx'),
+        ('product', '0005_product_stock'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchasedProduct',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name='ID')),
+                ('product', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='+',
+                    to='product.product',
+                )),
+                ('user', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='purchased_products',
+                    to=settings.AUTH_USER_MODEL,
+                )),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('user', 'product'),
+                        name='purchase_user_product_uniq',
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_purchases, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 '''Cart models - Order tracking for purchase verification
-Cart is stored in session and will be cleared when session ends.
-Orders are tracked in database for purchase verification in reviews.
+Signed-in buyers keep their cart as CartLine rows; anonymous carts are
+stored in the session and cleared when the session ends.
+Orders are tracked in database; PurchasedProduct keeps one row per user
+and product bought in a completed order, for verifying reviews.
 '''
 from django.db import models
 from django.conf import settings
@@ -37,8 +39,30 @@ class Order(models.Model):
         """
         return f'Order {self.order_id} by {self.user.username}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded status so a change can be detected on save.
+
+        :param db: Database alias the row was loaded from.
+        :param field_names: Names of the loaded fields.
+        :param values: Loaded values, in field order.
+        :return: Order instance.
+        """
+        order = super().from_db(db, field_names, values)
+        if 'status' in field_names:
+            order._loaded_status = order.status
+        return order
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Order history: one user's orders, newest first
+            models.Index(
+                fields=['user', 'created_at'], name='order_user_created_idx'
+            ),
+            # Sales rollup rebuilds: all orders of one day
+            models.Index(fields=['created_at'], name='order_created_idx'),
+        ]
 
 
 class OrderItem(models.Model):
@@ -70,6 +94,68 @@ class OrderItem(models.Model):
         return self.quantity * self.price
 
 
+class CartLine(models.Model):
+    """One product in a signed-in user's stored cart"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='cart_lines'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    quantity = models.PositiveIntegerField()
+    # Price snapshot taken when the product was added, in whole cents
+    price_cents = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """Return a readable label for the cart line.
+
+        :return: Human-readable cart line label.
+        """
+        return f'{self.quantity}x product {self.product_id}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'product'],
+                name='cartline_user_product_uniq',
+            ),
+        ]
+
+
+class PurchasedProduct(models.Model):
+    """A product the user received in at least one completed order"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='purchased_products'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+
+    def __str__(self):
+        """Return a readable label for the purchase.
+
+        :return: Human-readable purchase label.
+        """
+        return f'User {self.user_id} bought product {self.product_id}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'product'],
+                name='purchase_user_product_uniq',
+            ),
+        ]
+
+
 class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
@@ -80,3 +166,19 @@ class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = ['id', 'order', 'product', 'quantity', 'price']
+
+
+class OrderLineSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name')
+
+    class Meta:
+        model = OrderItem
+        fields = ['product', 'product_name', 'quantity', 'price']
+
+
+class OrderHistorySerializer(serializers.ModelSerializer):
+    items = OrderLineSerializer(many=True)
+
+    class Meta:
+        model = Order
+        fields = ['order_id', 'created_at', 'total_amount', 'status', 'items']
@@ -0,0 +1,158 @@
+'''Which users bought which products, for verified-purchase reviews.
+Includes:
+- Recording the products of a completed order
+- Re-syncing a user's purchases after an order changes status or is
+  deleted
+- Checking one or many (user, product) pairs with a single query
+- Rebuilding the whole table from the order history
+
+PurchasedProduct holds one row per user and product bought in at least
+one completed order, so checks never join through the order tables.
+'''
+
+from django.db import transaction
+from django.db.models import Q
+
+from ecommerce_app.pagination import iter_keyset_chunks
+from users.models import User
+from .models import OrderItem, PurchasedProduct
+
+REBUILD_CHUNK_SIZE = 1000
+
+
+def record_purchases(user_id, product_ids):
+    """Remember that a user bought some products.
+
+    :param user_id: Primary key of the buyer.
+    :param product_ids: Primary keys of the products bought.
+    """
+    PurchasedProduct.objects.bulk_create(
+        [
+            PurchasedProduct(user_id=user_id, product_id=product_id)
+            for product_id in set(product_ids)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _completed_pairs(user_ids, product_ids=None):
+    """Read the (user, product) pairs of completed orders.
+
+    :param user_ids: Primary keys of the buyers to look at.
+    :param product_ids: Only these products, or every product when None.
+    :return: Set of (user id, product id) tuples.
+    """
+    items = OrderItem.objects.filter(
+        order__user_id__in=user_ids, order__status='completed'
+    )
+    if product_ids is not None:
+        items = items.filter(product_id__in=product_ids)
+    return set(
+        items.order_by().values_list('order__user_id', 'product_id')
+        .distinct()
+    )
+
+
+def sync_purchases(user_id, product_ids):
+    """Recompute some of a user's purchases from their orders.
+
+    Used when an order is cancelled, completed or deleted: products still
+    bought in another completed order keep their row.
+
+    :param user_id: Primary key of the buyer.
+    :param product_ids: Primary keys of the products of the changed order.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    bought = {
+        product_id
+        for _, product_id in _completed_pairs([user_id], product_ids)
+    }
+    PurchasedProduct.objects.filter(
+        user_id=user_id, product_id__in=product_ids - bought
+    ).delete()
+    record_purchases(user_id, bought)
+
+
+def has_purchased(user, product_id):
+    """Check whether a user bought a product in a completed order.
+
+    :param user: User instance or primary key.
+    :param product_id: Primary key of the product.
+    :return: True if the purchase exists.
+    """
+    return PurchasedProduct.objects.filter(
+        user=user, product_id=product_id
+    ).exists()
+
+
+def _pairs_condition(pairs):
+    """Build a filter matching some (user, product) pairs.
+
+    :param pairs: Iterable of (user id, product id) tuples.
+    :return: Q object with one branch per user, or None without pairs.
+    """
+    by_user = {}
+    for user_id, product_id in pairs:
+        by_user.setdefault(user_id, set()).add(product_id)
+    if not by_user:
+        return None
+    condition = Q()
+    for user_id, product_ids in by_user.items():
+        condition |= Q(user_id=user_id, product_id__in=product_ids)
+    return condition
+
+
+def purchased_pairs(pairs):
+    """Check many (user, product) pairs with one query.
+
+    :param pairs: Iterable of (user id, product id) tuples.
+    :return: Set of the pairs that are verified purchases.
+    """
+    condition = _pairs_condition(pairs)
+    if condition is None:
+        return set()
+    return set(
+        PurchasedProduct.objects.filter(condition)
+        .values_list('user_id', 'product_id')
+    )
+
+
+def rebuild_purchases(chunk_size=REBUILD_CHUNK_SIZE):
+    """Recompute the purchases of every user from the order history.
+
+    Users are processed in primary-key chunks, one transaction each.
+
+    :param chunk_size: Number of users per transaction.
+    :return: Tuple (users checked, rows inserted or deleted).
+    """
+    checked = fixed = 0
+    chunks = iter_keyset_chunks(
+        User.objects.only('pk'), ('pk',), chunk_size
+    )
+    for chunk in chunks:
+        user_ids = [user.pk for user in chunk]
+        with transaction.atomic():
+            bought = _completed_pairs(user_ids)
+            stored = set(
+                PurchasedProduct.objects.select_for_update()
+                .filter(user_id__in=user_ids)
+                .values_list('user_id', 'product_id')
+            )
+            missing = bought - stored
+            stale = stored - bought
+            PurchasedProduct.objects.bulk_create(
+                [
+                    PurchasedProduct(user_id=user_id, product_id=product_id)
+                    for user_id, product_id in missing
+                ],
+                ignore_conflicts=True,
+            )
+            if stale:
+                PurchasedProduct.objects.filter(
+                    _pairs_condition(stale)
+                ).delete()
+        checked += len(user_ids)
+        fixed += len(missing) + len(stale)
+    return checked, fixed
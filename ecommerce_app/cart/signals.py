@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from product.models import Product
+from sales.rollups import record_status_change
+from .cart import CART_COUNT_SESSION_KEY, _compact
+from .models import Order
+from .purchases import sync_purchases
+from .storage import SessionCartStorage, get_cart_storage
+
+
+@receiver(user_logged_in)
+def merge_session_cart(sender, request, user, **kwargs):
+    # Lines put in the cart before signing in join the stored cart, and
+    # the header badge starts from the stored cart's item count
+    if request is None or not hasattr(request, 'user'):
+        return
+    storage = get_cart_storage(request)
+    if isinstance(storage, SessionCartStorage):
+        return
+    stored = storage.load()
+    anonymous = _compact(request.session.pop('cart', None) or {})
+    merged = {}
+    for product_id, (quantity, cents) in anonymous.items():
+        if product_id in stored:
+            # Keep the older price snapshot, add up the quantities
+            current_quantity, cents = stored[product_id]
+            quantity += current_quantity
+        merged[product_id] = [quantity, cents]
+    storage.save_lines(merged)
+    stored.update(merged)
+    # Counted like the cart does, leaving out deleted products
+    live = set(storage.products or {})
+    unknown = {int(product_id) for product_id in stored} - live
+    if unknown:
+        live.update(
+            Product.objects.filter(pk__in=unknown)
+            .values_list('pk', flat=True)
+        )
+    request.session[CART_COUNT_SESSION_KEY] = sum(
+        quantity for product_id, (quantity, _) in stored.items()
+        if int(product_id) in live
+    )
+
+
+@receiver(post_save, sender=Order)
+def order_status_purchases(sender, instance, created, raw=False, **kwargs):
+    # Checkout records the purchases and sales of new orders itself; a
+    # later status change (cancelled, completed again) re-syncs the
+    # order's products and moves it in or out of the sales rollups
+    if raw:
+        return
+    previous = getattr(instance, '_loaded_status', None)
+    instance._loaded_status = instance.status
+    if created or previous == instance.status:
+        return
+    sync_purchases(
+        instance.user_id,
+        instance.items.values_list('product_id', flat=True),
+    )
+    record_status_change(instance, previous)
+
+
+@receiver(pre_delete, sender=Order)
+def order_delete_products(sender, instance, origin=None, **kwargs):
+    # The items are gone by post_delete, so note their products now;
+    # a deleted user takes its purchases with it
+    if getattr(origin, 'model', type(origin)) is get_user_model():
+        return
+    instance._purchased_product_ids = list(
+        instance.items.values_list('product_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Order)
+def order_delete_purchases(sender, instance, **kwargs):
+    product_ids = getattr(instance, '_purchased_product_ids', None)
+    if product_ids:
+        sync_purchases(instance.user_id, product_ids)
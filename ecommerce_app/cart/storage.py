@@ -0,0 +1,141 @@
+'''Storage backends for the cart.
+Includes:
+- SessionCartStorage: the cart lives in the session (anonymous users)
+- DatabaseCartStorage: one CartLine row per product for signed-in users
+- get_cart_storage: pick the backend for a request
+
+A backend loads the cart as ``{product id: [quantity, price in cents]}``
+and is told about each change, so it can write only the lines that
+changed. ``CART_STORAGE`` names the backend used for signed-in users.
+'''
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import CartLine
+
+
+class SessionCartStorage:
+    """Keep the cart in the session under the ``cart`` key.
+
+    :param request: Django HttpRequest whose session holds the cart.
+    """
+
+    #: Products loaded together with the cart, or None
+    products = None
+
+    def __init__(self, request):
+        self.session = request.session
+
+    def load(self):
+        """Return the stored cart.
+
+        :return: Dict of product id to [quantity, price in cents].
+        """
+        return self.session.get('cart') or {}
+
+    def save_lines(self, lines):
+        """Store new or changed lines.
+
+        :param lines: Dict of product id to [quantity, price in cents].
+        """
+        self.session.setdefault('cart', {}).update(lines)
+        self.session.modified = True
+
+    def delete_lines(self, product_ids):
+        """Remove lines from the cart.
+
+        :param product_ids: Product ids of the lines to remove.
+        """
+        cart = self.session.get('cart') or {}
+        for product_id in product_ids:
+            cart.pop(str(product_id), None)
+        self.session.modified = True
+
+    def clear(self):
+        """Remove the whole cart."""
+        self.session.pop('cart', None)
+
+
+class DatabaseCartStorage:
+    """Keep a signed-in user's cart as CartLine rows.
+
+    The cart survives logout and browser restarts, and a change writes
+    only the affected rows instead of the whole cart.
+
+    :param request: Django HttpRequest with an authenticated user.
+    """
+
+    def __init__(self, request):
+        self.user = request.user
+        self.products = {}
+
+    def load(self):
+        """Return the stored cart, loading its products in the same query.
+
+        :return: Dict of product id to [quantity, price in cents].
+        """
+        lines = (
+            CartLine.objects.filter(user=self.user)
+            .select_related('product')
+            .order_by('id')
+        )
+        cart = {}
+        for line in lines:
+            cart[str(line.product_id)] = [line.quantity, line.price_cents]
+            # A deleted product is left for the cart to treat as missing
+            if line.product.deleted_at is None:
+                self.products[line.product_id] = line.product
+        return cart
+
+    def save_lines(self, lines):
+        """Insert or update lines with a single upsert.
+
+        :param lines: Dict of product id to [quantity, price in cents].
+        """
+        if not lines:
+            return
+        # MySQL upserts on any unique key and rejects an explicit target
+        unique_fields = None
+        if connection.features.supports_update_conflicts_with_target:
+            unique_fields = ['user', 'product']
+        now = timezone.now()
+        CartLine.objects.bulk_create(
+            [
+                CartLine(
+                    user=self.user, product_id=int(product_id),
+                    quantity=quantity, price_cents=cents, updated_at=now,
+                )
+                for product_id, (quantity, cents) in lines.items()
+            ],
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=['quantity', 'price_cents', 'updated_at'],
+        )
+
+    def delete_lines(self, product_ids):
+        """Remove lines from the cart.
+
+        :param product_ids: Product ids of the lines to remove.
+        """
+        CartLine.objects.filter(
+            user=self.user,
+            product_id__in=[int(product_id) for product_id in product_ids],
+        ).delete()
+
+    def clear(self):
+        """Remove the whole cart."""
+        CartLine.objects.filter(user=self.user).delete()
+
+
+def get_cart_storage(request):
+    """Pick the cart backend for a request.
+
+    :param request: Django HttpRequest.
+    :return: Storage instance; the session for anonymous users.
+    """
+    if not request.user.is_authenticated:
+        return SessionCartStorage(request)
+    return import_string(settings.CART_STORAGE)(request)
@@ -5,6 +5,7 @@ Including:
 - Update cart item
 - Remove from cart
 - Checkout
+- JSON cart API
 '''
 from django.urls import path
 from . import views
@@ -18,4 +19,24 @@ urlpatterns = [
     path('get/orders', views.view_orders),
     path('get/orders/xml', views.view_orders_xml),
     path('add/order', views.add_order),
+    path(
+        'get/cart', views.cart_summary,
+        name='api_cart_summary'
+    ),
+    path(
+        'add/cart/<int:product_id>', views.cart_add_item,
+        name='api_cart_add'
+    ),
+    path(
+        'update/cart/<int:product_id>', views.cart_update_item,
+        name='api_cart_update'
+    ),
+    path(
+        'remove/cart/<int:product_id>', views.cart_remove_item,
+        name='api_cart_remove'
+    ),
+    path(
+        'set/cart', views.cart_set_items,
+        name='api_cart_set'
+    ),
 ]
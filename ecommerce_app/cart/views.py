@@ -4,25 +4,35 @@ Includes:
 - View cart
 - Update cart item quantity
 - Remove from cart
-- Checkout (send email with cart summary)
+- Checkout (place the order, queue email with order summary)
+- JSON cart API: summary, add, update, remove and set quantities
+- Order history API: the caller's orders with items, cursor-paginated
 '''
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.mail import send_mail
-from django.conf import settings
-from decimal import Decimal
+from product.cache import get_product_or_404
 from product.models import Product
-from .models import Order, OrderItem, OrderSerializer
+from .models import Order, OrderHistorySerializer, OrderItem, OrderSerializer
 from .cart import Cart
+from .checkout import (
+    OutOfStock, PricesChanged, ProductsUnavailable, load_lines, place_order
+)
+from django.conf import settings
+from django.db.models import Prefetch
 from django.http import JsonResponse
+from ecommerce_app.pagination import (
+    InvalidCursor, get_page_size, paginate_keyset, set_page_headers
+)
 from rest_framework.decorators import (
     api_view, renderer_classes, authentication_classes, permission_classes
 )
 from rest_framework.response import Response
 from rest_framework_xml.renderers import XMLRenderer
 from rest_framework import status
-from rest_framework.authentication import BasicAuthentication
+from rest_framework.authentication import (
+    BasicAuthentication, SessionAuthentication
+)
 from rest_framework.permissions import IsAuthenticated
 
 
@@ -53,7 +63,7 @@ def cart_add(request, product_id):
 
     if request.method == 'POST':
         cart = Cart(request)
-        product = get_object_or_404(Product, prod_id=product_id)
+        product = get_product_or_404(product_id)
 
         quantity = _parse_quantity(request.POST.get('quantity', 1))
         if quantity is None or quantity < 1:
@@ -91,9 +101,11 @@ def cart_remove(request, product_id):
     """
     if request.method == 'POST':
         cart = Cart(request)
-        product = get_object_or_404(Product, prod_id=product_id)
-        cart.remove(product)
-        messages.success(request, f'{product.name} removed from cart')
+        # The product may have been deleted since it was added
+        product = cart.products().get(product_id)
+        cart.remove(product_id)
+        name = product.name if product else 'Product'
+        messages.success(request, f'{name} removed from cart')
 
     return redirect('cart_view')
 
@@ -107,20 +119,17 @@ def cart_update(request, product_id):
     :return: Redirect response.
     """
     if request.method == 'POST':
-        cart = Cart(request)
-        product = get_object_or_404(Product, prod_id=product_id)
-
         quantity = _parse_quantity(request.POST.get('quantity', 1))
         if quantity is None or quantity < 0:
             messages.error(request, 'Quantity must be zero or a positive whole number.')
             return redirect('cart_view')
+        if quantity == 0:
+            return cart_remove(request, product_id)
 
-        if quantity > 0:
-            cart.add(product=product, quantity=quantity, update_quantity=True)
-            messages.success(request, f'{product.name} quantity updated')
-        else:
-            cart.remove(product)
-            messages.success(request, f'{product.name} removed from cart')
+        cart = Cart(request)
+        product = get_product_or_404(product_id)
+        cart.add(product=product, quantity=quantity, update_quantity=True)
+        messages.success(request, f'{product.name} quantity updated')
 
     return redirect('cart_view')
 
@@ -139,112 +148,294 @@ def cart_checkout(request):
         return redirect('cart_view')
 
     if request.method == 'POST':
-        # Build email content
-        email_subject = f'Order Confirmation - {request.user.username}'
+        try:
+            # One product query, then one transaction for the order
+            lines = load_lines(cart)
+            order = place_order(request.user, lines)
+        except PricesChanged as exc:
+            cart.update_prices(line.product for line in exc.lines)
+            names = ', '.join(line.product.name for line in exc.lines)
+            messages.warning(
+                request,
+                f'Prices changed for {names}. '
+                'Please review your order and confirm again.'
+            )
+            return redirect('cart_checkout')
+        except OutOfStock as exc:
+            details = ', '.join(
+                f'{line.product.name} ({available} left)'
+                for line, available in exc.shortages
+            ) or 'some products'
+            messages.error(
+                request,
+                f'Not enough stock for {details}. '
+                'Please adjust your cart and try again.'
+            )
+            return redirect('cart_view')
+        except ProductsUnavailable as exc:
+            cart.discard(exc.product_ids)
+            messages.error(
+                request,
+                'Some products in your cart are no longer available '
+                'and were removed.'
+            )
+            return redirect('cart_view')
 
-        email_body = f'''Hello {request.user.first_name} \
-{request.user.last_name},
+        # Clear the cart after successful checkout
+        cart.clear()
 
-Thank you for your order! Here is your order summary:
+        messages.success(
+            request,
+            'Order placed successfully! '
+            'Check your email for confirmation.'
+        )
+        return render(
+            request,
+            'cart/checkout_success.html',
+            {'order': order}
+        )
 
-ORDER DETAILS:
--------------
-'''
+    # GET request - show checkout confirmation page
+    return render(request, 'cart/checkout_confirm.html', {'cart': cart})
 
-        for item in cart:
-            product = item['product']
-            email_body += f'''
-Product: {product.name}
-Description: {product.description}
-Price: ${item['price']:.2f}
-Quantity: {item['quantity']}
-Subtotal: ${item['total_price']:.2f}
--------------
-'''
 
-        total = cart.get_total_price()
-        email_body += f'''
+def _line_data(line):
+    """Serialise one cart line for the JSON cart API.
 
-TOTAL: ${total:.2f}
+    :param line: Line dict from the Cart, or None.
+    :return: Dict of JSON-ready values, or None.
+    """
+    if line is None:
+        return None
+    return {
+        'product': line['product'].prod_id,
+        'name': line['product'].name,
+        'quantity': line['quantity'],
+        'price': str(line['price']),
+        'total_price': str(line['total_price']),
+    }
 
-Your order has been received and will be processed shortly.
 
-Thank you for shopping with us!
+def _cart_response(cart, **data):
+    """Answer a JSON cart API call with the cart's count and total.
 
-Best regards,
-eCommerce Team
-'''
+    :param cart: Cart after the change.
+    :param data: Extra keys, such as the changed line.
+    :return: JsonResponse.
+    """
+    return JsonResponse(
+        {
+            **data,
+            'count': len(cart),
+            'total': str(cart.get_total_price()),
+        }
+    )
 
-        # Create order record
-        try:
-            # Create order
-            order = Order.objects.create(
-                user=request.user,
-                total_amount=total,
-                status='completed'
-            )
 
-            # Create order items
-            for item in cart:
-                OrderItem.objects.create(
-                    order=order,
-                    product=item['product'],
-                    quantity=item['quantity'],
-                    price=Decimal(str(item['price']))
-                )
-
-            # Send email
-            send_mail(
-                subject=email_subject,
-                message=email_body,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[request.user.email],
-                fail_silently=False,
-            )
+@api_view(['GET'])
+@authentication_classes([SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def cart_summary(request):
+    """Return every line of the cart with its count and total.
 
-            # Clear the cart after successful checkout
-            cart.clear()
+    :param request: Django HttpRequest.
+    :return: JsonResponse with lines, count and total.
+    """
+    cart = Cart(request)
+    return _cart_response(cart, lines=[_line_data(line) for line in cart])
 
-            messages.success(
-                request,
-                'Order placed successfully! '
-                'Check your email for confirmation.'
-            )
-            return render(
-                request,
-                'cart/checkout_success.html',
-                {'order': order}
-            )
 
-        except Exception as e:
-            messages.error(request, f'Failed to process order: {str(e)}')
-            return redirect('cart_view')
+@api_view(['POST'])
+@authentication_classes([SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def cart_add_item(request, product_id):
+    """Add a product to the cart (buyers only).
 
-    # GET request - show checkout confirmation page
-    return render(request, 'cart/checkout_confirm.html', {'cart': cart})
+    :param request: Django HttpRequest.
+    :param product_id: Product identifier to add.
+    :return: JsonResponse with the line, count and total.
+    """
+    if request.user.user_type != 'buyer':
+        return JsonResponse(
+            {'error': 'Only buyers can add items to cart'},
+            status=status.HTTP_403_FORBIDDEN)
+    quantity = _parse_quantity(request.data.get('quantity', 1))
+    if quantity is None or quantity < 1:
+        return JsonResponse(
+            {'error': 'Quantity must be a positive whole number.'},
+            status=status.HTTP_400_BAD_REQUEST)
+    update = request.data.get('update', False)
+    update = str(update).lower() in ['1', 'true', 'on', 'yes']
+
+    cart = Cart(request)
+    product = get_product_or_404(product_id)
+    cart.add(product=product, quantity=quantity, update_quantity=update)
+    return _cart_response(cart, line=_line_data(cart.line(product)))
+
+
+@api_view(['POST'])
+@authentication_classes([SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def cart_update_item(request, product_id):
+    """Set the quantity of a product in the cart; zero removes it.
+
+    :param request: Django HttpRequest.
+    :param product_id: Product identifier to update.
+    :return: JsonResponse with the line (null once removed), count and
+        total.
+    """
+    quantity = _parse_quantity(request.data.get('quantity', 1))
+    if quantity is None or quantity < 0:
+        return JsonResponse(
+            {'error': 'Quantity must be zero or a positive whole number.'},
+            status=status.HTTP_400_BAD_REQUEST)
+
+    cart = Cart(request)
+    if quantity == 0:
+        cart.remove(product_id)
+        return _cart_response(cart, line=None)
+    product = get_product_or_404(product_id)
+    cart.add(product=product, quantity=quantity, update_quantity=True)
+    return _cart_response(cart, line=_line_data(cart.line(product)))
+
+
+@api_view(['POST'])
+@authentication_classes([SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def cart_remove_item(request, product_id):
+    """Remove a product from the cart.
+
+    :param request: Django HttpRequest.
+    :param product_id: Product identifier to remove.
+    :return: JsonResponse with a null line, count and total.
+    """
+    cart = Cart(request)
+    cart.remove(product_id)
+    return _cart_response(cart, line=None)
+
+
+@api_view(['POST'])
+@authentication_classes([SessionAuthentication])
+@permission_classes([IsAuthenticated])
+def cart_set_items(request):
+    """Set the quantities of several products at once (buyers only).
+
+    Expects ``{"items": [{"product": 1, "quantity": 2}, ...]}``; a
+    quantity of zero removes the line. The products are loaded with one
+    query and all changes are stored together.
+
+    :param request: Django HttpRequest.
+    :return: JsonResponse with the changed lines, count and total.
+    """
+    if request.user.user_type != 'buyer':
+        return JsonResponse(
+            {'error': 'Only buyers can add items to cart'},
+            status=status.HTTP_403_FORBIDDEN)
+    items = request.data.get('items') if hasattr(request.data, 'get') else None
+    if not isinstance(items, list):
+        return JsonResponse(
+            {'error': 'Send {"items": [{"product": id, "quantity": n}]}.'},
+            status=status.HTTP_400_BAD_REQUEST)
+
+    quantities = {}
+    errors = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'item': index, 'error': 'Expected an object.'})
+            continue
+        product_id = _parse_quantity(item.get('product'))
+        quantity = _parse_quantity(item.get('quantity'))
+        if product_id is None or quantity is None or quantity < 0:
+            errors.append({
+                'item': index,
+                'error': 'Product must be an id and quantity zero or a '
+                         'positive whole number.',
+            })
+            continue
+        quantities[product_id] = quantity
+    if errors:
+        return JsonResponse(
+            {'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    products = Product.objects.in_bulk(list(quantities))
+    unknown = [pid for pid in quantities if pid not in products]
+    if unknown:
+        return JsonResponse(
+            {'error': 'Unknown products.', 'products': unknown},
+            status=status.HTTP_400_BAD_REQUEST)
+
+    cart = Cart(request)
+    cart.set_quantities(quantities, products)
+    return _cart_response(cart, lines=[
+        _line_data(cart.line(products[pid])) or {
+            'product': pid, 'quantity': 0,
+        }
+        for pid in quantities
+    ])
+
+
+def _order_history_page(request):
+    """Load one page of the caller's orders with their items.
+
+    Orders are paged newest first on ``(created_at, order_id)`` through
+    the ``order_user_created_idx`` index, and the items of the whole page
+    arrive in one prefetch query, so every page costs the same however
+    many orders exist.
+
+    :param request: DRF request of an authenticated user.
+    :return: KeysetPage of orders.
+    :raises InvalidCursor: If the cursor is malformed.
+    """
+    orders = Order.objects.filter(user=request.user).prefetch_related(
+        Prefetch(
+            'items', queryset=OrderItem.objects.select_related('product')
+        )
+    )
+    page_size = get_page_size(
+        request, settings.API_PAGE_SIZE, settings.API_MAX_PAGE_SIZE
+    )
+    return paginate_keyset(
+        orders, ('-created_at', '-order_id'),
+        cursor=request.GET.get('cursor'),
+        limit=page_size,
+    )
 
 
 @api_view(['GET'])
+@permission_classes([IsAuthenticated])
 def view_orders(request):
-    """Return all orders in JSON format.
+    """Return one page of the caller's orders in JSON format.
 
     :param request: Django HttpRequest.
-    :return: JsonResponse containing orders.
+    :return: JsonResponse containing orders with their items.
     """
-    serializer = OrderSerializer(Order.objects.all(), many=True)
-    return JsonResponse(data=serializer.data, safe=False)
+    try:
+        page = _order_history_page(request)
+    except InvalidCursor as exc:
+        return JsonResponse(
+            {'cursor': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = OrderHistorySerializer(page.items, many=True)
+    response = JsonResponse(data=serializer.data, safe=False)
+    return set_page_headers(response, request, page)
 
 
 @api_view(['GET'])
 @renderer_classes([XMLRenderer])
+@permission_classes([IsAuthenticated])
 def view_orders_xml(request):
-    """Return all orders in XML format.
+    """Return one page of the caller's orders in XML format.
 
     :param request: Django HttpRequest.
-    :return: DRF Response containing orders in XML.
+    :return: DRF Response containing orders with their items in XML.
     """
-    serializer = OrderSerializer(Order.objects.all(), many=True)
-    return Response(data=serializer.data)
+    try:
+        page = _order_history_page(request)
+    except InvalidCursor as exc:
+        return Response(
+            {'cursor': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = OrderHistorySerializer(page.items, many=True)
+    response = Response(data=serializer.data)
+    return set_page_headers(response, request, page)
 
 
 @api_view(['POST'])
@@ -256,7 +447,7 @@ def add_order(request):
     :param request: Django HttpRequest.
     :return: JsonResponse with order data or errors.
     """
-    if request.user.id == request.data.get('user'):
+    if request.user.pk == request.data.get('user'):
         serializer = OrderSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
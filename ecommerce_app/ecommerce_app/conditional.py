@@ -0,0 +1,125 @@
+'''Conditional GET (ETag and Last-Modified) for collection endpoints.
+Includes:
+- A version per collection, kept in the shared cache
+- Bumping it from the signals and bulk writes that change the rows
+- A view decorator answering 304 while the version is unchanged
+
+A version is a whole number of seconds since the epoch. Every change
+raises it to the current second, and by at least one, so it both dates
+the collection for ``Last-Modified`` and never repeats for the ETag,
+even after several changes in the same second or a delete, which leaves
+no newer timestamp in the table. Reading it is one cache lookup instead
+of an aggregate over the whole table.
+'''
+
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.http import condition
+
+PRODUCTS = 'products'
+STORES = 'stores'
+REVIEWS = 'reviews'
+
+
+def _key(name):
+    return f'collection:version:{name}'
+
+
+def _raise_version(key):
+    """Move a version to the current second, and up by at least one.
+
+    Only ``incr`` is used on an existing version, so concurrent changes
+    add up instead of overwriting each other.
+
+    :param key: Cache key of the version.
+    """
+    now = int(time.time())
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        if cache.add(key, now, None):
+            return
+        version = cache.incr(key)
+    if version < now:
+        cache.incr(key, now - version)
+
+
+def bump_collections(*names):
+    """Record that the rows of some collections changed.
+
+    Like the object caches, the version moves straight away and again
+    when the current transaction commits, so a reader that saw the old
+    rows under the first new version is invalidated by the second.
+
+    :param names: Collection names, e.g. :data:`PRODUCTS`.
+    """
+    keys = [_key(name) for name in names]
+    for key in keys:
+        _raise_version(key)
+
+    def on_commit():
+        for key in keys:
+            _raise_version(key)
+
+    transaction.on_commit(on_commit)
+
+
+def collection_version(name):
+    """Return the current version of a collection.
+
+    A version missing from the cache starts at the current second, which
+    at worst makes clients download the collection once more.
+
+    :param name: Collection name.
+    :return: Version as seconds since the epoch.
+    """
+    key = _key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time()), None)
+        version = cache.get(key)
+    return version
+
+
+def collection_etag(request, name):
+    """Return the ETag of a collection.
+
+    :param request: Django HttpRequest.
+    :param name: Collection name.
+    :return: Quoted ETag string.
+    """
+    # Each URL (path, page, format) is its own representation
+    raw = f'{request.get_full_path()}|{collection_version(name)}'
+    return f'"{hashlib.sha256(raw.encode()).hexdigest()[:32]}"'
+
+
+def collection_last_modified(request, name):
+    """Return when a collection last changed.
+
+    :param request: Django HttpRequest.
+    :param name: Collection name.
+    :return: Aware datetime.
+    """
+    return datetime.fromtimestamp(collection_version(name), timezone.utc)
+
+
+def conditional_collection(name):
+    """Decorate a collection view so unchanged data yields a 304.
+
+    The version covers the whole collection, so it is safe for filtered
+    and paginated views too: any change anywhere invalidates every page.
+
+    :param name: Collection listed by the view, e.g. :data:`PRODUCTS`.
+    :return: View decorator.
+    """
+    def etag(request, *args, **kwargs):
+        return collection_etag(request, name)
+
+    def last_modified(request, *args, **kwargs):
+        return collection_last_modified(request, name)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -104,3 +104,29 @@ def tweet_new_product(product) -> None:
     if description:
         message = f"{message} — {description}"
     send_tweet(message)
+
+
+def tweet_new_products(products, limit: int = 5) -> None:
+    """Send a single tweet announcing a batch of new products.
+
+    :param products: Product instances with their stores loaded.
+    :param limit: Maximum number of product names to list.
+    :return: None.
+    """
+    products = list(products)
+    if not products:
+        return
+    if len(products) == 1:
+        tweet_new_product(products[0])
+        return
+    store_names = sorted({
+        getattr(product.store, 'store_name', 'Store') for product in products
+    })
+    where = (
+        store_names[0] if len(store_names) == 1
+        else f"{len(store_names)} stores"
+    )
+    names = ', '.join(product.name for product in products[:limit])
+    if len(products) > limit:
+        names = f"{names} and more"
+    send_tweet(f"{len(products)} new products at {where}: {names}")
@@ -0,0 +1,188 @@
+'''Two-tier cache-aside lookups of model instances by primary key.
+
+Tier one is a small per-process LRU; tier two is the shared Django cache
+backend. A lookup falls through to the database only when both miss.
+Writes call :meth:`ObjectCache.invalidate` from ``post_save`` and
+``post_delete`` signals, which clears this process's LRU entry and the
+shared entry. Other processes drop their copy when its short local TTL
+runs out, so they serve stale data for at most that long.
+'''
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+_registry = []
+
+
+class ObjectCache:
+    """Cache model instances by primary key in two tiers.
+
+    :param model: Django model class to cache.
+    :param prefix: Key prefix used in the shared cache.
+    """
+
+    def __init__(self, model, prefix):
+        self.model = model
+        self.prefix = prefix
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+        _registry.append(self)
+
+    @property
+    def max_local(self):
+        return getattr(settings, 'OBJECT_CACHE_LOCAL_SIZE', 1024)
+
+    @property
+    def local_ttl(self):
+        return getattr(settings, 'OBJECT_CACHE_LOCAL_TTL', 5)
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'OBJECT_CACHE_TIMEOUT', 300)
+
+    def _key(self, pk):
+        return f'{self.prefix}:{pk}'
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _local_get(self, key):
+        """Return a live entry from the local LRU, or None.
+
+        :param key: Cache key.
+        :return: Cached instance or None.
+        """
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires, instance = entry
+            if expires < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return instance
+
+    def _local_set(self, key, instance):
+        """Store an entry in the local LRU, evicting the oldest if full.
+
+        :param key: Cache key.
+        :param instance: Model instance to keep.
+        """
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_ttl, instance)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local:
+                self._local.popitem(last=False)
+
+    def get(self, pk):
+        """Look up an instance by primary key.
+
+        :param pk: Primary key value.
+        :return: A private copy of the instance, or None if it does not
+            exist.
+        """
+        try:
+            key = self._key(int(pk))
+        except (TypeError, ValueError):
+            return None
+
+        instance = self._local_get(key)
+        if instance is not None:
+            self._count('local_hits')
+        else:
+            instance = cache.get(key)
+            if instance is not None:
+                self._count('shared_hits')
+            else:
+                self._count('misses')
+                instance = self.model._default_manager.filter(pk=pk).first()
+                if instance is None:
+                    return None
+                cache.set(key, instance, self.timeout)
+            self._local_set(key, instance)
+        # Callers may modify what they get back; never hand out the
+        # instance shared by other threads.
+        return copy.copy(instance)
+
+    def get_or_404(self, pk):
+        """Look up an instance by primary key or raise Http404.
+
+        :param pk: Primary key value.
+        :return: A private copy of the instance.
+        :raises Http404: If no such instance exists.
+        """
+        instance = self.get(pk)
+        if instance is None:
+            raise Http404(
+                f'No {self.model._meta.object_name} matches the given query.'
+            )
+        return instance
+
+    def _forget(self, keys):
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        cache.delete_many(keys)
+
+    def invalidate(self, pk):
+        """Forget an instance in this process and in the shared cache.
+
+        The entry is dropped straight away and again when the current
+        transaction commits, so a concurrent reader cannot put the row
+        back as it was before the write.
+
+        :param pk: Primary key value.
+        """
+        self.invalidate_many([pk])
+
+    def invalidate_many(self, pks):
+        """Forget several instances like :meth:`invalidate`, with one
+        shared-cache call instead of one per instance.
+
+        :param pks: Primary key values.
+        """
+        keys = [self._key(pk) for pk in pks]
+        if not keys:
+            return
+        self._forget(keys)
+        transaction.on_commit(lambda: self._forget(keys))
+
+    def clear_local(self):
+        """Empty this process's LRU tier."""
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        """Return this process's hit and miss counters.
+
+        :return: Dict with local_hits, shared_hits, misses and size.
+        """
+        with self._lock:
+            return {**self._stats, 'size': len(self._local)}
+
+
+def clear_local_caches():
+    """Empty the LRU tier of every object cache in this process."""
+    for object_cache in _registry:
+        object_cache.clear_local()
+
+
+def cache_stats():
+    """Return the counters of every object cache in this process.
+
+    :return: Dict mapping cache prefix to its counters.
+    """
+    return {
+        object_cache.prefix: object_cache.stats()
+        for object_cache in _registry
+    }
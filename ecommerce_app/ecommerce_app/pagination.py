@@ -0,0 +1,209 @@
+'''Keyset (cursor) pagination helpers.
+
+Pages are addressed by an opaque cursor holding the ordering key of the
+last row on the previous page. Every page is fetched with an indexed
+range condition instead of an OFFSET, so page 1000 costs the same as
+page 1.
+'''
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+class KeysetPage:
+    """A single page of keyset-paginated results.
+
+    :param items: Rows on this page.
+    :param next_cursor: Cursor for the following page, or None.
+    """
+
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        """Return True when another page follows this one.
+
+        :return: True if a next cursor exists.
+        """
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(values) -> str:
+    """Encode ordering key values into an opaque cursor string.
+
+    :param values: Sequence of key values of the last row on a page.
+    :return: URL-safe cursor string.
+    """
+    payload = [
+        value if value is None or isinstance(value, (int, float))
+        else str(value)
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor produced by :func:`encode_cursor`.
+
+    :param cursor: Cursor string from the request.
+    :param size: Expected number of key values.
+    :return: List of key values.
+    :raises InvalidCursor: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid pagination cursor.')
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Invalid pagination cursor.')
+    return values
+
+
+def _after_condition(keys, values):
+    """Build the "strictly after this row" filter for an ordering.
+
+    For ordering (a, b) this yields ``a > x OR (a = x AND b > y)``, with
+    the comparison flipped for descending keys.
+
+    :param keys: Ordering field names, optionally prefixed with '-'.
+    :param values: Key values of the last row on the previous page.
+    :return: Q object selecting the rows after the cursor.
+    """
+    condition = Q()
+    equal = {}
+    for key, value in zip(keys, values):
+        field = key.lstrip('-')
+        lookup = 'lt' if key.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{field}__{lookup}': value})
+        equal[field] = value
+    return condition
+
+
+def paginate_keyset(queryset, keys, cursor=None, limit=24):
+    """Return one page of a queryset using keyset pagination.
+
+    The last key must be unique (normally the primary key) so the
+    ordering is total and no row is skipped or repeated across pages.
+
+    :param queryset: Base queryset to paginate.
+    :param keys: Ordering field names, e.g. ``('price', 'prod_id')``.
+    :param cursor: Cursor of the previous page, or None for page one.
+    :param limit: Maximum number of rows on the page.
+    :return: KeysetPage with the rows and the next cursor.
+    :raises InvalidCursor: If the cursor is malformed or its values do
+        not fit the key fields.
+    """
+    keys = tuple(keys)
+    queryset = queryset.order_by(*keys)
+    if cursor:
+        values = decode_cursor(cursor, len(keys))
+        try:
+            # Each value is converted to its field's type here, so a
+            # well-formed cursor holding wrong values is refused too
+            queryset = queryset.filter(_after_condition(keys, values))
+        except (TypeError, ValueError, ValidationError):
+            raise InvalidCursor('Invalid pagination cursor.')
+
+    # Fetch one extra row to learn whether another page exists
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            getattr(last, key.lstrip('-')) for key in keys
+        )
+    return KeysetPage(rows, next_cursor)
+
+
+def iter_keyset_chunks(queryset, keys, chunk_size):
+    """Walk a whole queryset as a series of keyset pages.
+
+    Each chunk is a separate bounded query, so memory stays flat however
+    large the table is, even on drivers that buffer full result sets.
+
+    :param queryset: Queryset to walk.
+    :param keys: Ordering field names ending with a unique key.
+    :param chunk_size: Maximum number of rows per chunk.
+    :return: Iterator of lists of rows.
+    """
+    cursor = None
+    while True:
+        page = paginate_keyset(
+            queryset, keys, cursor=cursor, limit=chunk_size
+        )
+        if page.items:
+            yield page.items
+        if not page.has_next:
+            return
+        cursor = page.next_cursor
+
+
+def get_page_size(request, default, maximum):
+    """Read the ``limit`` query parameter, clamped to a sane range.
+
+    :param request: Django or DRF request.
+    :param default: Page size used when no valid limit is given.
+    :param maximum: Largest page size a client may request.
+    :return: Page size to use.
+    """
+    try:
+        limit = int(request.GET.get('limit', default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+def next_page_url(request, page, absolute=False):
+    """Build the URL of the page after ``page``, keeping other filters.
+
+    :param request: Django or DRF request.
+    :param page: KeysetPage that was just rendered.
+    :param absolute: When True return an absolute URI.
+    :return: URL string, or None if there is no next page.
+    """
+    if not page.has_next:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = page.next_cursor
+    url = f'?{params.urlencode()}'
+    if absolute:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def set_page_headers(response, request, page):
+    """Advertise the next page of an API response in its headers.
+
+    The response body stays a plain list; the next page is announced in
+    a ``Link: <...>; rel="next"`` header and in ``X-Next-Cursor``.
+
+    :param response: Response to decorate.
+    :param request: Django or DRF request.
+    :param page: KeysetPage that produced the response body.
+    :return: The same response.
+    """
+    if page.has_next:
+        response['Link'] = (
+            f'<{next_page_url(request, page, absolute=True)}>; rel="next"'
+        )
+        response['X-Next-Cursor'] = page.next_cursor
+    return response
@@ -47,6 +47,10 @@ INSTALLED_APPS = [
     'users',
     'store.apps.StoreConfig',
     'cart',
+    'search',
+    'outbox',
+    'sales',
+    'leaderboard.apps.LeaderboardConfig',
 ]
 
 MIDDLEWARE = [
@@ -71,6 +75,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'cart.context_processors.cart_count',
             ],
         },
     },
@@ -159,11 +164,69 @@ PASSWORD_RESET_TIMEOUT = 7200
 # Email Configuration (Console backend for development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@ecommerce.com'
-
-# Session Configuration - cart will clear when session expires
+# Emails are queued in the outbox and delivered by `manage.py send_outbox`
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '100'))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))
+# Seconds before the first retry, doubled after each failure up to the max
+OUTBOX_RETRY_BACKOFF = int(os.getenv('OUTBOX_RETRY_BACKOFF', '60'))
+OUTBOX_RETRY_MAX_DELAY = int(os.getenv('OUTBOX_RETRY_MAX_DELAY', '3600'))
+# Seconds a worker may take to send a claimed batch before others retry it
+OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', '300'))
+
+# Session Configuration - anonymous carts clear when the session expires
 SESSION_COOKIE_AGE = 86400  # 1 day (in seconds)
 SESSION_SAVE_EVERY_REQUEST = True
-SESSION_EXPIRE_AT_BROWSER_CLOSE = True  # Cart clears when browser closes
+SESSION_EXPIRE_AT_BROWSER_CLOSE = True  # Anonymous cart clears on close
+
+# Cart storage for signed-in users; anonymous carts always use the session
+CART_STORAGE = os.getenv('CART_STORAGE', 'cart.storage.DatabaseCartStorage')
+
+# Pagination - catalog pages and list APIs use keyset cursors
+PRODUCT_PAGE_SIZE = int(os.getenv('PRODUCT_PAGE_SIZE', '24'))
+STORE_PAGE_SIZE = int(os.getenv('STORE_PAGE_SIZE', '24'))
+REVIEW_PAGE_SIZE = int(os.getenv('REVIEW_PAGE_SIZE', '20'))
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '100'))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '1000'))
+# Rows fetched per query when streaming full exports (?stream=json|ndjson)
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+# Bulk product uploads (/add/products): rows per insert and per upload
+BULK_PRODUCT_BATCH_SIZE = int(os.getenv('BULK_PRODUCT_BATCH_SIZE', '1000'))
+BULK_PRODUCT_MAX_ROWS = int(os.getenv('BULK_PRODUCT_MAX_ROWS', '50000'))
+# Bulk review uploads (/add/reviews): rows per insert and per upload
+BULK_REVIEW_BATCH_SIZE = int(os.getenv('BULK_REVIEW_BATCH_SIZE', '1000'))
+BULK_REVIEW_MAX_ROWS = int(os.getenv('BULK_REVIEW_MAX_ROWS', '100000'))
+# Seconds the category and price facet counts are cached for
+FACET_CACHE_TIMEOUT = int(os.getenv('FACET_CACHE_TIMEOUT', '300'))
+# Seconds a product's star rating histogram is cached for
+REVIEW_HISTOGRAM_CACHE_TIMEOUT = int(
+    os.getenv('REVIEW_HISTOGRAM_CACHE_TIMEOUT', '300')
+)
+# Top-rated leaderboard: Bayesian prior (mean rating and its weight in
+# reviews), how many times a verified purchase review counts, products
+# per category in the API, and seconds the homepage lists are cached for
+LEADERBOARD_PRIOR_MEAN = float(os.getenv('LEADERBOARD_PRIOR_MEAN', '3.0'))
+LEADERBOARD_PRIOR_WEIGHT = float(os.getenv('LEADERBOARD_PRIOR_WEIGHT', '10'))
+LEADERBOARD_VERIFIED_WEIGHT = float(
+    os.getenv('LEADERBOARD_VERIFIED_WEIGHT', '2')
+)
+LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', '10'))
+LEADERBOARD_MAX_SIZE = int(os.getenv('LEADERBOARD_MAX_SIZE', '100'))
+LEADERBOARD_CACHE_TIMEOUT = int(os.getenv('LEADERBOARD_CACHE_TIMEOUT', '300'))
+
+# Cache - point CACHE_BACKEND at Redis or Memcached in production so all
+# workers share one cache; the default only lives inside one process
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+# Product and store lookups: per-process LRU in front of the cache above
+OBJECT_CACHE_LOCAL_SIZE = int(os.getenv('OBJECT_CACHE_LOCAL_SIZE', '1024'))
+OBJECT_CACHE_LOCAL_TTL = int(os.getenv('OBJECT_CACHE_LOCAL_TTL', '5'))
+OBJECT_CACHE_TIMEOUT = int(os.getenv('OBJECT_CACHE_TIMEOUT', '300'))
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': (
@@ -0,0 +1,92 @@
+'''Streaming JSON exports for the list APIs.
+
+Large collections are written row chunk by row chunk through a
+StreamingHttpResponse, either as one JSON array or as NDJSON (one JSON
+document per line). Rows are read with keyset-chunked queries, so worker
+memory does not grow with the size of the table.
+'''
+
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .pagination import iter_keyset_chunks
+
+STREAM_CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _dumps(item) -> str:
+    """Serialise one row the same way JsonResponse would.
+
+    :param item: Serialised row data.
+    :return: JSON string.
+    """
+    return json.dumps(item, cls=DjangoJSONEncoder)
+
+
+def _rows(queryset, serializer_class, keys, chunk_size):
+    """Yield serialised rows, one chunk of model instances at a time.
+
+    :param queryset: Queryset to export.
+    :param serializer_class: DRF serializer used for each row.
+    :param keys: Ordering field names ending with a unique key.
+    :param chunk_size: Rows fetched per query.
+    :return: Iterator of serialised rows.
+    """
+    for chunk in iter_keyset_chunks(queryset, keys, chunk_size):
+        yield from serializer_class(chunk, many=True).data
+
+
+def _json_array(rows):
+    """Render rows as the chunks of a single JSON array.
+
+    :param rows: Iterator of serialised rows.
+    :return: Iterator of string fragments.
+    """
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + _dumps(row)
+        separator = ','
+    yield ']'
+
+
+def _ndjson(rows):
+    """Render rows as newline-delimited JSON.
+
+    :param rows: Iterator of serialised rows.
+    :return: Iterator of lines.
+    """
+    for row in rows:
+        yield _dumps(row) + '\n'
+
+
+def stream_export(request, queryset, serializer_class, keys):
+    """Stream a full collection when the client asks for ``?stream=``.
+
+    :param request: Django or DRF request.
+    :param queryset: Queryset to export.
+    :param serializer_class: DRF serializer used for each row.
+    :param keys: Ordering field names ending with a unique key.
+    :return: StreamingHttpResponse, a 400 JsonResponse for an unknown
+        format, or None when no stream was requested.
+    """
+    fmt = request.GET.get('stream')
+    if not fmt:
+        return None
+    if fmt not in STREAM_CONTENT_TYPES:
+        return JsonResponse(
+            {'stream': [f'Unsupported stream format "{fmt}".']},
+            status=400)
+
+    chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    rows = _rows(queryset, serializer_class, keys, chunk_size)
+    body = _ndjson(rows) if fmt == 'ndjson' else _json_array(rows)
+    return StreamingHttpResponse(
+        body, content_type=STREAM_CONTENT_TYPES[fmt]
+    )
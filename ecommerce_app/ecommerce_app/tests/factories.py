@@ -0,0 +1,119 @@
+'''Shared fixtures for the test modules.
+Includes:
+- Creating users, stores and products with the defaults the tests share
+- ShopTestCase, a TestCase seeding one vendor's stores, products and
+  buyers, with the X feed switched off
+
+Each test module keeps only the rows its own tests are about and sizes
+the shared catalog with the ShopTestCase class attributes.
+'''
+
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+
+from product.models import Product
+from store.models import Store
+from users.models import User
+
+PASSWORD = 'Shop1234'
+
+
+def create_user(username, user_type='buyer', **fields):
+    """Create a user with the shared test password.
+
+    :param username: Username; the email address is derived from it.
+    :param user_type: 'buyer' or 'vendor'.
+    :param fields: Extra User fields, e.g. ``is_staff``.
+    :return: The saved User.
+    """
+    return User.objects.create_user(
+        username, f'{username}@example.com', PASSWORD,
+        user_type=user_type, **fields
+    )
+
+
+def create_buyers(count, **fields):
+    """Create buyers named buyer0, buyer1 and so on.
+
+    :param count: Number of buyers.
+    :param fields: Extra User fields given to every buyer.
+    :return: List of Users.
+    """
+    return [create_user(f'buyer{i}', **fields) for i in range(count)]
+
+
+def create_store(vendor, store_name='Shop', category='books', **fields):
+    """Create a store of a vendor.
+
+    :param vendor: Vendor owning the store.
+    :param store_name: Name of the store.
+    :param category: Store category key.
+    :param fields: Extra Store fields.
+    :return: The saved Store.
+    """
+    fields.setdefault('store_description', 'Goods')
+    return Store.objects.create(
+        store_name=store_name, store_category=category, vendor=vendor,
+        **fields
+    )
+
+
+def create_product(store, name, price=Decimal('5.00'), **fields):
+    """Create a product; its save indexes it for search.
+
+    :param store: Store the product belongs to.
+    :param name: Product name.
+    :param price: Unit price.
+    :param fields: Extra Product fields, e.g. ``stock``.
+    :return: The saved Product.
+    """
+    fields.setdefault('description', f'A {name.lower()}')
+    return Product.objects.create(
+        name=name, price=price, store=store, **fields
+    )
+
+
+@override_settings(X_TWEETS_ENABLED=False)
+class ShopTestCase(TestCase):
+    """TestCase seeding a vendor with stores, products and buyers.
+
+    Products are named ``f'{product_name} {i}'`` and spread over the
+    stores in turn. Subclasses extend :meth:`setUpTestData` with their
+    own rows after calling ``super()``.
+    """
+
+    buyer_count = 1
+    store_count = 1
+    product_count = 2
+    product_name = 'Item'
+    product_price = Decimal('5.00')
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed the shared catalog."""
+        cls.vendor = create_user('vendor', 'vendor')
+        cls.buyers = create_buyers(cls.buyer_count)
+        cls.buyer = cls.buyers[0] if cls.buyers else None
+        cls.stores = [
+            create_store(cls.vendor, f'Shop {i}')
+            for i in range(cls.store_count)
+        ]
+        cls.store = cls.stores[0] if cls.stores else None
+        cls.products = [
+            create_product(
+                cls.stores[i % cls.store_count], f'{cls.product_name} {i}',
+                cls.price_of(i),
+            )
+            for i in range(cls.product_count)
+        ]
+        cls.product = cls.products[0] if cls.products else None
+
+    @classmethod
+    def price_of(cls, index):
+        """Return the price of the index-th seeded product.
+
+        :param index: Position of the product.
+        :return: Decimal price.
+        """
+        return cls.product_price
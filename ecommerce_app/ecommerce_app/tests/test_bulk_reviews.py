@@ -0,0 +1,101 @@
+'''Bulk review uploads through /add/reviews.
+
+Uploaded reviews are flagged as verified purchases from the buyer's
+completed orders, rejected rows are reported by position, and the
+products' rating aggregates match what single review saves would give.
+'''
+
+import base64
+import json
+from decimal import Decimal
+
+from cart.checkout import CheckoutLine, place_order
+from ecommerce_app.tests.factories import (
+    PASSWORD, ShopTestCase, create_user
+)
+from reviews.histogram import rating_histogram
+from reviews.models import Review
+
+
+class BulkReviewTests(ShopTestCase):
+    """Batches of reviews are validated, flagged and counted."""
+
+    buyer_count = 2
+    product_name = 'Classic'
+
+    @classmethod
+    def setUpTestData(cls):
+        """Add a staff importer and one completed order."""
+        super().setUpTestData()
+        cls.staff = create_user('importer', 'vendor', is_staff=True)
+        place_order(cls.buyers[0], [
+            CheckoutLine(cls.products[0], 1, cls.products[0].price)
+        ])
+
+    def _upload(self, user, body, content_type='application/json'):
+        """POST an upload authenticated as a seeded user.
+
+        :param user: User sending the upload.
+        :param body: Raw request body.
+        :param content_type: Content type of the body.
+        :return: Test client response.
+        """
+        token = base64.b64encode(f'{user.username}:{PASSWORD}'.encode())
+        return self.client.post(
+            '/add/reviews', body, content_type=content_type,
+            HTTP_AUTHORIZATION=f'Basic {token.decode()}',
+        )
+
+    def test_staff_upload_flags_and_counts(self):
+        """Verified flags and aggregates match the rows that were kept."""
+        product, other = self.products
+        rows = [
+            {'product': product.pk, 'user': self.buyers[0].pk,
+             'rating': 5, 'comment': 'Bought it'},
+            {'product': product.pk, 'user': self.buyers[1].pk,
+             'rating': 2, 'comment': 'Borrowed it'},
+            {'product': other.pk, 'user': self.buyers[0].pk,
+             'rating': 4, 'comment': 'Seen it'},
+            {'product': 9999, 'user': self.buyers[0].pk,
+             'rating': 3, 'comment': 'Gone'},
+            {'product': product.pk, 'user': self.buyers[1].pk,
+             'rating': 9, 'comment': 'Too many stars'},
+        ]
+        response = self._upload(self.staff, json.dumps(rows))
+        self.assertEqual(response.status_code, 207)
+        report = response.json()
+        self.assertEqual((report['created'], report['failed']), (3, 2))
+        self.assertEqual([error['row'] for error in report['errors']], [4, 5])
+        self.assertIn('product', report['errors'][0]['errors'])
+
+        self.assertEqual(
+            set(Review.objects.filter(is_verified_purchase=True)
+                .values_list('user', 'product')),
+            {(self.buyers[0].pk, product.pk)},
+        )
+        product.refresh_from_db()
+        self.assertEqual(
+            (product.review_count, product.rating_total,
+             product.verified_review_count, product.avg_rating),
+            (2, 7, 1, Decimal('3.50')),
+        )
+        self.assertEqual(rating_histogram(product.pk)[0]['count'], 1)
+
+    def test_buyers_may_only_upload_their_own(self):
+        """Rows written as another user are rejected; NDJSON is read."""
+        lines = [
+            {'product': self.products[1].pk, 'user': self.buyers[1].pk,
+             'rating': 4, 'comment': 'Mine'},
+            {'product': self.products[1].pk, 'user': self.buyers[0].pk,
+             'rating': 1, 'comment': 'Not mine'},
+        ]
+        body = '\n'.join(json.dumps(line) for line in lines) + '\n'
+        response = self._upload(
+            self.buyers[1], body, content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.json()['errors'][0]['row'], 2)
+        self.assertEqual(
+            list(Review.objects.values_list('user', flat=True)),
+            [self.buyers[1].pk],
+        )
@@ -0,0 +1,138 @@
+'''Checkout benchmark for carts of different sizes.
+
+Places orders from 1-, 10- and 200-line carts and checks that the number
+of SQL queries does not grow with the cart, that every line is written
+and that a price change since the item was added stops the checkout.
+
+Run with ``python manage.py test ecommerce_app``. A table of all
+measurements is printed at the end of the run; the times in it are only
+reported, never asserted.
+'''
+
+import sys
+import time
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from cart.cart import to_cents
+from cart.models import CartLine, Order, OrderItem
+from ecommerce_app.tests.factories import ShopTestCase
+from product.models import Product
+from sales.models import ProductDailySales
+
+CART_SIZES = (1, 10, 200)
+
+
+class CheckoutBenchmarkTests(ShopTestCase):
+    """Measure checkout as the number of cart lines grows."""
+
+    product_count = 0
+    results = []
+
+    @classmethod
+    def setUpTestData(cls):
+        """Stock the store with enough products for the largest cart."""
+        super().setUpTestData()
+        Product.objects.bulk_create(
+            Product(
+                name=f'Item {i}', description=f'Item number {i}',
+                price=Decimal('1.50') + i, store=cls.store, stock=1000,
+            )
+            for i in range(max(CART_SIZES))
+        )
+        cls.products = list(Product.objects.order_by('prod_id'))
+
+    @classmethod
+    def tearDownClass(cls):
+        """Print the benchmark table for the whole run."""
+        super().tearDownClass()
+        if not cls.results:
+            return
+        header = f"{'cart lines':>10} {'queries':>8} {'ms':>8}"
+        lines = ['', 'Checkout benchmark', header, '-' * len(header)]
+        for size, queries, ms in sorted(cls.results):
+            lines.append(f'{size:>10} {queries:>8} {ms:>8.1f}')
+        sys.stderr.write('\n'.join(lines) + '\n')
+
+    def _fill_cart(self, size, prices=None):
+        """Store a cart of ``size`` lines for the buyer.
+
+        :param size: Number of distinct products in the cart.
+        :param prices: Optional dict of product id to snapshot price.
+        """
+        prices = prices or {}
+        CartLine.objects.filter(user=self.buyer).delete()
+        CartLine.objects.bulk_create(
+            CartLine(
+                user=self.buyer, product=product, quantity=2,
+                price_cents=to_cents(
+                    prices.get(product.prod_id, product.price)
+                ),
+            )
+            for product in self.products[:size]
+        )
+
+    def _checkout(self, size):
+        """Place an order from a fresh cart and measure it.
+
+        :param size: Number of cart lines.
+        :return: Tuple (response, query count, elapsed milliseconds).
+        """
+        self.client.force_login(self.buyer)
+        self._fill_cart(size)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = self.client.post(reverse('cart_checkout'))
+            elapsed = (time.perf_counter() - started) * 1000
+        self.results.append((size, len(queries), elapsed))
+        return response, len(queries), elapsed
+
+    def _extra_rollup_batches(self, size):
+        """Count the extra INSERTs the backend needs for the rollup rows.
+
+        Backends with a limit on query parameters (SQLite) split the
+        product rollup rows of a large order into several statements.
+
+        :param size: Number of cart lines.
+        :return: Number of INSERTs beyond the first.
+        """
+        fields = [
+            field for field in ProductDailySales._meta.concrete_fields
+            if not field.primary_key
+        ]
+        batch = connection.ops.bulk_batch_size(fields, [None] * size)
+        return -(-size // batch) - 1
+
+    def test_query_count_is_independent_of_cart_size(self):
+        """1-, 10- and 200-line carts check out in the same queries."""
+        counts = {}
+        for size in CART_SIZES:
+            response, count, _ = self._checkout(size)
+            counts[size] = count - self._extra_rollup_batches(size)
+            self.assertEqual(response.status_code, 200)
+            order = Order.objects.latest('order_id')
+            self.assertEqual(order.items.count(), size)
+            self.assertEqual(
+                order.total_amount,
+                sum(p.price * 2 for p in self.products[:size]),
+            )
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f'Checkout queries grow with the cart: {counts}'
+        )
+
+    def test_price_change_stops_checkout(self):
+        """A stale price snapshot is refreshed instead of ordered."""
+        self.client.force_login(self.buyer)
+        stale = {self.products[0].prod_id: Decimal('0.01')}
+        self._fill_cart(3, prices=stale)
+        response = self.client.post(reverse('cart_checkout'))
+        self.assertRedirects(response, reverse('cart_checkout'))
+        self.assertFalse(OrderItem.objects.exists())
+        line = CartLine.objects.get(
+            user=self.buyer, product=self.products[0]
+        )
+        self.assertEqual(line.price_cents, to_cents(self.products[0].price))
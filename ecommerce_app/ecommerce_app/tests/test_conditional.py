@@ -0,0 +1,83 @@
+'''Conditional GET on the collection APIs.
+
+Any create, update or delete must produce a new ETag and a newer
+Last-Modified, so a client revalidating with either is never told that
+nothing changed.
+'''
+
+from decimal import Decimal
+
+from ecommerce_app.tests.factories import ShopTestCase, create_product
+from product.deletion import soft_delete_product
+from product.stock import set_stock
+
+
+class ConditionalCollectionTests(ShopTestCase):
+    """The product collection's validators follow every kind of write."""
+
+    buyer_count = 0
+    product_name = 'Top'
+
+    def _fetch(self):
+        """Fetch the product collection and return its validators.
+
+        :return: Tuple (ETag, Last-Modified) header values.
+        """
+        response = self.client.get('/get/products')
+        self.assertEqual(response.status_code, 200)
+        return response['ETag'], response['Last-Modified']
+
+    def _revalidate(self, validators):
+        """Revalidate the product collection with each validator alone.
+
+        :param validators: Tuple (ETag, Last-Modified) of a response.
+        :return: Tuple of status codes (by ETag, by date).
+        """
+        etag, last_modified = validators
+        return (
+            self.client.get(
+                '/get/products', HTTP_IF_NONE_MATCH=etag
+            ).status_code,
+            self.client.get(
+                '/get/products', HTTP_IF_MODIFIED_SINCE=last_modified
+            ).status_code,
+        )
+
+    def test_unchanged_collection_is_not_modified(self):
+        """Both validators get a 304, without a query, while nothing
+        changes."""
+        validators = self._fetch()
+        with self.assertNumQueries(0):
+            self.assertEqual(self._revalidate(validators), (304, 304))
+        self.assertEqual(self._fetch(), validators)
+
+    def test_create_changes_validators(self):
+        """Adding a product gives the collection a new version."""
+        validators = self._fetch()
+        create_product(self.store, 'Top new', Decimal('3.00'))
+        self.assertEqual(self._revalidate(validators), (200, 200))
+
+    def test_update_changes_validators(self):
+        """Editing a product gives the collection a new version."""
+        validators = self._fetch()
+        product = self.products[0]
+        product.price = Decimal('2.75')
+        product.save()
+        self.assertEqual(self._revalidate(validators), (200, 200))
+
+    def test_delete_changes_validators(self):
+        """Deleting a product, outright or softly, gives the collection
+        a new version each time."""
+        validators = self._fetch()
+        self.products[1].delete()
+        self.assertEqual(self._revalidate(validators), (200, 200))
+        validators = self._fetch()
+        soft_delete_product(self.products[0])
+        self.assertEqual(self._revalidate(validators), (200, 200))
+        self.assertEqual(self.client.get('/get/products').json(), [])
+
+    def test_signal_free_writes_change_validators(self):
+        """Stock updates, which send no signals, bump the version too."""
+        validators = self._fetch()
+        set_stock(self.products[0].prod_id, 4)
+        self.assertEqual(self._revalidate(validators), (200, 200))
@@ -0,0 +1,188 @@
+'''Soft deletion of stores and products and the purge that follows.
+
+Deleting hides the rows at once without touching their dependents; the
+purge then removes the rows and everything that cascades from them in
+small chunks, leaving other stores' data alone.
+'''
+
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from cart.checkout import CheckoutLine, place_order
+from cart.models import CartLine, OrderItem, PurchasedProduct
+from ecommerce_app.tests.factories import PASSWORD, ShopTestCase
+from leaderboard.ranking import top_products
+from product.deletion import soft_delete_product, soft_delete_store
+from product.models import Product
+from reviews.models import Review
+from sales.models import ProductDailySales, StoreDailySales
+from search.models import SearchPosting
+from store.models import Store
+
+
+class DeletionTests(ShopTestCase):
+    """Deleted stores vanish from reads and are purged in chunks."""
+
+    store_count = 2
+    product_count = 4
+    product_name = 'Atlas'
+    product_price = Decimal('12.00')
+
+    @classmethod
+    def setUpTestData(cls):
+        """Sell and review every product of the two stores."""
+        super().setUpTestData()
+        place_order(cls.buyer, [
+            CheckoutLine(product, 1, product.price)
+            for product in cls.products
+        ])
+        for product in cls.products:
+            for rating in (5, 4, 4):
+                Review.objects.create(
+                    product=product, user=cls.buyer,
+                    username=cls.buyer.username, rating=rating,
+                    comment='Useful',
+                )
+
+    def _delete_store(self):
+        """Delete the first store through its view as the vendor."""
+        self.client.login(username='vendor', password=PASSWORD)
+        store = self.stores[0]
+        response = self.client.post(
+            reverse('store_delete', args=[store.store_id])
+        )
+        self.assertRedirects(response, reverse('store_list'))
+
+    def test_delete_hides_at_once(self):
+        """The store and its products are gone from every read path."""
+        gone = [p.prod_id for p in self.products if p.store == self.stores[0]]
+        self._delete_store()
+
+        self.assertFalse(Store.objects.filter(pk=self.stores[0].pk).exists())
+        self.assertFalse(Product.objects.filter(pk__in=gone).exists())
+        self.assertEqual(
+            self.client.get(
+                reverse('product_detail', args=[gone[0]])
+            ).status_code,
+            404,
+        )
+        self.assertEqual(
+            {row['product'] for row in top_products('books', 10)},
+            {p.prod_id for p in self.products} - set(gone),
+        )
+        listed = self.client.get('/get/reviews').json()
+        self.assertFalse({row['product'] for row in listed} & set(gone))
+        # Nothing has been removed yet
+        self.assertEqual(Review.objects.count(), 12)
+        self.assertEqual(OrderItem.objects.count(), 4)
+
+    def test_purge_removes_dependents(self):
+        """The purge deletes the store's rows and keeps the other store."""
+        self._delete_store()
+        kept = [p for p in self.products if p.store == self.stores[1]]
+        out = StringIO()
+        call_command('purge_deleted', chunk_size=2, stdout=out)
+
+        self.assertIn('Done: 2 products and 1 stores purged', out.getvalue())
+        self.assertEqual(Store.all_objects.count(), 1)
+        self.assertEqual(
+            set(Product.all_objects.values_list('prod_id', flat=True)),
+            {p.prod_id for p in kept},
+        )
+        for model in (Review, OrderItem, PurchasedProduct,
+                      ProductDailySales, SearchPosting):
+            self.assertEqual(
+                set(model.objects.values_list('product', flat=True)),
+                {p.prod_id for p in kept},
+                model.__name__,
+            )
+        self.assertEqual(
+            list(StoreDailySales.objects.values_list('store', flat=True)),
+            [self.stores[1].pk],
+        )
+        # The surviving products' aggregates were left alone
+        kept[0].refresh_from_db()
+        self.assertEqual(kept[0].review_count, 3)
+
+    def test_deleted_product_is_purged(self):
+        """A single deleted product is purged without its store."""
+        self.client.login(username='vendor', password=PASSWORD)
+        product = self.products[0]
+        self.client.post(reverse('product_delete', args=[product.prod_id]))
+        self.assertFalse(Product.objects.filter(pk=product.pk).exists())
+
+        call_command('purge_deleted', stdout=StringIO())
+        self.assertFalse(Product.all_objects.filter(pk=product.pk).exists())
+        self.assertFalse(Review.objects.filter(product=product.pk).exists())
+        self.assertEqual(Store.objects.count(), 2)
+
+    def test_review_feed_version_sees_delete(self):
+        """Hiding a product's reviews changes the review feed's ETag."""
+        etag = self.client.get('/get/reviews')['ETag']
+        soft_delete_product(self.products[0])
+        response = self.client.get(
+            '/get/reviews', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 9)
+
+    def test_cart_refuses_products_of_deleted_store(self):
+        """A product cached before its store was deleted cannot be added."""
+        product = self.products[0]
+        self.client.get(reverse('product_detail', args=[product.prod_id]))
+        self._delete_store()
+        self.client.login(
+            username=self.buyer.username, password=PASSWORD
+        )
+        response = self.client.post(
+            reverse('cart_add', args=[product.prod_id]), {'quantity': 1}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_seed_after_delete(self):
+        """Seeding takes free keys when the newest rows are deleted."""
+        soft_delete_store(self.stores[-1])
+        self.assertEqual(self.products[-1].store, self.stores[-1])
+        call_command(
+            'seed_catalog', vendors=1, stores=1, buyers=1, products=3,
+            orders=2, skip_index=True, stdout=StringIO(),
+        )
+        self.assertEqual(Product.all_objects.count(), 7)
+        self.assertEqual(Store.all_objects.count(), 3)
+
+    def test_cart_skips_and_removes_deleted_product(self):
+        """A deleted product's line leaves the count and total and can
+        still be removed."""
+        self.client.login(
+            username=self.buyer.username, password=PASSWORD
+        )
+        kept, gone = self.products[0], self.products[1]
+        for product, quantity in ((kept, 1), (gone, 2)):
+            self.client.post(
+                reverse('cart_add', args=[product.prod_id]),
+                {'quantity': quantity},
+            )
+        soft_delete_product(gone)
+
+        summary = self.client.get(reverse('api_cart_summary')).json()
+        self.assertEqual(
+            [line['product'] for line in summary['lines']], [kept.prod_id]
+        )
+        self.assertEqual((summary['count'], summary['total']), (1, '12.00'))
+        self.assertEqual(self.client.session['cart_count'], 1)
+
+        response = self.client.post(
+            reverse('api_cart_remove', args=[gone.prod_id])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            CartLine.objects.filter(product=gone.prod_id).exists()
+        )
+        response = self.client.post(
+            reverse('cart_remove', args=[kept.prod_id])
+        )
+        self.assertRedirects(response, reverse('cart_view'))
+        self.assertFalse(CartLine.objects.exists())
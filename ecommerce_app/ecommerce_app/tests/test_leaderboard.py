@@ -0,0 +1,117 @@
+'''Top-rated leaderboard kept by review changes and the rebuild.
+
+Rows follow every review saved or deleted, verified purchases weigh
+more than other reviews, and a full rebuild repairs rows that drifted.
+'''
+
+from decimal import Decimal
+
+from django.test import override_settings
+
+from cart.checkout import CheckoutLine, place_order
+from ecommerce_app.tests.factories import ShopTestCase
+from leaderboard.models import LeaderboardEntry
+from leaderboard.ranking import rebuild_leaderboard, top_products
+from reviews.aggregates import rebuild_aggregates
+from reviews.models import Review
+
+
+@override_settings(
+    LEADERBOARD_PRIOR_MEAN=3.0,
+    LEADERBOARD_PRIOR_WEIGHT=10,
+    LEADERBOARD_VERIFIED_WEIGHT=2,
+)
+class LeaderboardTests(ShopTestCase):
+    """Leaderboard rows agree with the products' reviews."""
+
+    buyer_count = 2
+    product_count = 3
+    product_name = 'Book'
+    product_price = Decimal('8.00')
+
+    def _review(self, buyer, product, rating):
+        """Post one review through the model, as the views do.
+
+        :param buyer: Author of the review.
+        :param product: Reviewed product.
+        :param rating: Star rating 1-5.
+        :return: The saved Review.
+        """
+        return Review.objects.create(
+            product=product, user=buyer, username=buyer.username,
+            rating=rating, comment='Read it',
+            is_verified_purchase=Review(
+                user=buyer, product=product
+            ).check_verified_purchase(),
+        )
+
+    def _ranking(self, category='books'):
+        """Read a category's leaderboard as (product id, score) pairs.
+
+        :param category: Store category key.
+        :return: List of tuples, best first.
+        """
+        return [
+            (row['product'], Decimal(row['score']))
+            for row in top_products(category, 10)
+        ]
+
+    def test_reviews_refresh_the_ranking(self):
+        """Scores follow reviews; verified purchases weigh double."""
+        first, second, third = self.products
+        place_order(self.buyers[0], [CheckoutLine(second, 1, second.price)])
+        self._review(self.buyers[0], first, 5)
+        self._review(self.buyers[0], second, 5)
+        self.assertEqual(self._ranking(), [
+            # (10 * 3 + 2 * 5) / 12 and (10 * 3 + 5) / 11
+            (second.pk, Decimal('3.3333')), (first.pk, Decimal('3.1818')),
+        ])
+
+        review = self._review(self.buyers[1], third, 1)
+        self.assertEqual(self._ranking()[-1], (third.pk, Decimal('2.8182')))
+        review.delete()
+        self.assertNotIn(third.pk, dict(self._ranking()))
+
+        self.store.store_category = 'toys'
+        self.store.save()
+        self.assertEqual(self._ranking(), [])
+        self.assertEqual(len(self._ranking('toys')), 2)
+
+    def test_verified_rating_weighs_more(self):
+        """A verified review's rating counts double, not only its vote:
+        the same two ratings score higher when the verified one is 5."""
+        first, second, _ = self.products
+        place_order(self.buyers[0], [
+            CheckoutLine(product, 1, product.price)
+            for product in (first, second)
+        ])
+        self._review(self.buyers[0], first, 5)
+        self._review(self.buyers[1], first, 1)
+        self._review(self.buyers[0], second, 1)
+        self._review(self.buyers[1], second, 5)
+        expected = [
+            # (10 * 3 + 2 * 5 + 1) / 13 and (10 * 3 + 2 * 1 + 5) / 13
+            (first.pk, Decimal('3.1538')), (second.pk, Decimal('2.8462')),
+        ]
+        self.assertEqual(self._ranking(), expected)
+        LeaderboardEntry.objects.all().delete()
+        rebuild_aggregates()
+        rebuild_leaderboard()
+        self.assertEqual(self._ranking(), expected)
+
+    def test_rebuild_repairs_drift(self):
+        """Wrong, missing and stale rows are all corrected."""
+        for product in self.products[:2]:
+            self._review(self.buyers[0], product, 4)
+        expected = self._ranking()
+        LeaderboardEntry.objects.filter(
+            product=self.products[0]
+        ).update(score=Decimal('4.9'))
+        LeaderboardEntry.objects.filter(product=self.products[1]).delete()
+        LeaderboardEntry.objects.create(
+            product=self.products[2], category='books',
+            score=Decimal('5'), review_count=1,
+        )
+
+        self.assertEqual(rebuild_leaderboard(), (3, 3))
+        self.assertEqual(self._ranking(), expected)
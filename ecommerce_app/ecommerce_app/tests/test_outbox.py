@@ -0,0 +1,180 @@
+'''Delivery of queued emails by the outbox sender.
+
+Sent messages are marked sent, a failure is pinned to the one message
+that caused it and retried with capped exponential backoff, messages are
+dead-lettered after too many attempts, and no database transaction is
+open while the mail server is being talked to.
+'''
+
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from outbox.mail import queue_mail
+from outbox.models import OutboxMessage
+from outbox.sender import _claim, _record, drain, retry_delay, send_batch
+
+BACKOFF = 60
+MAX_DELAY = 600
+FLAKY_BACKEND = 'ecommerce_app.tests.test_outbox.FlakyBackend'
+
+
+class FlakyBackend(EmailBackend):
+    """locmem backend that rejects emails whose subject says so.
+
+    Also records how many transactions were open during each send.
+    """
+    down = False
+    atomic_depths = []
+
+    def open(self):
+        if FlakyBackend.down:
+            raise ConnectionRefusedError('mail server down')
+        return super().open()
+
+    def send_messages(self, messages):
+        FlakyBackend.atomic_depths.append(len(connection.atomic_blocks))
+        for message in messages:
+            if 'reject' in message.subject:
+                raise ValueError(f'rejected {message.subject}')
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND=FLAKY_BACKEND)
+class OutboxSenderTests(TestCase):
+    """Outcomes of a batch are recorded per message."""
+
+    def setUp(self):
+        FlakyBackend.down = False
+        FlakyBackend.atomic_depths = []
+
+    def _queue(self, *subjects):
+        """Queue one message per subject.
+
+        :param subjects: Email subjects.
+        :return: List of OutboxMessage.
+        """
+        return [
+            queue_mail(subject, 'Body', ['buyer@example.com'])
+            for subject in subjects
+        ]
+
+    def _send(self, max_attempts=5):
+        """Send one batch with the test backoff settings.
+
+        :param max_attempts: Attempts after which a message is dead.
+        :return: BatchResult.
+        """
+        return send_batch(10, max_attempts, BACKOFF, MAX_DELAY, lease=300)
+
+    def test_sends_and_marks_sent(self):
+        """Every message is delivered once and marked sent."""
+        self._queue('Order 1', 'Order 2')
+        self.assertEqual(tuple(self._send()), (2, 0, 0))
+        self.assertEqual(
+            [message.subject for message in mail.outbox],
+            ['Order 1', 'Order 2'],
+        )
+        self.assertEqual(
+            set(OutboxMessage.objects.values_list(
+                'status', 'attempts', 'lease_token'
+            )),
+            {('sent', 1, None)},
+        )
+        self.assertEqual(tuple(self._send()), (0, 0, 0))
+
+    def test_failure_pinned_to_its_message(self):
+        """Only the rejected message is retried, after the backoff."""
+        first, rejected, last = self._queue('Order 1', 'reject me', 'Order 3')
+        before = timezone.now()
+        self.assertEqual(tuple(self._send()), (2, 1, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+        rejected.refresh_from_db()
+        self.assertEqual(
+            (rejected.status, rejected.attempts), ('pending', 1)
+        )
+        self.assertIn('rejected reject me', rejected.last_error)
+        self.assertGreaterEqual(
+            rejected.next_attempt_at, before + timedelta(seconds=BACKOFF)
+        )
+        for message in (first, last):
+            message.refresh_from_db()
+            self.assertEqual(message.status, 'sent')
+        # Not due again yet
+        self.assertEqual(tuple(self._send()), (0, 0, 0))
+
+    def test_backoff_doubles_up_to_max_delay(self):
+        """Delays double per attempt and stop at max_delay."""
+        self.assertEqual(
+            [retry_delay(n, BACKOFF, MAX_DELAY).total_seconds()
+             for n in (1, 2, 3, 4, 5)],
+            [60, 120, 240, 480, 600],
+        )
+        (message,) = self._queue('reject later')
+        OutboxMessage.objects.filter(pk=message.pk).update(attempts=5)
+        before = timezone.now()
+        self._send(max_attempts=10)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('pending', 6))
+        self.assertGreaterEqual(
+            message.next_attempt_at, before + timedelta(seconds=MAX_DELAY)
+        )
+        self.assertLess(
+            message.next_attempt_at,
+            timezone.now() + timedelta(seconds=MAX_DELAY + 1),
+        )
+
+    def test_dead_after_max_attempts(self):
+        """The last allowed failure dead-letters the message."""
+        (message,) = self._queue('reject always')
+        OutboxMessage.objects.filter(pk=message.pk).update(attempts=2)
+        self.assertEqual(tuple(self._send(max_attempts=3)), (0, 0, 1))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('dead', 3))
+        OutboxMessage.objects.filter(pk=message.pk).update(
+            next_attempt_at=timezone.now()
+        )
+        self.assertEqual(tuple(self._send(max_attempts=3)), (0, 0, 0))
+
+    def test_server_down_retries_whole_batch(self):
+        """A connection that cannot be opened fails every message."""
+        self._queue('Order 1', 'Order 2')
+        FlakyBackend.down = True
+        self.assertEqual(tuple(self._send()), (0, 2, 0))
+        self.assertEqual(
+            set(OutboxMessage.objects.values_list('last_error', flat=True)),
+            {'mail server down'},
+        )
+
+    def test_sends_outside_transactions(self):
+        """No transaction of the sender is open while mail is sent."""
+        self._queue('Order 1', 'Order 2')
+        depth = len(connection.atomic_blocks)
+        drain(10, 5, BACKOFF, MAX_DELAY, lease=300)
+        self.assertEqual(FlakyBackend.atomic_depths, [depth, depth])
+
+    def test_lease_keeps_batch_to_one_worker(self):
+        """Leased messages are skipped until the lease runs out, and a
+        worker whose lease ran out cannot record its outcome."""
+        self._queue('Order 1')
+        now = timezone.now()
+        token, batch = _claim(10, now, 300)
+        self.assertEqual(len(batch), 1)
+        self.assertEqual(_claim(10, now, 300)[1], [])
+
+        later = now + timedelta(seconds=301)
+        retry_token, retry_batch = _claim(10, later, 300)
+        self.assertEqual(len(retry_batch), 1)
+        _record(token, batch, {}, 5, BACKOFF, MAX_DELAY)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(
+            (message.status, message.lease_token), ('pending', retry_token)
+        )
+        _record(retry_token, retry_batch, {}, 5, BACKOFF, MAX_DELAY)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('sent', 1))
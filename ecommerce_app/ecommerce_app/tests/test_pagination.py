@@ -0,0 +1,127 @@
+'''Cursors sent by clients are checked before they reach the database.
+
+A cursor that decodes fine but holds values of the wrong type for its
+keys is refused like any other malformed cursor: a 400 from the APIs and
+a redirect to the first page from the HTML views. The store and review
+APIs return one page at a time like the product API.
+'''
+
+from django.urls import reverse
+
+from cart.checkout import CheckoutLine, place_order
+from ecommerce_app.pagination import (
+    InvalidCursor, encode_cursor, paginate_keyset
+)
+from ecommerce_app.tests.factories import ShopTestCase
+from product.models import Product
+from reviews.models import Review
+
+BAD_VALUES = (['abc'], [[1]], [{'a': 1}], [None])
+
+
+class CursorValidationTests(ShopTestCase):
+    """Wrong-typed cursor values never cause a server error."""
+
+    store_count = 2
+    product_count = 1
+    product_name = 'Ledger'
+
+    @classmethod
+    def setUpTestData(cls):
+        """Give the buyer an order and the product two reviews."""
+        super().setUpTestData()
+        place_order(cls.buyer, [
+            CheckoutLine(cls.product, 1, cls.product.price)
+        ])
+        for rating in (3, 5):
+            Review.objects.create(
+                product=cls.product, user=cls.buyer,
+                username=cls.buyer.username, rating=rating,
+                comment=f'Rated {rating}',
+            )
+
+    def test_paginate_keyset_refuses_wrong_types(self):
+        """Values that do not fit the key fields raise InvalidCursor."""
+        for values in BAD_VALUES:
+            with self.subTest(values=values), \
+                    self.assertRaises(InvalidCursor):
+                paginate_keyset(
+                    Product.objects.all(), ('prod_id',),
+                    cursor=encode_cursor(values),
+                )
+        with self.assertRaises(InvalidCursor):
+            paginate_keyset(
+                Product.objects.all(), ('price', 'prod_id'),
+                cursor=encode_cursor(['abc', 1]),
+            )
+        with self.assertRaises(InvalidCursor):
+            paginate_keyset(
+                Product.objects.all(), ('-updated_at', 'prod_id'),
+                cursor=encode_cursor(['not a date', 1]),
+            )
+
+    def test_product_api_answers_400(self):
+        """The product API rejects wrong-typed cursors as bad requests."""
+        for values in BAD_VALUES:
+            response = self.client.get(
+                '/get/products', {'cursor': encode_cursor(values)}
+            )
+            self.assertEqual(response.status_code, 400, values)
+        response = self.client.get('/get/products', {
+            'sort': 'price', 'cursor': encode_cursor(['cheap', 'one']),
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_product_list_restarts(self):
+        """The product list sends a bad cursor back to the first page."""
+        response = self.client.get(
+            reverse('product_list'), {'cursor': encode_cursor(['abc'])}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('cursor', response['Location'])
+
+    def test_datetime_keyed_cursors(self):
+        """Order history and product reviews, keyed on dates, refuse
+        values that are not dates."""
+        cursor = encode_cursor(['yesterday', 1])
+        response = self.client.get(
+            reverse('product_detail', args=[self.product.prod_id]),
+            {'cursor': cursor},
+        )
+        self.assertRedirects(
+            response, reverse('product_detail', args=[self.product.prod_id])
+        )
+        self.client.force_login(self.buyer)
+        for values in (['yesterday', 1], ['2026-01-01T00:00:00', 'x']):
+            response = self.client.get(
+                '/cart/get/orders', {'cursor': encode_cursor(values)}
+            )
+            self.assertEqual(response.status_code, 400, values)
+
+    def test_store_and_review_apis_page(self):
+        """Stores and reviews come one page at a time, with the next page
+        in the headers, and every row is reached by following them."""
+        for url, key, expected in (
+            ('/get/stores', 'store_name', ['Shop 0', 'Shop 1']),
+            ('/get/stores/xml', None, None),
+            ('/get/reviews', 'rating', [3, 5]),
+            ('/get/reviews/xml', None, None),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url, {'limit': 1})
+                self.assertEqual(response.status_code, 200)
+                cursor = response['X-Next-Cursor']
+                self.assertIn('rel="next"', response['Link'])
+                if key is None:
+                    continue
+                seen = [item[key] for item in response.json()]
+                response = self.client.get(
+                    url, {'limit': 1, 'cursor': cursor}
+                )
+                seen += [item[key] for item in response.json()]
+                self.assertEqual(seen, expected)
+                self.assertNotIn('X-Next-Cursor', response)
+                response = self.client.get(
+                    url, {'cursor': encode_cursor(['abc'])}
+                )
+                self.assertEqual(response.status_code, 400)
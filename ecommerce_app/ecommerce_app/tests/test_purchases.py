@@ -0,0 +1,208 @@
+'''Verified purchases kept in the PurchasedProduct table.
+
+Checkout records what a buyer bought, cancelling or deleting an order
+takes back products not bought in another completed order, and many
+(user, product) pairs are checked with one query. Reviews are
+re-flagged from the purchases by the reverify_reviews command.
+'''
+
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cart.checkout import CheckoutLine, place_order
+from cart.models import PurchasedProduct
+from cart.purchases import purchased_pairs, rebuild_purchases
+from ecommerce_app.tests.factories import ShopTestCase
+from product.models import Product
+from reviews import verification
+from reviews.management.commands.reverify_reviews import write_checkpoint
+from reviews.models import Review
+
+
+class PurchasedProductTests(ShopTestCase):
+    """Purchases follow the buyer's completed orders."""
+
+    buyer_count = 2
+    product_count = 3
+    product_name = 'Thing'
+    product_price = Decimal('2.00')
+
+    def _buy(self, buyer, *products):
+        """Check out one order of the given products.
+
+        :param buyer: Buyer placing the order.
+        :param products: Products to buy, one unit each.
+        :return: The saved Order.
+        """
+        return place_order(buyer, [
+            CheckoutLine(product, 1, product.price) for product in products
+        ])
+
+    def _purchases(self):
+        """Read every stored (user, product) pair.
+
+        :return: Set of (user id, product id) tuples.
+        """
+        return set(
+            PurchasedProduct.objects.values_list('user_id', 'product_id')
+        )
+
+    def test_status_changes_and_deletes_resync(self):
+        """Only products still bought in a completed order remain."""
+        buyer = self.buyers[0]
+        first = self._buy(buyer, self.products[0], self.products[1])
+        second = self._buy(buyer, self.products[1])
+        bought = {
+            (buyer.pk, self.products[0].pk), (buyer.pk, self.products[1].pk)
+        }
+        self.assertEqual(self._purchases(), bought)
+
+        first.status = 'cancelled'
+        first.save()
+        self.assertEqual(self._purchases(), {(buyer.pk, self.products[1].pk)})
+
+        first.status = 'completed'
+        first.save()
+        self.assertEqual(self._purchases(), bought)
+
+        second.delete()
+        first.delete()
+        self.assertEqual(self._purchases(), set())
+
+    def test_many_pairs_in_one_query(self):
+        """A bulk check answers every pair with a single query."""
+        self._buy(self.buyers[0], self.products[0])
+        self._buy(self.buyers[1], self.products[1], self.products[2])
+        pairs = [
+            (buyer.pk, product.pk)
+            for buyer in self.buyers for product in self.products
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            verified = purchased_pairs(pairs)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(verified, {
+            (self.buyers[0].pk, self.products[0].pk),
+            (self.buyers[1].pk, self.products[1].pk),
+            (self.buyers[1].pk, self.products[2].pk),
+        })
+
+    def test_rebuild_repairs_drift(self):
+        """Missing and stale rows are restored from the orders."""
+        self._buy(self.buyers[0], self.products[0], self.products[1])
+        expected = self._purchases()
+        PurchasedProduct.objects.filter(product=self.products[0]).delete()
+        PurchasedProduct.objects.create(
+            user=self.buyers[1], product=self.products[2]
+        )
+        self.assertEqual(rebuild_purchases()[1], 2)
+        self.assertEqual(self._purchases(), expected)
+
+    def test_reverify_reviews_resumes_from_checkpoint(self):
+        """Flags follow the purchases, also after an interrupted run."""
+        self._buy(self.buyers[0], self.products[0])
+        reviews = [
+            Review.objects.create(
+                product=product, user=buyer, username=buyer.username,
+                rating=4, comment='Fine', is_verified_purchase=flag,
+            )
+            for buyer, product, flag in (
+                (self.buyers[0], self.products[0], False),
+                (self.buyers[1], self.products[1], True),
+                (self.buyers[1], self.products[2], False),
+            )
+        ]
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        checkpoint = os.path.join(folder.name, 'reverify.json')
+        options = {
+            'chunk_size': 1, 'checkpoint': checkpoint, 'stdout': StringIO()
+        }
+
+        call_command('reverify_reviews', dry_run=True, **options)
+        self.assertIn(
+            f'+ review {reviews[0].pk}', options['stdout'].getvalue()
+        )
+        self.assertFalse(os.path.exists(checkpoint))
+        self.assertEqual(
+            Review.objects.filter(is_verified_purchase=True).count(), 1
+        )
+
+        # Fail on the second range, after the first was committed
+        fix = verification.reverify_range
+        with mock.patch(
+            'reviews.management.commands.reverify_reviews.reverify_range',
+            side_effect=[fix(reviews[0].pk, reviews[0].pk + 1), OSError],
+        ):
+            with self.assertRaises(OSError):
+                call_command('reverify_reviews', **options)
+        self.assertTrue(os.path.exists(checkpoint))
+
+        options['stdout'] = StringIO()
+        call_command('reverify_reviews', **options)
+        output = options['stdout'].getvalue()
+        self.assertIn(f'Resuming at review {reviews[1].pk}', output)
+        self.assertIn('1 reviews verified, 1 no longer verified', output)
+        self.assertFalse(os.path.exists(checkpoint))
+        self.assertEqual(
+            list(Review.objects.filter(is_verified_purchase=True)),
+            [reviews[0]],
+        )
+        counts = Product.objects.filter(
+            pk__in=[self.products[0].pk, self.products[1].pk]
+        ).order_by('pk').values_list('verified_review_count', flat=True)
+        self.assertEqual(list(counts), [1, 0])
+
+    def test_reverify_dry_run_ignores_checkpoint(self):
+        """A dry run reports every range, even ones a run already passed."""
+        self._buy(self.buyers[0], self.products[0])
+        review = Review.objects.create(
+            product=self.products[0], user=self.buyers[0],
+            username=self.buyers[0].username, rating=5, comment='Good',
+            is_verified_purchase=False,
+        )
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        checkpoint = os.path.join(folder.name, 'reverify.json')
+        progress = {'next_id': review.pk + 1, 'verified': 0, 'unverified': 0}
+        write_checkpoint(checkpoint, progress)
+
+        out = StringIO()
+        call_command(
+            'reverify_reviews', dry_run=True, checkpoint=checkpoint,
+            stdout=out,
+        )
+        self.assertIn(f'+ review {review.pk}', out.getvalue())
+        self.assertIn('Dry run: 1 reviews verified', out.getvalue())
+        self.assertNotIn('Resuming', out.getvalue())
+        with open(checkpoint) as handle:
+            self.assertEqual(json.load(handle), progress)
+
+    def test_reverify_recounts_in_the_same_transaction(self):
+        """Flags are rolled back when the recount of their range fails."""
+        self._buy(self.buyers[0], self.products[0])
+        review = Review.objects.create(
+            product=self.products[0], user=self.buyers[0],
+            username=self.buyers[0].username, rating=5, comment='Good',
+            is_verified_purchase=False,
+        )
+        with mock.patch.object(
+            verification, 'rebuild_aggregates', side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                verification.reverify_range(review.pk, review.pk + 1)
+        review.refresh_from_db()
+        self.assertFalse(review.is_verified_purchase)
+
+        verification.reverify_range(review.pk, review.pk + 1)
+        review.refresh_from_db()
+        self.products[0].refresh_from_db()
+        self.assertTrue(review.is_verified_purchase)
+        self.assertEqual(self.products[0].verified_review_count, 1)
@@ -0,0 +1,559 @@
+'''Per-view SQL query budgets.
+
+Every view is driven through the test client against a seeded dataset and
+must stay within a maximum number of SQL queries. A new N+1 query in a
+view or template shows up here as a query count that grows with the
+dataset and fails the build.
+
+Run with ``python manage.py test ecommerce_app``. A table of all
+measurements, with the time each request took, is printed at the end of
+the run. Times are only reported: they depend on the machine, so failing
+on them would make the build flaky.
+'''
+
+import base64
+import re
+import sys
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from cart.models import Order, OrderItem
+from ecommerce_app.object_cache import clear_local_caches
+from ecommerce_app.tests.factories import (
+    PASSWORD, ShopTestCase, create_buyers, create_user
+)
+from leaderboard.ranking import rebuild_leaderboard
+from product.models import Product
+from reviews.aggregates import rebuild_aggregates
+from reviews.models import Review
+from sales.rollups import rebuild_rollups
+from search.index import reindex_queryset
+from store.models import Store
+
+Budget = namedtuple(
+    'Budget',
+    'label method url user data json headers setup max_queries'
+)
+
+
+def budget(label, url, max_queries, method='get', user=None, data=None,
+           json=False, headers=None, setup=None):
+    """Describe the budget of one request.
+
+    :param label: URL name (or API path) shown in the report.
+    :param url: Callable taking the test case and returning the URL.
+    :param max_queries: Maximum number of SQL queries allowed.
+    :param method: HTTP method to use.
+    :param user: Attribute name of the user to log in as, or None.
+    :param data: Callable taking the test case and returning request data.
+    :param json: When True send the data as a JSON body.
+    :param headers: Callable taking the test case and returning extra
+        request headers.
+    :param setup: Callable run with the test case before measuring.
+    :return: Budget tuple.
+    """
+    return Budget(
+        label, method, url, user, data, json, headers, setup, max_queries
+    )
+
+
+def _fill_cart(case):
+    """Put a few products in the buyer's cart.
+
+    :param case: Running test case.
+    """
+    for product in case.products[:3]:
+        case.client.post(
+            reverse('cart_add', args=[product.prod_id]), {'quantity': 2}
+        )
+
+
+def _order_history(case):
+    """Give the buyer a few more orders of several items each.
+
+    :param case: Running test case.
+    """
+    for i in range(4):
+        order = Order.objects.create(
+            user=case.buyer, total_amount=Decimal('20.00')
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(
+                order=order, product=product, quantity=1,
+                price=product.price,
+            )
+            for product in case.products[i:i + 3]
+        )
+
+
+def _product_reviews(case):
+    """Give the budgeted product more than one page of reviews.
+
+    :param case: Running test case.
+    """
+    Review.objects.bulk_create(
+        Review(
+            product=case.product, user=case.buyer,
+            username=case.buyer.username, rating=i % 5 + 1,
+            comment=f'More {i}',
+        )
+        for i in range(30)
+    )
+
+
+def _next_page(url):
+    """Build the URL of the second page of an HTML list.
+
+    :param url: Callable taking the test case and returning the page URL.
+    :return: Callable taking the test case and returning the next URL.
+    """
+    def next_url(case):
+        first = url(case)
+        # next_url is a query string carrying the filters and the cursor
+        return (
+            first.split('?')[0] + case.client.get(first).context['next_url']
+        )
+    return next_url
+
+
+def _warm_cache(case):
+    """Load the budgeted product and store once so their lookups are cached.
+
+    :param case: Running test case.
+    """
+    case.client.get(reverse('product_detail', args=[case.product.prod_id]))
+    case.client.get(reverse('store_detail', args=[case.store.store_id]))
+
+
+def _if_none_match(url):
+    """Build a header that revalidates the current version of a URL.
+
+    :param url: API path to fetch once for its ETag.
+    :return: Callable taking the test case and returning request headers.
+    """
+    def headers(case):
+        return {'HTTP_IF_NONE_MATCH': case.client.get(url)['ETag']}
+    return headers
+
+
+def _basic_auth(user):
+    """Build a Basic authentication header for a seeded user.
+
+    :param user: User instance.
+    :return: Dict of extra request headers.
+    """
+    token = base64.b64encode(f'{user.username}:{PASSWORD}'.encode())
+    return {'HTTP_AUTHORIZATION': f'Basic {token.decode()}'}
+
+
+BUDGETS = [
+    budget('home', lambda t: reverse('home'), 6),
+    budget('home [warm cache]', lambda t: reverse('home'), 0,
+           setup=lambda t: t.client.get(reverse('home'))),
+    # users
+    budget('register', lambda t: reverse('register'), 0),
+    budget('login', lambda t: reverse('login'), 0),
+    budget('login [POST]', lambda t: reverse('login'), 10, method='post',
+           data=lambda t: {'username': 'buyer0', 'password': PASSWORD}),
+    budget('logout', lambda t: reverse('logout'), 4, user='buyer'),
+    budget('password_reset_request',
+           lambda t: reverse('password_reset_request'), 0),
+    budget('password_reset_request [POST]',
+           lambda t: reverse('password_reset_request'), 2, method='post',
+           data=lambda t: {'email': t.buyer.email}),
+    budget('password_reset_confirm',
+           lambda t: reverse('password_reset_confirm', args=[
+               urlsafe_base64_encode(force_bytes(t.buyer.pk)),
+               default_token_generator.make_token(t.buyer),
+           ]), 1),
+    budget('/get/users', lambda t: '/get/users', 2, user='admin_basic'),
+    budget('/get/users/xml', lambda t: '/get/users/xml', 2,
+           user='admin_basic'),
+    budget('/api/register', lambda t: '/api/register', 3, method='post',
+           data=lambda t: {
+               'username': 'newbuyer', 'email': 'new@example.com',
+               'password': PASSWORD, 'first_name': 'New',
+               'last_name': 'Buyer', 'user_type': 'buyer',
+           }),
+    # store
+    budget('store_list', lambda t: reverse('store_list'), 1),
+    budget('store_detail',
+           lambda t: reverse('store_detail', args=[t.store.store_id]), 2),
+    budget('store_detail [warm cache]',
+           lambda t: reverse('store_detail', args=[t.store.store_id]), 1,
+           setup=_warm_cache),
+    budget('store_detail [sorted page 2]',
+           _next_page(
+               lambda t: reverse('store_detail', args=[t.store.store_id])
+               + '?sort=-price'
+           ), 1),
+    budget('store_create', lambda t: reverse('store_create'), 5,
+           user='vendor'),
+    budget('store_update',
+           lambda t: reverse('store_update', args=[t.store.store_id]), 6,
+           user='vendor'),
+    budget('store_delete',
+           lambda t: reverse('store_delete', args=[t.store.store_id]), 6,
+           user='vendor'),
+    budget('store_delete [POST]',
+           lambda t: reverse('store_delete', args=[t.store.store_id]), 10,
+           method='post', user='vendor'),
+    budget('/get/stores', lambda t: '/get/stores', 2),
+    budget('/get/stores [304]', lambda t: '/get/stores', 1,
+           headers=_if_none_match('/get/stores')),
+    budget('/get/stores [page 2]',
+           lambda t: '/get/stores?limit=1&cursor='
+           + t.client.get('/get/stores?limit=1')['X-Next-Cursor'], 2),
+    budget('/get/stores/xml', lambda t: '/get/stores/xml', 2),
+    budget('/get/stores/xml [304]', lambda t: '/get/stores/xml', 1,
+           headers=_if_none_match('/get/stores/xml')),
+    budget('/get/stores/vendor/<id>',
+           lambda t: f'/get/stores/vendor/{t.vendor.pk}', 2),
+    budget('/get/stores/<id>/products',
+           lambda t: f'/get/stores/{t.store.store_id}/products', 1),
+    budget('/get/stores/<id>/products [page 2]',
+           lambda t: f'/get/stores/{t.store.store_id}/products'
+           + '?sort=price&limit=10&cursor=' + t.client.get(
+               f'/get/stores/{t.store.store_id}/products?sort=price&limit=10'
+           )['X-Next-Cursor'], 1),
+    budget('/add/store', lambda t: '/add/store', 3, method='post',
+           user='vendor_basic',
+           data=lambda t: {
+               'store_name': 'Budget Store', 'store_category': 'books',
+               'vendor': t.vendor.pk,
+           }),
+    # product
+    budget('product_list', lambda t: reverse('product_list'), 2),
+    budget('product_list [filtered]',
+           lambda t: reverse('product_list')
+           + '?category=books&min_price=5&max_price=100&sort=price', 2),
+    budget('product_detail',
+           lambda t: reverse('product_detail', args=[t.product.prod_id]), 4),
+    budget('product_detail [warm cache]',
+           lambda t: reverse('product_detail', args=[t.product.prod_id]), 1,
+           setup=_warm_cache),
+    budget('product_detail [reviews page 2]',
+           _next_page(
+               lambda t: reverse('product_detail', args=[t.product.prod_id])
+           ), 1, setup=_product_reviews),
+    budget('product_create', lambda t: reverse('product_create'), 6,
+           user='vendor'),
+    budget('product_update',
+           lambda t: reverse('product_update', args=[t.product.prod_id]), 9,
+           user='vendor'),
+    budget('product_delete',
+           lambda t: reverse('product_delete', args=[t.product.prod_id]), 6,
+           user='vendor'),
+    budget('product_delete [POST]',
+           lambda t: reverse('product_delete', args=[t.product.prod_id]), 7,
+           method='post', user='vendor'),
+    budget('/get/products', lambda t: '/get/products', 2),
+    budget('/get/products [304]', lambda t: '/get/products', 1,
+           headers=_if_none_match('/get/products')),
+    budget('/get/products [filtered]',
+           lambda t: f'/get/products?store={t.store.store_id}&sort=-price',
+           2),
+    budget('/get/products/xml', lambda t: '/get/products/xml', 2),
+    budget('/get/products/xml [304]', lambda t: '/get/products/xml', 1,
+           headers=_if_none_match('/get/products/xml')),
+    budget('/get/products/facets', lambda t: '/get/products/facets', 1),
+    budget('/add/product', lambda t: '/add/product', 7, method='post',
+           user='vendor_basic',
+           data=lambda t: {
+               'name': 'Budget Widget', 'description': 'Cheap and cheerful',
+               'price': '9.99', 'store': t.store.store_id,
+           }),
+    budget('/add/products', lambda t: '/add/products', 9, method='post',
+           user='vendor_basic', json=True,
+           data=lambda t: [
+               {'name': f'Bulk Widget {i}', 'description': 'Batch item',
+                'price': '4.50', 'store': t.store.store_id}
+               for i in range(50)
+           ]),
+    budget('/get/cache/stats', lambda t: '/get/cache/stats', 1,
+           user='admin_basic'),
+    # search
+    budget('search', lambda t: reverse('search') + '?q=widget', 1),
+    budget('/get/search', lambda t: '/get/search?q=widget', 1),
+    # reviews
+    budget('review_list', lambda t: reverse('review_list'), 1),
+    budget('review_list [page 2]',
+           _next_page(lambda t: reverse('review_list')), 1),
+    budget('review_detail',
+           lambda t: reverse('review_detail', args=[t.review.review_id]), 2),
+    budget('review_create',
+           lambda t: reverse('review_create')
+           + f'?product_id={t.product.prod_id}', 6, user='buyer'),
+    budget('review_create [POST]', lambda t: reverse('review_create'), 15,
+           method='post', user='buyer',
+           data=lambda t: {
+               'product': t.product.prod_id, 'rating': 4,
+               'comment': 'Does the job.',
+           }),
+    budget('/get/reviews', lambda t: '/get/reviews', 2),
+    budget('/get/reviews [304]', lambda t: '/get/reviews', 1,
+           headers=_if_none_match('/get/reviews')),
+    budget('/get/reviews [page 2]',
+           lambda t: '/get/reviews?limit=1&cursor='
+           + t.client.get('/get/reviews?limit=1')['X-Next-Cursor'], 2,
+           setup=_product_reviews),
+    budget('/get/reviews/xml', lambda t: '/get/reviews/xml', 2),
+    budget('/get/reviews/xml [304]', lambda t: '/get/reviews/xml', 1,
+           headers=_if_none_match('/get/reviews/xml')),
+    budget('/add/review', lambda t: '/add/review', 11, method='post',
+           user='buyer_basic', json=True,
+           data=lambda t: {
+               'product': t.product.prod_id, 'user': t.buyer.pk,
+               'username': t.buyer.username, 'rating': 5,
+               'comment': 'Great value.',
+           }),
+    budget('/add/reviews', lambda t: '/add/reviews', 15, method='post',
+           user='admin_basic', json=True,
+           data=lambda t: [
+               {'product': t.products[i % 10].prod_id,
+                'user': t.buyers[i % len(t.buyers)].pk,
+                'rating': i % 5 + 1, 'comment': f'Imported {i}'}
+               for i in range(50)
+           ]),
+    # leaderboard
+    budget('/get/leaderboard', lambda t: '/get/leaderboard', 6),
+    budget('/get/leaderboard [category]',
+           lambda t: '/get/leaderboard?category=books&limit=20', 1),
+    # cart
+    budget('cart_view', lambda t: reverse('cart_view'), 6, user='buyer',
+           setup=_fill_cart),
+    budget('cart_add [POST]',
+           lambda t: reverse('cart_add', args=[t.product.prod_id]), 9,
+           method='post', user='buyer', data=lambda t: {'quantity': 1}),
+    budget('cart_update [POST]',
+           lambda t: reverse('cart_update', args=[t.products[0].prod_id]), 7,
+           method='post', user='buyer', data=lambda t: {'quantity': 5},
+           setup=_fill_cart),
+    budget('cart_remove [POST]',
+           lambda t: reverse('cart_remove', args=[t.products[0].prod_id]), 7,
+           method='post', user='buyer', setup=_fill_cart),
+    budget('cart_checkout', lambda t: reverse('cart_checkout'), 6,
+           user='buyer', setup=_fill_cart),
+    budget('cart_checkout [POST]', lambda t: reverse('cart_checkout'), 18,
+           method='post', user='buyer', setup=_fill_cart),
+    budget('api_cart_summary', lambda t: reverse('api_cart_summary'), 6,
+           user='buyer', setup=_fill_cart),
+    budget('api_cart_add [POST]',
+           lambda t: reverse('api_cart_add', args=[t.product.prod_id]), 9,
+           method='post', user='buyer', data=lambda t: {'quantity': 1}),
+    budget('api_cart_update [POST]',
+           lambda t: reverse('api_cart_update', args=[t.products[0].prod_id]),
+           7, method='post', user='buyer', data=lambda t: {'quantity': 3},
+           setup=_fill_cart),
+    budget('api_cart_remove [POST]',
+           lambda t: reverse('api_cart_remove', args=[t.products[0].prod_id]),
+           7, method='post', user='buyer', setup=_fill_cart),
+    budget('api_cart_set [POST]', lambda t: reverse('api_cart_set'), 9,
+           method='post', user='buyer', json=True, setup=_fill_cart,
+           data=lambda t: {'items': [
+               {'product': product.prod_id, 'quantity': index}
+               for index, product in enumerate(t.products)
+           ]}),
+    budget('/cart/get/orders', lambda t: '/cart/get/orders', 7,
+           user='buyer', setup=_order_history),
+    budget('/cart/get/orders [page 2]',
+           lambda t: '/cart/get/orders?limit=2&cursor='
+           + t.client.get('/cart/get/orders?limit=2')['X-Next-Cursor'], 7,
+           user='buyer', setup=_order_history),
+    budget('/cart/get/orders/xml', lambda t: '/cart/get/orders/xml', 7,
+           user='buyer', setup=_order_history),
+    budget('/cart/add/order', lambda t: '/cart/add/order', 3, method='post',
+           user='buyer_basic', json=True,
+           data=lambda t: {
+               'user': t.buyer.pk, 'total_amount': '10.00',
+               'status': 'completed',
+           }),
+    # sales
+    budget('sales_dashboard', lambda t: reverse('sales_dashboard'), 7,
+           user='vendor', setup=lambda t: rebuild_rollups()),
+    budget('/get/sales', lambda t: '/get/sales?days=90', 7, user='vendor',
+           setup=lambda t: rebuild_rollups()),
+]
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class QueryBudgetTests(ShopTestCase):
+    """Check every view against its query budget."""
+
+    buyer_count = 0
+    store_count = 0
+    product_count = 0
+    results = []
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed a small but realistically shaped catalog."""
+        super().setUpTestData()
+        cls.admin = create_user(
+            'admin', 'vendor', first_name='Ada', last_name='Admin',
+            is_staff=True, is_superuser=True,
+        )
+        vendors = [
+            create_user(
+                f'vendor{i}', 'vendor', first_name='Vera',
+                last_name=f'Vendor{i}',
+            )
+            for i in range(3)
+        ]
+        buyers = create_buyers(8, first_name='Ben')
+        categories = [key for key, _ in Store.STORE_CATEGORIES]
+        stores = Store.objects.bulk_create(
+            Store(
+                store_name=f'Store {i}',
+                store_description=f'Everything for {category}',
+                store_category=category,
+                vendor=vendors[i % len(vendors)],
+            )
+            for i, category in enumerate(categories)
+        )
+        stores = list(Store.objects.order_by('store_id'))
+        # Skewed vendor sizes: the first store carries half the catalog
+        Product.objects.bulk_create(
+            Product(
+                name=f'Widget {i}',
+                description=f'Widget number {i} with many fine features',
+                price=Decimal('4.99') + i,
+                store=stores[0] if i % 2 == 0 else stores[i % len(stores)],
+            )
+            for i in range(120)
+        )
+        products = list(Product.objects.order_by('prod_id'))
+        reindex_queryset(Product.objects.all())
+
+        for i, buyer in enumerate(buyers):
+            order = Order.objects.create(
+                user=buyer, total_amount=Decimal('30.00')
+            )
+            OrderItem.objects.bulk_create(
+                OrderItem(
+                    order=order, product=products[(i * 3 + j) % 40],
+                    quantity=1, price=products[(i * 3 + j) % 40].price,
+                )
+                for j in range(3)
+            )
+        Review.objects.bulk_create(
+            Review(
+                product=products[i % 40], user=buyers[i % len(buyers)],
+                username=buyers[i % len(buyers)].username,
+                rating=i % 5 + 1, comment=f'Review {i}',
+                is_verified_purchase=i % 2 == 0,
+            )
+            for i in range(80)
+        )
+
+        rebuild_aggregates()
+        rebuild_leaderboard()
+
+        cls.vendor = vendors[0]
+        cls.buyer = buyers[0]
+        cls.buyers = buyers
+        cls.store = stores[0]
+        cls.products = products
+        cls.product = products[0]
+        cls.review = Review.objects.order_by('review_id').first()
+
+    def setUp(self):
+        # Measure cold caches unless a budget warms them itself
+        cache.clear()
+        clear_local_caches()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Print the budget report for the whole run."""
+        super().tearDownClass()
+        if not cls.results:
+            return
+        header = f"{'view':<36} {'queries':>11} {'ms':>8}  result"
+        lines = ['', 'Query budgets', header, '-' * len(header)]
+        for label, queries, max_queries, ms, ok in cls.results:
+            lines.append(
+                f'{label:<36} {queries:>4} / {max_queries:<4} '
+                f'{ms:>8.1f}  {"ok" if ok else "FAIL"}'
+            )
+        sys.stderr.write('\n'.join(lines) + '\n')
+
+    def _request_kwargs(self, case):
+        """Log in and build the extra arguments for a budgeted request.
+
+        :param case: Budget being measured.
+        :return: Dict of keyword arguments for the test client.
+        """
+        kwargs = {}
+        if case.user in ('buyer', 'vendor'):
+            self.client.force_login(getattr(self, case.user))
+        elif case.user == 'admin_basic':
+            kwargs.update(_basic_auth(self.admin))
+        elif case.user:
+            kwargs.update(_basic_auth(getattr(self, case.user[:-6])))
+        if case.data:
+            kwargs['data'] = case.data(self)
+        if case.json:
+            kwargs['content_type'] = 'application/json'
+        if case.headers:
+            kwargs.update(case.headers(self))
+        return kwargs
+
+    def check_budget(self, case):
+        """Issue one request and compare it with its budget.
+
+        :param case: Budget to check.
+        """
+        kwargs = self._request_kwargs(case)
+        if case.setup:
+            case.setup(self)
+        url = case.url(self)
+        request = getattr(self.client, case.method)
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = request(url, **kwargs)
+            elapsed = (time.perf_counter() - started) * 1000
+        query_count = len(queries)
+
+        ok = query_count <= case.max_queries
+        self.results.append((
+            case.label, query_count, case.max_queries, elapsed, ok
+        ))
+        self.assertLess(response.status_code, 400, case.label)
+        self.assertLessEqual(
+            query_count, case.max_queries,
+            f'{case.label} ran {query_count} queries:\n'
+            + '\n'.join(q['sql'] for q in queries.captured_queries)
+        )
+
+
+def _make_test(case):
+    """Create a test method checking a single budget.
+
+    :param case: Budget to check.
+    :return: Test method.
+    """
+    def test(self):
+        self.check_budget(case)
+    test.__doc__ = f'{case.label} stays within its budget.'
+    return test
+
+
+for _index, _case in enumerate(BUDGETS):
+    _name = re.sub(r'\W+', '_', _case.label).strip('_').lower()
+    setattr(
+        QueryBudgetTests, f'test_budget_{_index:02d}_{_name}',
+        _make_test(_case)
+    )
@@ -0,0 +1,79 @@
+'''Per-product star rating histograms.
+
+The histogram is computed in one grouped query, served from the cache
+afterwards, and recomputed once a review of the product changes.
+'''
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ecommerce_app.tests.factories import ShopTestCase
+from reviews.histogram import rating_histogram
+from reviews.models import Review
+
+
+class RatingHistogramTests(ShopTestCase):
+    """Histogram counts follow the product's reviews."""
+
+    product_count = 1
+    product_name = 'Novel'
+
+    @classmethod
+    def setUpTestData(cls):
+        """Give the product a handful of reviews."""
+        super().setUpTestData()
+        for rating in (5, 5, 4, 1):
+            cls._review(rating)
+
+    @classmethod
+    def _review(cls, rating):
+        """Post one review of the seeded product.
+
+        :param rating: Star rating 1-5.
+        :return: The saved Review.
+        """
+        return Review.objects.create(
+            product=cls.product, user=cls.buyer,
+            username=cls.buyer.username, rating=rating, comment='Noted',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def _counts(self):
+        """Read the histogram as (rating, count) pairs.
+
+        :return: List of tuples from 5 stars down to 1.
+        """
+        return [
+            (bar['rating'], bar['count'])
+            for bar in rating_histogram(self.product.prod_id)
+        ]
+
+    def test_cached_after_one_query(self):
+        """The first read groups the reviews; the next is served cached."""
+        with CaptureQueriesContext(connection) as queries:
+            counts = self._counts()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(counts, [(5, 2), (4, 1), (3, 0), (2, 0), (1, 1)])
+        self.assertEqual(
+            [bar['percent'] for bar in rating_histogram(self.product.pk)],
+            [50, 25, 0, 0, 25],
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self._counts()
+        self.assertEqual(len(queries), 0)
+
+    def test_review_changes_invalidate(self):
+        """Adding, editing and deleting reviews all refresh the counts."""
+        self._counts()
+        review = self._review(3)
+        self.assertEqual(self._counts()[2], (3, 1))
+
+        review.rating = 2
+        review.save()
+        self.assertEqual(self._counts()[2:4], [(3, 0), (2, 1)])
+
+        review.delete()
+        self.assertEqual(self._counts()[3], (2, 0))
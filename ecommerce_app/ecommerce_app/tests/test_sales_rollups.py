@@ -0,0 +1,155 @@
+'''Daily sales rollups kept by checkout and by the rebuild command.
+
+Orders placed through checkout, orders whose status changes and seeded
+orders must leave the rollups exactly as a full rebuild from the order
+history would, and the rebuild must repair rows that drifted. Reports
+leave out deleted stores and products.
+'''
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from cart.checkout import CheckoutLine, place_order
+from cart.models import Order
+from ecommerce_app.tests.factories import ShopTestCase
+from product.deletion import soft_delete_product, soft_delete_store
+from sales.models import ProductDailySales, StoreDailySales
+from sales.rollups import rebuild_rollups
+
+
+class SalesRollupTests(ShopTestCase):
+    """Checkout increments agree with a rebuild from the orders."""
+
+    store_count = 2
+    product_count = 4
+    product_name = 'Book'
+
+    @classmethod
+    def price_of(cls, index):
+        """Price every product differently, so revenues tell them apart.
+
+        :param index: Position of the product.
+        :return: Decimal price.
+        """
+        return Decimal('3.25') * (index + 1)
+
+    def _buy(self, *quantities):
+        """Check out one order with the given quantity of each product.
+
+        :param quantities: Units of each seeded product, 0 to skip it.
+        :return: The placed Order.
+        """
+        return place_order(self.buyer, [
+            CheckoutLine(product, quantity, product.price)
+            for product, quantity in zip(self.products, quantities)
+            if quantity
+        ])
+
+    def _rollups(self):
+        """Read every rollup row as comparable tuples.
+
+        :return: Tuple (store rows, product rows).
+        """
+        fields = ('day', 'units', 'revenue', 'orders')
+        return (
+            sorted(StoreDailySales.objects.values_list('store', *fields)),
+            sorted(ProductDailySales.objects.values_list(
+                'product', 'store', *fields
+            )),
+        )
+
+    def test_checkout_matches_rebuild(self):
+        """Rebuilding after several checkouts changes nothing."""
+        self._buy(1, 2, 0, 0)
+        self._buy(3, 0, 1, 0)
+        self._buy(0, 0, 0, 5)
+        store_rows, product_rows = self._rollups()
+        self.assertEqual(
+            [(units, orders) for _, _, units, _, orders in store_rows],
+            [(5, 2), (7, 2)],
+        )
+        self.assertEqual(len(product_rows), 4)
+
+        days, fixed = rebuild_rollups()
+        self.assertEqual((days, fixed), (1, 0))
+        self.assertEqual(self._rollups(), (store_rows, product_rows))
+
+    def test_rebuild_repairs_drift(self):
+        """Wrong, missing and stale rows are all corrected."""
+        self._buy(1, 1, 1, 1)
+        expected = self._rollups()
+        StoreDailySales.objects.filter(
+            store=self.products[0].store
+        ).update(units=99)
+        ProductDailySales.objects.filter(product=self.products[1]).delete()
+        ProductDailySales.objects.create(
+            product=self.products[2], store=self.products[2].store,
+            day=ProductDailySales.objects.first().day - timedelta(days=1),
+            units=1, revenue=Decimal('1.00'), orders=1,
+        )
+
+        days, fixed = rebuild_rollups()
+        self.assertEqual((days, fixed), (2, 3))
+        self.assertEqual(self._rollups(), expected)
+
+    def test_status_change_matches_rebuild(self):
+        """Cancelling and completing again move an order out and back."""
+        self._buy(1, 2, 0, 0)
+        placed = self._rollups()
+        order = self._buy(0, 1, 0, 3)
+
+        order = Order.objects.get(pk=order.pk)
+        order.status = 'cancelled'
+        order.save()
+        self.assertEqual(self._rollups(), placed)
+        self.assertEqual(rebuild_rollups()[1], 0)
+
+        order.status = 'completed'
+        order.save()
+        completed = self._rollups()
+        self.assertEqual(
+            sum(units for _, _, units, _, _ in completed[0]), 7
+        )
+        self.assertEqual(rebuild_rollups()[1], 0)
+
+        # Saving without a loaded status still lands on the rebuilt totals
+        Order(
+            pk=order.pk, user=self.buyer, created_at=order.created_at,
+            total_amount=order.total_amount, status='pending',
+        ).save()
+        self.assertEqual(self._rollups(), placed)
+
+    def test_seeded_orders_are_rolled_up(self):
+        """Seeding rebuilds the rollups of the orders it wrote."""
+        call_command(
+            'seed_catalog', vendors=1, stores=1, buyers=2, products=5,
+            orders=20, skip_index=True, stdout=StringIO(),
+        )
+        self.assertTrue(StoreDailySales.objects.exists())
+        seeded = self._rollups()
+        days, fixed = rebuild_rollups()
+        self.assertEqual(fixed, 0)
+        self.assertEqual(self._rollups(), seeded)
+
+    def test_report_skips_deleted_stores_and_products(self):
+        """Rollups of deleted stores and products drop out of the report."""
+        self._buy(1, 1, 1, 1)
+        soft_delete_store(self.stores[1])
+        soft_delete_product(self.products[0])
+        self.client.force_login(self.vendor)
+        report = self.client.get('/get/sales').json()
+        self.assertEqual(
+            [store['store'] for store in report['stores']],
+            [self.stores[0].pk],
+        )
+        self.assertEqual(
+            [product['product'] for product in report['top_products']],
+            [self.products[2].pk],
+        )
+        response = self.client.get(reverse('sales_dashboard'))
+        self.assertNotContains(response, self.products[1].name)
+        self.assertNotContains(response, self.stores[1].store_name)
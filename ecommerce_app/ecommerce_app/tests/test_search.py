@@ -0,0 +1,185 @@
+'''Ranked product search and the index that follows catalog changes.
+
+Name matches outrank store matches, which outrank description matches;
+postings follow product saves and deletes and store renames; queries made
+only of stop words match nothing, terms differing only in case, accents
+or width are one term, and the cursor walks every result once.
+'''
+
+from ecommerce_app.tests.factories import (
+    ShopTestCase, create_product, create_store
+)
+from product.deletion import soft_delete_product
+from search.index import (
+    DESCRIPTION_WEIGHT, NAME_WEIGHT, STORE_WEIGHT, search_products,
+    tokenize,
+)
+from search.models import SearchPosting
+
+
+class SearchTests(ShopTestCase):
+    """Search results agree with the current catalog."""
+
+    buyer_count = 0
+    store_count = 0
+    product_count = 0
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed a lantern shop and a camping shop."""
+        super().setUpTestData()
+        cls.lantern_shop = create_store(
+            cls.vendor, 'Lantern Supplies', 'outdoor',
+            store_description='Lights',
+        )
+        cls.camp_shop = create_store(
+            cls.vendor, 'Camp Corner', 'outdoor', store_description='Gear',
+        )
+        cls.lantern = cls._product(
+            'Brass Lantern', 'Warm light', cls.camp_shop
+        )
+        cls.tent = cls._product('Dome Tent', 'Sleeps two', cls.lantern_shop)
+        cls.stove = cls._product(
+            'Camp Stove', 'Pairs with the lantern', cls.camp_shop
+        )
+
+    @staticmethod
+    def _product(name, description, store):
+        """Create a product; its save indexes it.
+
+        :param name: Product name.
+        :param description: Product description.
+        :param store: Store the product belongs to.
+        :return: Product instance.
+        """
+        return create_product(store, name, description=description)
+
+    def _names(self, query, **kwargs):
+        """Search and return the names of the matching products.
+
+        :param query: Raw search string.
+        :return: List of product names, best match first.
+        """
+        return [
+            product.name for product in search_products(query, **kwargs).items
+        ]
+
+    def test_ranking_by_where_terms_occur(self):
+        """A name match beats a store match beats a description match."""
+        page = search_products('lantern')
+        self.assertEqual(
+            [(product.name, product.score) for product in page.items],
+            [
+                ('Brass Lantern', NAME_WEIGHT),
+                ('Dome Tent', STORE_WEIGHT),
+                ('Camp Stove', DESCRIPTION_WEIGHT),
+            ],
+        )
+
+    def test_all_terms_must_match(self):
+        """Every query term has to occur in a result."""
+        self.assertEqual(self._names('lantern tent'), ['Dome Tent'])
+        self.assertEqual(self._names('lantern kayak'), [])
+
+    def test_save_reindexes_product(self):
+        """Renaming a product replaces its terms."""
+        self.lantern.name = 'Brass Torch'
+        self.lantern.save()
+        self.assertEqual(self._names('torch'), ['Brass Torch'])
+        self.assertNotIn('Brass Torch', self._names('lantern'))
+
+    def test_delete_unindexes_product(self):
+        """Deleted products leave the results, and purged ones the index."""
+        soft_delete_product(self.stove)
+        self.assertEqual(self._names('stove'), [])
+        self.tent.delete()
+        self.assertEqual(self._names('tent'), [])
+        self.assertFalse(
+            SearchPosting.objects.filter(product=self.tent.pk).exists()
+        )
+
+    def test_store_rename_reindexes_its_products(self):
+        """A store's products are found by its new name only."""
+        self.lantern_shop.store_name = 'Canvas House'
+        self.lantern_shop.save()
+        self.assertEqual(self._names('canvas'), ['Dome Tent'])
+        self.assertEqual(
+            self._names('lantern'), ['Brass Lantern', 'Camp Stove']
+        )
+
+    def test_stop_words_only_match_nothing(self):
+        """A query of stop words returns an empty list, not everything."""
+        self.assertEqual(self._names('the and of'), [])
+        response = self.client.get('/get/search', {'q': 'with the'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+        self.assertNotIn('Link', response)
+
+    def test_accents_and_case_fold_to_one_term(self):
+        """Variants of a word share one posting per product, so they
+        cannot collide in an accent-insensitive primary key."""
+        # The last word is written in full-width letters
+        wide = '\uff32\uff45\uff53\uff55\uff4d\uff45'
+        self.assertEqual(
+            tokenize(f'Résumé RESUME resume {wide}'), ['resume'] * 4
+        )
+        template = self._product(
+            'Résumé Template', 'A resume layout, RESUMÉ ready', self.camp_shop
+        )
+        guide = self._product('Resume Guide', 'Writing tips', self.camp_shop)
+        self.assertEqual(
+            SearchPosting.objects.get(term='resume', product=template).weight,
+            NAME_WEIGHT + 2 * DESCRIPTION_WEIGHT,
+        )
+        self.assertFalse(
+            SearchPosting.objects.exclude(term__regex=r'^[a-z0-9_]+$')
+            .filter(product__in=[template, guide]).exists()
+        )
+        for query in ('resume', 'RÉSUMÉ', 'résumé template'):
+            with self.subTest(query=query):
+                self.assertEqual(self._names(query)[0], 'Résumé Template')
+        self.assertEqual(
+            self._names('resume'), ['Résumé Template', 'Resume Guide']
+        )
+
+    def test_cursor_walks_every_result_once(self):
+        """Following the cursor yields each match once, in rank order."""
+        for i in range(4):
+            self._product(f'Lantern {i}', 'Spare', self.camp_shop)
+        expected = self._names('lantern', limit=10)
+        self.assertEqual(len(expected), 7)
+
+        seen, cursor = [], None
+        while True:
+            page = search_products('lantern', cursor=cursor, limit=3)
+            seen += [product.name for product in page.items]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+
+        response = self.client.get('/get/search', {'q': 'lantern', 'limit': 3})
+        self.assertEqual(len(response.json()), 3)
+        cursor = response['X-Next-Cursor']
+        response = self.client.get(
+            '/get/search', {'q': 'lantern', 'limit': 3, 'cursor': cursor}
+        )
+        self.assertEqual(
+            [item['name'] for item in response.json()], expected[3:6]
+        )
+        # Several terms are scored together and paged the same way
+        self._product('Lantern Tent', 'Glows', self.lantern_shop)
+        expected = self._names('lantern tent', limit=10)
+        self.assertEqual(expected, ['Lantern Tent', 'Dome Tent'])
+        page = search_products('lantern tent', limit=1)
+        self.assertEqual(
+            [product.name for product in search_products(
+                'lantern tent', cursor=page.next_cursor, limit=1
+            ).items],
+            expected[1:],
+        )
+
+        response = self.client.get(
+            '/get/search', {'q': 'lantern', 'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(response.status_code, 400)
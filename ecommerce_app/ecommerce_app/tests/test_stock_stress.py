@@ -0,0 +1,165 @@
+'''Stock reservation at checkout under concurrency.
+
+Several threads check out the same hot product at once, each through its
+own database connection. However the statements interleave, exactly as
+many units are sold as were in stock and the counter never goes below
+zero. Throughput of the contended checkouts is printed at the end.
+
+The stress test needs a database that serves several connections to the
+test database (MySQL, PostgreSQL); it is skipped on in-memory SQLite.
+Scale it with ``STOCK_STRESS_THREADS`` (default 8).
+'''
+
+import os
+import sys
+import threading
+import time
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Sum
+from django.test import (
+    TransactionTestCase, override_settings, skipUnlessDBFeature
+)
+
+from cart.checkout import CheckoutLine, OutOfStock, place_order
+from cart.models import Order, OrderItem
+from ecommerce_app.tests.factories import (
+    ShopTestCase, create_buyers, create_product, create_store, create_user
+)
+from product.models import Product
+
+THREADS = int(os.getenv('STOCK_STRESS_THREADS', '8'))
+ATTEMPTS_PER_THREAD = 10
+STOCK = THREADS * ATTEMPTS_PER_THREAD * 5 // 8
+
+
+def _stocked_products(store, stocks):
+    """Create one product per stock level in a store.
+
+    :param store: Store the products belong to.
+    :param stocks: Stock of each product, None for untracked.
+    :return: List of Products.
+    """
+    return [
+        create_product(
+            store, f'Hot item {i}', Decimal('9.99'), stock=stock
+        )
+        for i, stock in enumerate(stocks)
+    ]
+
+
+class StockReservationTests(ShopTestCase):
+    """A shortage on any line rolls back the whole order."""
+
+    product_count = 0
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed three products, one of them untracked."""
+        super().setUpTestData()
+        cls.products = _stocked_products(cls.store, [5, 1, None])
+
+    def _lines(self, *quantities):
+        """Build checkout lines from freshly loaded products.
+
+        :param quantities: Units wanted of each seeded product.
+        :return: List of CheckoutLine tuples.
+        """
+        return [
+            CheckoutLine(
+                Product.objects.get(pk=product.pk), quantity, product.price
+            )
+            for product, quantity in zip(self.products, quantities)
+            if quantity
+        ]
+
+    def _stock(self):
+        """Read the current stock of the seeded products.
+
+        :return: List of stock values in product order.
+        """
+        products = Product.objects.order_by('prod_id')
+        return list(products.values_list('stock', flat=True))
+
+    def test_order_takes_stock(self):
+        """Ordered units are taken from tracked products only."""
+        place_order(self.buyer, self._lines(2, 1, 7))
+        self.assertEqual(self._stock(), [3, 0, None])
+
+    def test_shortage_rolls_back_every_line(self):
+        """One short line leaves stock and orders untouched."""
+        with self.assertRaises(OutOfStock) as raised:
+            place_order(self.buyer, self._lines(2, 3, 1))
+        self.assertEqual(self._stock(), [5, 1, None])
+        self.assertFalse(Order.objects.exists())
+        (line, available), = raised.exception.shortages
+        self.assertEqual(line.product.pk, self.products[1].pk)
+        self.assertEqual(available, 1)
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+@override_settings(X_TWEETS_ENABLED=False)
+class StockStressTests(TransactionTestCase):
+    """Concurrent checkouts of one hot product never oversell."""
+
+    def setUp(self):
+        store = create_store(create_user('vendor', 'vendor'), 'Hot Deals')
+        self.buyers = create_buyers(THREADS)
+        (self.product,) = _stocked_products(store, [STOCK])
+
+    def _checkout_loop(self, buyer, start, outcomes):
+        """Repeatedly buy one unit of the hot product.
+
+        :param buyer: Buyer placing the orders.
+        :param start: Barrier releasing all threads at once.
+        :param outcomes: Shared list collecting each attempt's result.
+        """
+        try:
+            start.wait()
+            for _ in range(ATTEMPTS_PER_THREAD):
+                product = Product.objects.get(pk=self.product.pk)
+                line = CheckoutLine(product, 1, product.price)
+                try:
+                    place_order(buyer, [line])
+                except OutOfStock:
+                    outcomes.append('short')
+                except Exception as exc:
+                    outcomes.append(f'error: {exc}')
+                else:
+                    outcomes.append('sold')
+        finally:
+            connection.close()
+
+    def test_no_oversell_under_contention(self):
+        """N threads racing for the same stock sell exactly the stock."""
+        outcomes = []
+        start = threading.Barrier(THREADS)
+        threads = [
+            threading.Thread(
+                target=self._checkout_loop, args=(buyer, start, outcomes)
+            )
+            for buyer in self.buyers
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        errors = [outcome for outcome in outcomes if outcome[:5] == 'error']
+        self.assertEqual(errors, [])
+        self.product.refresh_from_db()
+        sold = OrderItem.objects.aggregate(units=Sum('quantity'))['units']
+        self.assertEqual(self.product.stock, 0)
+        self.assertEqual(sold, STOCK)
+        self.assertEqual(outcomes.count('sold'), STOCK)
+        self.assertEqual(Order.objects.count(), STOCK)
+
+        attempts = len(outcomes)
+        sys.stderr.write(
+            f'\nStock stress: {THREADS} threads, {attempts} checkouts of '
+            f'one product ({STOCK} in stock) in {elapsed * 1000:.0f} ms, '
+            f'{attempts / elapsed:.0f} checkouts/s\n'
+        )
@@ -25,14 +25,16 @@ from django.contrib import admin
 from django.urls import path, include
 from django.shortcuts import render
 
+from leaderboard.ranking import home_leaderboard
+
 
 def home(request):
-    """Render the homepage.
+    """Render the homepage with the top-rated products per category.
 
     :param request: Django HttpRequest.
     :return: Rendered homepage.
     """
-    return render(request, 'home.html')
+    return render(request, 'home.html', {'leaderboard': home_leaderboard()})
 
 
 urlpatterns = [
@@ -40,8 +42,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
 ]
 
-''' Including URL patterns from product, store, and reviews apps
-into the main ecommerce_app URL configuration.
+''' Including URL patterns from product, store, reviews, cart, search,
+sales and leaderboard apps into the main ecommerce_app URL configuration.
 '''
 
 urlpatterns += [
@@ -50,4 +52,7 @@ urlpatterns += [
     path('', include('store.urls')),
     path('', include('reviews.urls')),
     path('cart/', include('cart.urls')),
+    path('', include('search.urls')),
+    path('', include('sales.urls')),
+    path('', include('leaderboard.urls')),
 ]
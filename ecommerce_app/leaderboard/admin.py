@@ -0,0 +1,14 @@
+from django.contrib import admin
+from .models import LeaderboardEntry
+
+# Register leaderboard rows for admin
+
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = (
+        'product', 'category', 'score', 'review_count',
+        'verified_review_count',
+    )
+    list_filter = ('category',)
+    raw_id_fields = ('product',)
@@ -0,0 +1,37 @@
+'''Management command to backfill and reconcile the leaderboard.
+
+Review changes refresh the rows of their products as they happen; run
+this once after installing the leaderboard to backfill it, and
+periodically (e.g. nightly from cron) to repair rows that drifted, such
+as those of products moved to a store in another category.
+'''
+
+from django.core.management.base import BaseCommand
+
+from leaderboard.ranking import REBUILD_CHUNK_SIZE, rebuild_leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Recompute the top-rated leaderboard of every product.'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        :param parser: Argument parser for the command.
+        """
+        parser.add_argument(
+            '--chunk-size', type=int, default=REBUILD_CHUNK_SIZE,
+            help='Number of products checked per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        """Compare every product's row with its aggregates and fix drift.
+
+        :return: None.
+        """
+        checked, fixed = rebuild_leaderboard(
+            chunk_size=options['chunk_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} products, corrected {fixed} rows.'
+        ))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.10 on 2026-10-17 03:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Initial migration for the top-rated product leaderboard."""
+
+    initial = True
+
+    dependencies = [
+        ('product', '0005_product_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('product', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    primary_key=True,
+                    related_name='leaderboard_entry',
+                    serialize=False,
+                    to='product.product',
+                )),
+                ('category', models.CharField(
+                    choices=[
+                        ('electronics', 'Electronics'),
+                        ('fashion', 'Fashion'),
+                        ('groceries', 'Groceries'),
+                        ('home_appliances', 'Home Appliances'),
+                        ('books', 'Books'),
+                        ('toys', 'Toys'),
+                    ],
+                    max_length=50)),
+                ('score', models.DecimalField(
+                    decimal_places=4, max_digits=5)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('verified_review_count', models.PositiveIntegerField(
+                    default=0)),
+            ],
+            options={
+                'ordering': ['category', '-score', 'product'],
+                'indexes': [
+                    models.Index(
+                        fields=['category', '-score', 'product'],
+                        name='leaderboard_rank_idx',
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+'''Top-rated product leaderboard.
+Includes fields:
+- product (primary key) and the store category it is ranked in
+- score: Bayesian average rating, verified purchases weighted up
+- review_count and verified_review_count the score was computed from
+
+Rows are refreshed whenever a product's review aggregates change, so a
+top-N list is one range scan of the (category, score) index.
+``rebuild_leaderboard`` backfills and reconciles them.
+'''
+
+from django.db import models
+from product.models import Product
+from store.models import Store
+
+
+class LeaderboardEntry(models.Model):
+    """Ranking score of one reviewed product"""
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='leaderboard_entry'
+    )
+    # Copied from the product's store so a category is read without a join
+    category = models.CharField(
+        max_length=50,
+        choices=Store.STORE_CATEGORIES
+    )
+    score = models.DecimalField(max_digits=5, decimal_places=4)
+    review_count = models.PositiveIntegerField(default=0)
+    verified_review_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        """Return a readable label for the leaderboard row.
+
+        :return: Human-readable label.
+        """
+        return f'Product {self.product_id} in {self.category}: {self.score}'
+
+    class Meta:
+        ordering = ['category', '-score', 'product']
+        indexes = [
+            # Top-N of one category, best first
+            models.Index(
+                fields=['category', '-score', 'product'],
+                name='leaderboard_rank_idx',
+            ),
+        ]
@@ -0,0 +1,232 @@
+'''Rank products per store category by a Bayesian average rating.
+Includes:
+- Scoring a product from its review aggregates
+- Refreshing the rows of products whose aggregates just changed
+- Rebuilding every row in product chunks, fixing drift
+- Reading the top products of one or every category
+
+The score pulls the product's average rating towards
+``LEADERBOARD_PRIOR_MEAN`` as if it had ``LEADERBOARD_PRIOR_WEIGHT``
+extra reviews of that rating. Verified purchases count
+``LEADERBOARD_VERIFIED_WEIGHT`` times, so they move a product away from
+the prior faster than unverified reviews.
+'''
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from ecommerce_app.pagination import iter_keyset_chunks
+from product.models import Product
+from store.models import Store
+from .models import LeaderboardEntry
+
+REBUILD_CHUNK_SIZE = 1000
+HOME_LEADERBOARD_SIZE = 5
+HOME_CACHE_KEY = 'leaderboard:home'
+ENTRY_FIELDS = ('category', 'score', 'review_count', 'verified_review_count')
+
+
+def bayesian_score(review_count, rating_total, verified_review_count,
+                   verified_rating_total):
+    """Score a product from its review aggregates.
+
+    Each review adds its weight to the votes and its rating times that
+    weight to the rating sum, so verified reviews pull the score towards
+    their own ratings rather than the plain average.
+
+    :param review_count: Number of reviews.
+    :param rating_total: Sum of their star ratings.
+    :param verified_review_count: Number of verified purchase reviews.
+    :param verified_rating_total: Sum of the verified reviews' ratings.
+    :return: Decimal score between 1 and 5 with four decimal places.
+    """
+    prior_mean = settings.LEADERBOARD_PRIOR_MEAN
+    prior_weight = settings.LEADERBOARD_PRIOR_WEIGHT
+    extra_weight = settings.LEADERBOARD_VERIFIED_WEIGHT - 1
+    votes = review_count + extra_weight * verified_review_count
+    ratings = rating_total + extra_weight * verified_rating_total
+    score = (prior_weight * prior_mean + ratings) / (prior_weight + votes)
+    return Decimal(score).quantize(Decimal('0.0001'))
+
+
+def _fresh_entries(product_ids):
+    """Compute the leaderboard rows of some products from their aggregates.
+
+    The product rows are locked, so the aggregates read are the latest
+    committed ones and cannot change until the caller's transaction ends.
+
+    :param product_ids: Product primary keys.
+    :return: Dict of unsaved LeaderboardEntry by product id, leaving out
+        products without reviews.
+    """
+    # Lock only the products, not their stores, where the backend allows
+    of = ('self',) if connection.features.has_select_for_update_of else ()
+    rows = (
+        Product.objects.select_for_update(of=of)
+        .filter(prod_id__in=product_ids, review_count__gt=0)
+        .values_list(
+            'prod_id', 'review_count', 'rating_total',
+            'verified_review_count', 'verified_rating_total',
+            'store__store_category',
+        )
+    )
+    return {
+        prod_id: LeaderboardEntry(
+            product_id=prod_id,
+            category=category,
+            score=bayesian_score(
+                count, total, verified, verified_total
+            ),
+            review_count=count,
+            verified_review_count=verified,
+        )
+        for prod_id, count, total, verified, verified_total, category in rows
+    }
+
+
+def _save_entries(entries):
+    """Insert or update leaderboard rows.
+
+    :param entries: Unsaved LeaderboardEntry instances.
+    """
+    if not entries:
+        return
+    # MySQL upserts on any unique key and rejects an explicit target
+    unique_fields = None
+    if connection.features.supports_update_conflicts_with_target:
+        unique_fields = ['product']
+    LeaderboardEntry.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=ENTRY_FIELDS,
+    )
+
+
+def refresh_products(product_ids):
+    """Bring the rows of some products up to date after a review change.
+
+    Call it in the transaction that changed the products' review
+    aggregates. Products left without reviews drop off the leaderboard.
+
+    :param product_ids: Primary keys of the products that changed.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    with transaction.atomic(savepoint=False):
+        fresh = _fresh_entries(product_ids)
+        _save_entries(list(fresh.values()))
+        unranked = product_ids - fresh.keys()
+        if unranked:
+            LeaderboardEntry.objects.filter(
+                product_id__in=unranked
+            ).delete()
+
+
+def rebuild_leaderboard(chunk_size=REBUILD_CHUNK_SIZE):
+    """Recompute every leaderboard row from the product aggregates.
+
+    Products are processed in primary-key chunks, one transaction each;
+    only rows that differ are written.
+
+    :param chunk_size: Number of products per transaction.
+    :return: Tuple (products checked, rows inserted, changed or deleted).
+    """
+    checked = fixed = 0
+    chunks = iter_keyset_chunks(
+        Product.objects.only('prod_id'), ('prod_id',), chunk_size
+    )
+    for chunk in chunks:
+        ids = [product.prod_id for product in chunk]
+        with transaction.atomic():
+            fresh = _fresh_entries(ids)
+            current = {
+                entry.product_id: entry
+                for entry in LeaderboardEntry.objects.filter(
+                    product_id__in=ids
+                )
+            }
+            changed = [
+                entry for product_id, entry in fresh.items()
+                if product_id not in current or any(
+                    getattr(entry, field)
+                    != getattr(current[product_id], field)
+                    for field in ENTRY_FIELDS
+                )
+            ]
+            _save_entries(changed)
+            stale = current.keys() - fresh.keys()
+            if stale:
+                LeaderboardEntry.objects.filter(
+                    product_id__in=stale
+                ).delete()
+        checked += len(ids)
+        fixed += len(changed) + len(stale)
+    return checked, fixed
+
+
+def entry_data(entry):
+    """Describe a leaderboard row and its product.
+
+    :param entry: LeaderboardEntry with ``product`` loaded.
+    :return: Dict of JSON-ready values.
+    """
+    return {
+        'product': entry.product_id,
+        'name': entry.product.name,
+        'price': str(entry.product.price),
+        'score': str(entry.score),
+        'avg_rating': str(entry.product.avg_rating),
+        'review_count': entry.review_count,
+        'verified_review_count': entry.verified_review_count,
+    }
+
+
+def top_products(category, limit):
+    """Read the best-scored products of a category.
+
+    :param category: Store category key.
+    :param limit: Number of products to return.
+    :return: List of dicts as returned by :func:`entry_data`.
+    """
+    # Rows of deleted products stay until the purge removes them
+    entries = (
+        LeaderboardEntry.objects.filter(
+            category=category, product__deleted_at__isnull=True
+        )
+        .select_related('product')
+        .order_by('-score', 'product')[:limit]
+    )
+    return [entry_data(entry) for entry in entries]
+
+
+def home_leaderboard():
+    """Return the top products of every category for the homepage.
+
+    Cached for ``LEADERBOARD_CACHE_TIMEOUT`` seconds, so a review may take
+    that long to show on the homepage.
+
+    :return: List of dicts with category, label and products, leaving
+        out categories without reviewed products.
+    """
+    board = cache.get(HOME_CACHE_KEY)
+    if board is None:
+        board = []
+        for category, label in Store.STORE_CATEGORIES:
+            products = top_products(category, HOME_LEADERBOARD_SIZE)
+            if products:
+                board.append({
+                    'category': category, 'label': label,
+                    'products': products,
+                })
+        cache.set(HOME_CACHE_KEY, board, settings.LEADERBOARD_CACHE_TIMEOUT)
+    return board
+
+
+def invalidate_home_leaderboard():
+    """Drop the cached homepage leaderboard, e.g. after a deletion."""
+    cache.delete(HOME_CACHE_KEY)
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import LeaderboardEntry
+from .ranking import refresh_products
+from product.models import Product
+from store.models import Store
+
+
+@receiver(post_save, sender=Store)
+def store_leaderboard_category(sender, instance, created, raw=False,
+                               **kwargs):
+    # Move the store's products when its category changes
+    if raw or created:
+        return
+    LeaderboardEntry.objects.filter(product__store=instance).exclude(
+        category=instance.store_category
+    ).update(category=instance.store_category)
+
+
+@receiver(post_save, sender=Product)
+def product_leaderboard_refresh(sender, instance, created, raw=False,
+                                **kwargs):
+    # The product may have moved to a store in another category
+    if raw or created:
+        return
+    refresh_products([instance.prod_id])
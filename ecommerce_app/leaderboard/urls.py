@@ -0,0 +1,10 @@
+'''URL patterns for leaderboard app
+Including:
+- JSON top-rated products per store category
+'''
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('get/leaderboard', views.view_leaderboard),
+]
@@ -0,0 +1,40 @@
+'''Leaderboard views
+Includes:
+- JSON top-rated products of one or every store category
+
+Reads only the ranked leaderboard rows, never the reviews.
+'''
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.decorators import api_view
+
+from ecommerce_app.pagination import get_page_size
+from store.models import Store
+from .ranking import top_products
+
+
+@api_view(['GET'])
+def view_leaderboard(request):
+    """Return the top-rated products in JSON format.
+
+    ``?category=`` picks one store category; without it every category
+    is returned. ``?limit=`` sets the number of products per category.
+
+    :param request: Django HttpRequest.
+    :return: JsonResponse with a list of products, or lists by category.
+    """
+    limit = get_page_size(
+        request, settings.LEADERBOARD_SIZE, settings.LEADERBOARD_MAX_SIZE
+    )
+    categories = dict(Store.STORE_CATEGORIES)
+    category = request.GET.get('category')
+    if category is None:
+        return JsonResponse({
+            key: top_products(key, limit) for key in categories
+        })
+    if category not in categories:
+        return JsonResponse(
+            {'category': [f'Choose one of: {", ".join(categories)}.']},
+            status=status.HTTP_400_BAD_REQUEST)
+    return JsonResponse(top_products(category, limit), safe=False)
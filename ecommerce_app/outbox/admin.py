@@ -0,0 +1,28 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import OutboxMessage
+
+# Register outbox messages for admin
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        'message_id', 'subject', 'status', 'attempts', 'next_attempt_at',
+        'created_at', 'sent_at',
+    )
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'recipients')
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected messages')
+    def requeue(self, request, queryset):
+        """Give dead messages a fresh set of attempts.
+
+        :param request: Django HttpRequest.
+        :param queryset: Selected messages.
+        """
+        count = queryset.exclude(status='sent').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'{count} messages requeued.')
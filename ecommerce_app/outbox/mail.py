@@ -0,0 +1,26 @@
+'''Queue emails for delivery by the ``send_outbox`` worker.'''
+
+from django.conf import settings
+
+from .models import OutboxMessage
+
+
+def queue_mail(subject, body, recipient_list, from_email=None):
+    """Queue an email instead of sending it during the request.
+
+    Call it inside the transaction that makes the email true (for example
+    the one creating an order): the message is only delivered if that
+    transaction commits.
+
+    :param subject: Email subject.
+    :param body: Plain text body.
+    :param recipient_list: List of recipient addresses.
+    :param from_email: Sender address, DEFAULT_FROM_EMAIL when None.
+    :return: Saved OutboxMessage.
+    """
+    return OutboxMessage.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
@@ -0,0 +1,73 @@
+'''Management command that delivers queued emails.
+
+Run it from cron, or keep it running with ``--loop`` next to the web
+server. Several workers may run at once; each claims its own batches.
+'''
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from outbox.sender import drain
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails in batches, retrying failures with backoff.'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        :param parser: Argument parser for the command.
+        """
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE,
+            help='Messages sent over one mail server connection.'
+        )
+        parser.add_argument(
+            '--max-attempts', type=int,
+            default=settings.OUTBOX_MAX_ATTEMPTS,
+            help='Attempts before a message is marked dead.'
+        )
+        parser.add_argument(
+            '--backoff', type=int, default=settings.OUTBOX_RETRY_BACKOFF,
+            help='Seconds to wait after the first failure; doubled after '
+                 'each further failure.'
+        )
+        parser.add_argument(
+            '--max-delay', type=int,
+            default=settings.OUTBOX_RETRY_MAX_DELAY,
+            help='Longest wait between two attempts, in seconds.'
+        )
+        parser.add_argument(
+            '--lease', type=int, default=settings.OUTBOX_LEASE_SECONDS,
+            help='Seconds a claimed batch is reserved for before another '
+                 'worker may retry it.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling for new messages instead of exiting.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Seconds between polls when running with --loop.'
+        )
+
+    def handle(self, *args, **options):
+        """Drain the outbox once, or forever with --loop.
+
+        :return: None.
+        """
+        while True:
+            result = drain(
+                options['batch_size'], options['max_attempts'],
+                options['backoff'], options['max_delay'], options['lease'],
+            )
+            if any(result) or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Sent {result.sent}, retrying {result.retrying}, '
+                    f'dead {result.dead}.'
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
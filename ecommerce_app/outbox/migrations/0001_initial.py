@@ -0,0 +1,51 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Initial migration for the email outbox."""
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('message_id', models.BigAutoField(
+                    primary_key=True, serialize=False)),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('from_email', models.CharField(max_length=254)),
+                ('recipients', models.JSONField()),
+                ('status', models.CharField(
+                    choices=[
+                        ('pending', 'Pending'),
+                        ('sent', 'Sent'),
+                        ('dead', 'Dead'),
+                    ],
+                    default='pending',
+                    max_length=20,
+                )),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(
+                    default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['message_id'],
+                'indexes': [
+                    models.Index(
+                        fields=['status', 'next_attempt_at'],
+                        name='outbox_due_idx',
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+'''Outgoing email queue.
+Includes fields:
+- subject, body, from_email and recipients (JSON list of addresses)
+- status: pending, sent or dead (gave up after too many attempts)
+- attempts, next_attempt_at and last_error for retries with backoff
+- lease_token: set while a worker is sending the message
+
+Requests only insert rows, inside their own transaction; the
+``send_outbox`` command delivers them, so a slow mail server never holds
+up a request and a rolled back request never sends its email.
+'''
+
+from django.core.mail import EmailMessage
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    ]
+
+    message_id = models.BigAutoField(primary_key=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField()
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending'
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Identifies the worker batch holding the message; its lease ends at
+    # next_attempt_at
+    lease_token = models.UUIDField(null=True, blank=True, editable=False)
+
+    def __str__(self):
+        """Return a readable label for the message.
+
+        :return: Human-readable message label.
+        """
+        return f'{self.subject} -> {", ".join(self.recipients)}'
+
+    def as_email(self, connection=None):
+        """Build the email to hand to a mail backend.
+
+        :param connection: Open mail backend connection to send through.
+        :return: EmailMessage instance.
+        """
+        return EmailMessage(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.recipients,
+            connection=connection,
+        )
+
+    class Meta:
+        ordering = ['message_id']
+        indexes = [
+            # The sender's poll: due pending messages, oldest first
+            models.Index(
+                fields=['status', 'next_attempt_at'],
+                name='outbox_due_idx',
+            ),
+        ]
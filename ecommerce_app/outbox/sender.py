@@ -0,0 +1,182 @@
+'''Deliver queued emails in batches.
+Includes:
+- Claiming a batch of due messages with a lease, in a short transaction
+- Sending the batch over one reused mail backend connection, outside
+  any transaction
+- Retrying failures with exponential backoff, then dead-lettering them
+'''
+
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+BatchResult = namedtuple('BatchResult', 'sent retrying dead')
+
+
+def retry_delay(attempts, backoff, max_delay):
+    """Return how long to wait before the next attempt.
+
+    :param attempts: Attempts made so far (at least 1).
+    :param backoff: Delay after the first failure, in seconds.
+    :param max_delay: Largest delay, in seconds.
+    :return: timedelta.
+    """
+    return timedelta(seconds=min(backoff * 2 ** (attempts - 1), max_delay))
+
+
+def _claim(batch_size, now, lease):
+    """Lease the next due messages to this worker and commit.
+
+    The rows are locked, skipping rows other workers hold, only while the
+    lease is written. The lease moves ``next_attempt_at`` past the time
+    the batch may take, so other workers leave the messages alone, and a
+    worker that dies mid-batch only delays them until the lease runs out.
+
+    :param batch_size: Largest number of messages to claim.
+    :param now: Current time.
+    :param lease: Seconds the batch is reserved for.
+    :return: Tuple (lease token, list of OutboxMessage instances).
+    """
+    token = uuid.uuid4()
+    with transaction.atomic():
+        queryset = OutboxMessage.objects.filter(
+            status='pending', next_attempt_at__lte=now
+        ).order_by('next_attempt_at', 'message_id')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        batch = list(queryset[:batch_size])
+        if batch:
+            OutboxMessage.objects.filter(
+                message_id__in=[message.message_id for message in batch]
+            ).update(
+                lease_token=token,
+                next_attempt_at=now + timedelta(seconds=lease),
+            )
+    return token, batch
+
+
+def _send(batch):
+    """Send a batch over one backend connection.
+
+    The connection is opened once and every ``send_messages`` call reuses
+    it, so a failure is attributed to the single message that caused it.
+
+    :param batch: OutboxMessage instances.
+    :return: Dict of exception by message id, for the failed messages.
+    """
+    mail = get_connection(fail_silently=False)
+    try:
+        mail.open()
+    except Exception as exc:
+        return {message.message_id: exc for message in batch}
+    errors = {}
+    try:
+        for message in batch:
+            try:
+                mail.send_messages([message.as_email(mail)])
+            except Exception as exc:
+                errors[message.message_id] = exc
+    finally:
+        mail.close()
+    return errors
+
+
+def _record(token, batch, errors, max_attempts, backoff, max_delay):
+    """Save the outcome of a sent batch and release its lease.
+
+    Only rows still holding this worker's lease are written, so a worker
+    whose lease ran out cannot overwrite the outcome of the next one.
+
+    :param token: Lease token returned by :func:`_claim`.
+    :param batch: OutboxMessage instances that were sent.
+    :param errors: Dict of exception by message id.
+    :param max_attempts: Attempts after which a message is marked dead.
+    :param backoff: Delay after the first failure, in seconds.
+    :param max_delay: Largest delay between attempts, in seconds.
+    :return: BatchResult with the number of messages in each outcome.
+    """
+    now = timezone.now()
+    sent = [m.message_id for m in batch if m.message_id not in errors]
+    retrying = dead = 0
+    with transaction.atomic():
+        OutboxMessage.objects.filter(
+            message_id__in=sent, lease_token=token
+        ).update(
+            status='sent', sent_at=now, last_error='',
+            attempts=F('attempts') + 1, lease_token=None,
+        )
+        for message in batch:
+            error = errors.get(message.message_id)
+            if error is None:
+                continue
+            attempts = message.attempts + 1
+            if attempts >= max_attempts:
+                outcome = {'status': 'dead'}
+                dead += 1
+            else:
+                outcome = {'next_attempt_at': now + retry_delay(
+                    attempts, backoff, max_delay
+                )}
+                retrying += 1
+            OutboxMessage.objects.filter(
+                message_id=message.message_id, lease_token=token
+            ).update(
+                attempts=attempts, last_error=str(error), lease_token=None,
+                **outcome
+            )
+    return BatchResult(len(sent), retrying, dead)
+
+
+def send_batch(batch_size, max_attempts, backoff, max_delay, lease=None):
+    """Send one batch of due messages.
+
+    The batch is claimed in one short transaction and its results saved
+    in another; no transaction or row lock is held while the mail server
+    is talked to, however slow it is.
+
+    :param batch_size: Largest number of messages to send.
+    :param max_attempts: Attempts after which a message is marked dead.
+    :param backoff: Delay after the first failure, in seconds.
+    :param max_delay: Largest delay between attempts, in seconds.
+    :param lease: Seconds a claimed batch is reserved for,
+        ``OUTBOX_LEASE_SECONDS`` when None.
+    :return: BatchResult with the number of messages in each outcome.
+    """
+    if lease is None:
+        lease = settings.OUTBOX_LEASE_SECONDS
+    token, batch = _claim(batch_size, timezone.now(), lease)
+    if not batch:
+        return BatchResult(0, 0, 0)
+    errors = _send(batch)
+    return _record(token, batch, errors, max_attempts, backoff, max_delay)
+
+
+def drain(batch_size, max_attempts, backoff, max_delay, lease=None):
+    """Send batches until no due message is left.
+
+    Messages that fail are scheduled in the future, so they are not
+    picked up again by the same drain.
+
+    :param batch_size: Largest number of messages per batch.
+    :param max_attempts: Attempts after which a message is marked dead.
+    :param backoff: Delay after the first failure, in seconds.
+    :param max_delay: Largest delay between attempts, in seconds.
+    :param lease: Seconds a claimed batch is reserved for.
+    :return: BatchResult totals over all batches.
+    """
+    totals = BatchResult(0, 0, 0)
+    while True:
+        result = send_batch(
+            batch_size, max_attempts, backoff, max_delay, lease
+        )
+        if not any(result):
+            return totals
+        totals = BatchResult(*(a + b for a, b in zip(totals, result)))
@@ -0,0 +1,208 @@
+'''Bulk product ingestion for vendors.
+Includes:
+- Reading JSON array, NDJSON and CSV uploads as a stream of rows
+- Validating rows against the vendor's stores without per-row queries
+- Inserting valid rows in batches, one announcement per batch
+'''
+
+import codecs
+import csv
+import json
+import os
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from ecommerce_app.conditional import PRODUCTS, bump_collections
+from ecommerce_app.integrations.x_client import tweet_new_products
+from search.index import index_products
+from .models import BulkProductSerializer, Product
+
+NDJSON_CONTENT_TYPES = frozenset({
+    'application/x-ndjson', 'application/ndjson', 'application/jsonl',
+})
+CSV_CONTENT_TYPES = frozenset({'text/csv'})
+UPLOAD_FORMATS = {
+    '.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv',
+}
+
+
+class BulkFormatError(ValueError):
+    """Raised when an upload is in an unsupported or missing format."""
+
+
+def _json_rows(data, label):
+    """Yield the records of an already parsed JSON array.
+
+    :param data: Parsed request body.
+    :param label: Plural name of the records, used in error messages.
+    :return: Iterator of (row number, record, error message).
+    :raises BulkFormatError: If the body is not an array.
+    """
+    if not isinstance(data, list):
+        raise BulkFormatError(f'Expected a JSON array of {label}.')
+    for number, record in enumerate(data, start=1):
+        yield number, record, None
+
+
+def _ndjson_rows(lines):
+    """Yield one record per non-empty NDJSON line.
+
+    :param lines: Iterator of raw byte lines.
+    :return: Iterator of (row number, record, error message).
+    """
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line), None
+        except ValueError:
+            yield number, None, 'Invalid JSON.'
+
+
+def _csv_rows(lines):
+    """Yield one record per CSV data row; the first line is the header.
+
+    :param lines: Iterator of raw byte lines.
+    :return: Iterator of (row number, record, error message).
+    """
+    reader = csv.DictReader(codecs.iterdecode(lines, 'utf-8-sig'))
+    number = 0
+    try:
+        for number, record in enumerate(reader, start=1):
+            yield number, record, None
+    except (UnicodeDecodeError, csv.Error) as exc:
+        yield number + 1, None, f'Unreadable CSV: {exc}'
+
+
+def _stream_lines(stream):
+    """Iterate over the lines of a request body or uploaded file.
+
+    :param stream: File-like object, or None for an empty body.
+    :return: Iterator of byte lines.
+    """
+    if stream is None:
+        return iter(())
+    return iter(stream.readline, b'')
+
+
+def read_rows(request, label='products'):
+    """Pick a row reader for the upload format of a request.
+
+    NDJSON and CSV bodies are read line by line, so large uploads are never
+    held in memory in full. Multipart uploads take the ``file`` field and
+    an optional ``format`` field (``json``, ``ndjson`` or ``csv``); without
+    it the file extension decides.
+
+    :param request: DRF request.
+    :param label: Plural name of the records, used in error messages.
+    :return: Iterator of (row number, record, error message).
+    :raises BulkFormatError: If the format is unsupported or no file was
+        uploaded.
+    """
+    content_type = request.content_type.split(';')[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        return _ndjson_rows(_stream_lines(request.stream))
+    if content_type in CSV_CONTENT_TYPES:
+        return _csv_rows(_stream_lines(request.stream))
+    if content_type == 'multipart/form-data':
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise BulkFormatError(f'Upload the {label} as a "file" field.')
+        extension = os.path.splitext(upload.name or '')[1].lower()
+        fmt = request.data.get('format') or UPLOAD_FORMATS.get(extension)
+        if fmt == 'json':
+            try:
+                return _json_rows(json.load(upload), label)
+            except ValueError:
+                raise BulkFormatError('Invalid JSON file.')
+        if fmt == 'ndjson':
+            return _ndjson_rows(_stream_lines(upload))
+        if fmt == 'csv':
+            return _csv_rows(_stream_lines(upload))
+        raise BulkFormatError('File format must be json, ndjson or csv.')
+    if content_type == 'application/json':
+        return _json_rows(request.data, label)
+    raise BulkFormatError(
+        'Send a JSON array, NDJSON (application/x-ndjson), CSV (text/csv) '
+        'or a multipart file upload.'
+    )
+
+
+def _insert_batch(products, stores):
+    """Insert one batch of validated products, index and announce them.
+
+    :param products: Unsaved Product instances.
+    :param stores: Dict of the vendor's stores by primary key.
+    :return: Number of products inserted.
+    """
+    for product in products:
+        product.store = stores[product.store_id]
+    # MySQL does not return the new primary keys from a bulk insert
+    returns_pks = connection.features.can_return_rows_from_bulk_insert
+    floor = None
+    if not returns_pks:
+        # Deleted products waiting for the purge still hold their keys
+        floor = Product.all_objects.aggregate(
+            top=Max('prod_id')
+        )['top'] or 0
+    with transaction.atomic():
+        Product.objects.bulk_create(products)
+        indexed = products
+        if floor is not None:
+            # May also catch rows another upload just added to these
+            # stores; indexing them again is harmless
+            indexed = Product.objects.filter(
+                prod_id__gt=floor, store_id__in=list(stores)
+            ).select_related('store')
+        index_products(indexed)
+    bump_collections(PRODUCTS)
+    tweet_new_products(products)
+    return len(products)
+
+
+def ingest_products(rows, vendor, batch_size, max_rows):
+    """Validate and insert uploaded products in batches.
+
+    Valid rows are inserted even when others fail; the report lists every
+    rejected row so the client can fix and resend just those.
+
+    :param rows: Iterator from :func:`read_rows`.
+    :param vendor: Uploading vendor; rows may only target their stores.
+    :param batch_size: Number of products per insert transaction.
+    :param max_rows: Largest number of rows accepted in one upload.
+    :return: Dict with ``created``, ``failed`` and per-row ``errors``.
+    """
+    stores = {store.store_id: store for store in vendor.stores.all()}
+    context = {'store_ids': stores.keys()}
+    created = 0
+    errors = []
+    batch = []
+    for number, record, error in rows:
+        if number > max_rows:
+            errors.append({'row': number, 'errors': {'non_field_errors': [
+                f'Uploads are limited to {max_rows} rows; the rest was '
+                f'not read.'
+            ]}})
+            break
+        if error is None and not isinstance(record, dict):
+            error = 'Expected an object.'
+        if error is not None:
+            errors.append({
+                'row': number, 'errors': {'non_field_errors': [error]}
+            })
+            continue
+        serializer = BulkProductSerializer(data=record, context=context)
+        if not serializer.is_valid():
+            errors.append({'row': number, 'errors': serializer.errors})
+            continue
+        values = dict(serializer.validated_data)
+        batch.append(Product(store_id=values.pop('store'), **values))
+        if len(batch) >= batch_size:
+            created += _insert_batch(batch, stores)
+            batch = []
+    if batch:
+        created += _insert_batch(batch, stores)
+    return {'created': created, 'failed': len(errors), 'errors': errors}
@@ -0,0 +1,31 @@
+'''Cached primary-key lookups of products.
+
+Products are cached without their store; the store is attached from the
+store cache on the way out, so renaming a store only invalidates one
+entry instead of every product it sells. For the same reason deleting a
+store leaves its products' entries alone: a product whose store is gone
+is not found.
+'''
+
+from django.http import Http404
+
+from ecommerce_app.object_cache import ObjectCache
+from store.cache import store_cache
+from .models import Product
+
+product_cache = ObjectCache(Product, 'product')
+
+
+def get_product_or_404(prod_id):
+    """Look up a product and its store through the object caches.
+
+    :param prod_id: Product primary key.
+    :return: Product instance with ``store`` populated.
+    :raises Http404: If the product or its store does not exist.
+    """
+    product = product_cache.get_or_404(prod_id)
+    store = store_cache.get(product.store_id)
+    if store is None:
+        raise Http404('No Product matches the given query.')
+    product.store = store
+    return product
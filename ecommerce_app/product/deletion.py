@@ -0,0 +1,183 @@
+'''Soft deletion of stores and products, and the purge that follows.
+Includes:
+- Hiding a product, or a store and all its products, with one UPDATE each
+- Purging deleted products and the rows that depend on them in
+  primary-key chunks, one short transaction each
+- Purging deleted stores once their products are gone
+
+Deleting a big store through the ORM makes the collector load every
+product, review and order line into memory and delete them all in one
+long transaction. Instead the delete views only set ``deleted_at``,
+which the default managers filter out, and ``purge_deleted`` removes the
+rows later, outside the request.
+'''
+
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import DO_NOTHING
+from django.db.models.deletion import (
+    Collector, get_candidate_relations_to_delete
+)
+from django.utils import timezone
+
+from ecommerce_app.conditional import (
+    PRODUCTS, REVIEWS, STORES, bump_collections
+)
+from ecommerce_app.pagination import iter_keyset_chunks
+from leaderboard.ranking import invalidate_home_leaderboard
+from store.cache import store_cache
+from store.models import Store
+from .cache import product_cache
+from .models import Product
+
+PURGE_CHUNK_SIZE = 500
+
+PurgeStep = namedtuple('PurgeStep', 'model ids rows')
+
+
+def soft_delete_product(product):
+    """Hide a product at once; its rows are purged later.
+
+    ``updated_at`` moves with ``deleted_at``. The UPDATE sends no
+    signals, so the product and review collection versions are bumped
+    here.
+
+    :param product: Product to delete.
+    """
+    now = timezone.now()
+    Product.all_objects.filter(
+        pk=product.pk, deleted_at__isnull=True
+    ).update(deleted_at=now, updated_at=now)
+    product_cache.invalidate(product.pk)
+    bump_collections(PRODUCTS, REVIEWS)
+    invalidate_home_leaderboard()
+
+
+def soft_delete_store(store):
+    """Hide a store and all of its products at once.
+
+    Two set-based UPDATEs, whatever the size of the store; nothing is
+    loaded into memory. Cached copies of its products are not dropped
+    one by one: :func:`product.cache.get_product_or_404`, used by every
+    page and cart view, treats a product whose store is gone as gone too.
+
+    :param store: Store to delete.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        Store.all_objects.filter(
+            pk=store.pk, deleted_at__isnull=True
+        ).update(deleted_at=now, updated_at=now)
+        Product.all_objects.filter(
+            store_id=store.pk, deleted_at__isnull=True
+        ).update(deleted_at=now, updated_at=now)
+    store_cache.invalidate(store.pk)
+    bump_collections(STORES, PRODUCTS, REVIEWS)
+    invalidate_home_leaderboard()
+
+
+def _dependents(model, ids):
+    """Yield the rows that would cascade from deleting some rows.
+
+    Relations marked DO_NOTHING are left to their delete signals, as in
+    a normal delete.
+
+    :param model: Model whose rows are about to be deleted.
+    :param ids: Primary keys of those rows.
+    :return: Iterator of querysets, one per relation.
+    """
+    for relation in get_candidate_relations_to_delete(model._meta):
+        if relation.on_delete is DO_NOTHING:
+            continue
+        yield relation.related_model._base_manager.filter(
+            **{f'{relation.field.name}__in': ids}
+        )
+
+
+def _delete_in_chunks(queryset, origin, chunk_size):
+    """Delete the rows of a queryset, a primary-key chunk at a time.
+
+    Each chunk is collected and deleted in its own transaction, so at
+    most ``chunk_size`` rows are loaded or locked at once. Delete signals
+    see ``origin`` and skip work for rows going away with it.
+
+    :param queryset: Rows to delete.
+    :param origin: Queryset of the stores or products being purged.
+    :param chunk_size: Number of rows per transaction.
+    :return: Number of rows deleted, cascades included.
+    """
+    deleted = 0
+    model = queryset.model
+    while True:
+        ids = list(
+            queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            collector = Collector(using=queryset.db, origin=origin)
+            collector.collect(model._base_manager.filter(pk__in=ids))
+            count, _ = collector.delete()
+        deleted += count
+
+
+def purge_products(product_ids, chunk_size=PURGE_CHUNK_SIZE):
+    """Remove some deleted products and everything that depends on them.
+
+    Reviews, order lines, cart lines, purchases, sales rollups and
+    leaderboard rows go first, then the products themselves.
+
+    :param product_ids: Primary keys of the products.
+    :param chunk_size: Number of rows per transaction.
+    :return: Number of rows deleted.
+    """
+    origin = Product.all_objects.filter(pk__in=product_ids)
+    rows = 0
+    for dependents in _dependents(Product, product_ids):
+        rows += _delete_in_chunks(dependents, origin, chunk_size)
+    return rows + _delete_in_chunks(origin, origin, chunk_size)
+
+
+def purge_store(store_id, chunk_size=PURGE_CHUNK_SIZE):
+    """Remove a deleted store, its products and its sales rollups.
+
+    :param store_id: Primary key of the store.
+    :param chunk_size: Number of rows per transaction.
+    :return: Number of rows deleted.
+    """
+    rows = 0
+    products = Product.all_objects.filter(store_id=store_id).only('prod_id')
+    for chunk in iter_keyset_chunks(products, ('prod_id',), chunk_size):
+        rows += purge_products(
+            [product.prod_id for product in chunk], chunk_size
+        )
+    origin = Store.all_objects.filter(pk=store_id)
+    for dependents in _dependents(Store, [store_id]):
+        rows += _delete_in_chunks(dependents, origin, chunk_size)
+    return rows + _delete_in_chunks(origin, origin, chunk_size)
+
+
+def purge_deleted(chunk_size=PURGE_CHUNK_SIZE):
+    """Remove every deleted product and store.
+
+    Products are purged in chunks of ``chunk_size``, then the stores.
+    The purge can be stopped at any point and run again: whatever was
+    not removed yet is still flagged.
+
+    :param chunk_size: Number of rows per transaction.
+    :return: Iterator of PurgeStep, one per chunk of products and one per
+        store, yielded after the step is done.
+    """
+    products = Product.all_objects.filter(
+        deleted_at__isnull=False
+    ).only('prod_id')
+    for chunk in iter_keyset_chunks(products, ('prod_id',), chunk_size):
+        ids = [product.prod_id for product in chunk]
+        yield PurgeStep(Product, ids, purge_products(ids, chunk_size))
+    store_ids = list(
+        Store.all_objects.filter(deleted_at__isnull=False)
+        .order_by('store_id').values_list('store_id', flat=True)
+    )
+    for store_id in store_ids:
+        yield PurgeStep(Store, [store_id], purge_store(store_id, chunk_size))
@@ -0,0 +1,90 @@
+'''Facet counts for the product browse page.
+
+Counts per store category and per price bucket come from one grouped
+query over the whole catalog and are cached for ``FACET_CACHE_TIMEOUT``
+seconds, so browsing never re-counts the catalog on every request.
+'''
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Value, When
+
+from store.models import Store
+from .models import Product
+
+FACET_CACHE_KEY = 'product:facets'
+
+# (label, minimum inclusive, maximum exclusive); None means unbounded
+PRICE_BUCKETS = (
+    ('Under $25', None, Decimal('25')),
+    ('$25 to $50', Decimal('25'), Decimal('50')),
+    ('$50 to $100', Decimal('50'), Decimal('100')),
+    ('$100 to $250', Decimal('100'), Decimal('250')),
+    ('$250 and up', Decimal('250'), None),
+)
+
+
+def _bucket_expression():
+    """Map a product's price to the index of its bucket in SQL.
+
+    :return: Case expression yielding the bucket index as text.
+    """
+    whens = [
+        When(price__lt=high, then=Value(str(index)))
+        for index, (_, _, high) in enumerate(PRICE_BUCKETS)
+        if high is not None
+    ]
+    return Case(
+        *whens,
+        default=Value(str(len(PRICE_BUCKETS) - 1)),
+        output_field=CharField(),
+    )
+
+
+def compute_facets():
+    """Count products per category and per price bucket in one query.
+
+    :return: Dict with ``categories`` and ``prices`` lists, each entry
+        holding the filter value(s), a label and a count.
+    """
+    rows = (
+        Product.objects
+        .annotate(bucket=_bucket_expression())
+        .values('store__store_category', 'bucket')
+        .annotate(count=Count('prod_id'))
+        .order_by()
+    )
+    by_category = {}
+    by_bucket = {}
+    for row in rows:
+        category = row['store__store_category']
+        bucket = int(row['bucket'])
+        by_category[category] = by_category.get(category, 0) + row['count']
+        by_bucket[bucket] = by_bucket.get(bucket, 0) + row['count']
+    return {
+        'categories': [
+            {'category': key, 'label': label,
+             'count': by_category.get(key, 0)}
+            for key, label in Store.STORE_CATEGORIES
+        ],
+        'prices': [
+            {'min_price': str(low) if low is not None else None,
+             'max_price': str(high) if high is not None else None,
+             'label': label, 'count': by_bucket.get(index, 0)}
+            for index, (label, low, high) in enumerate(PRICE_BUCKETS)
+        ],
+    }
+
+
+def catalog_facets():
+    """Return the cached facet counts, computing them when missing.
+
+    :return: Dict as returned by :func:`compute_facets`.
+    """
+    facets = cache.get(FACET_CACHE_KEY)
+    if facets is None:
+        facets = compute_facets()
+        cache.set(FACET_CACHE_KEY, facets, settings.FACET_CACHE_TIMEOUT)
+    return facets
@@ -1,21 +1,110 @@
 from django import forms
 
+from store.models import Store
 from .models import Product
 
+# Keyset ordering for each sort option; the last key is always unique
+PRODUCT_SORTS = {
+    '': ('prod_id',),
+    'newest': ('-prod_id',),
+    'price': ('price', 'prod_id'),
+    '-price': ('-price', '-prod_id'),
+}
+
 
 class ProductForm(forms.ModelForm):
+    # Stock shown when the form was rendered, to detect a vendor edit
+    stock_seen = forms.IntegerField(
+        min_value=0, required=False, widget=forms.HiddenInput
+    )
+
     class Meta:
         model = Product
-        fields = ['name', 'description', 'price', 'store']
+        fields = ['name', 'description', 'price', 'stock', 'store']
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         if user and getattr(user, 'user_type', None) == 'vendor':
             self.fields['store'].queryset = user.stores.all()
+        if self.instance.pk is not None:
+            self.fields['stock_seen'].initial = self.instance.stock
+
+    def stock_changed(self):
+        """Tell whether the vendor edited the stock on the form.
+
+        Product.save() never writes stock, so units sold while the form
+        was open are not overwritten unless the vendor changed the value.
+
+        :return: True if the submitted stock differs from the one shown.
+        """
+        return self.cleaned_data.get('stock') != self.cleaned_data.get(
+            'stock_seen'
+        )
 
     def clean_name(self):
         name = self.cleaned_data.get('name', '').strip()
         if not name:
             raise forms.ValidationError('Product name is required.')
         return name
+
+
+class ProductFilterForm(forms.Form):
+    """Filter and sort options of the product list and products API."""
+
+    category = forms.ChoiceField(
+        choices=[('', 'All categories')] + Store.STORE_CATEGORIES,
+        required=False
+    )
+    min_price = forms.DecimalField(
+        min_value=0, max_digits=10, decimal_places=2, required=False
+    )
+    max_price = forms.DecimalField(
+        min_value=0, max_digits=10, decimal_places=2, required=False,
+        help_text='Only products cheaper than this.'
+    )
+    store = forms.IntegerField(min_value=1, required=False)
+    sort = forms.ChoiceField(
+        choices=[
+            ('', 'Default'),
+            ('newest', 'Newest first'),
+            ('price', 'Price: low to high'),
+            ('-price', 'Price: high to low'),
+        ],
+        required=False
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        low = cleaned_data.get('min_price')
+        high = cleaned_data.get('max_price')
+        if low is not None and high is not None and low >= high:
+            raise forms.ValidationError(
+                'Minimum price must be below the maximum price.'
+            )
+        return cleaned_data
+
+    @property
+    def ordering(self):
+        """Return the keyset ordering of the chosen sort.
+
+        :return: Tuple of ordering field names.
+        """
+        return PRODUCT_SORTS[self.cleaned_data.get('sort') or '']
+
+    def filter(self, queryset):
+        """Apply the valid filters to a product queryset.
+
+        :param queryset: Product queryset.
+        :return: Filtered queryset.
+        """
+        data = self.cleaned_data
+        if data.get('category'):
+            queryset = queryset.filter(store__store_category=data['category'])
+        if data.get('store'):
+            queryset = queryset.filter(store_id=data['store'])
+        if data.get('min_price') is not None:
+            queryset = queryset.filter(price__gte=data['min_price'])
+        if data.get('max_price') is not None:
+            queryset = queryset.filter(price__lt=data['max_price'])
+        return queryset
@@ -0,0 +1,84 @@
+'''Management command that removes deleted stores and products.
+
+Deleting a store or product only hides it; this command removes the
+rows and everything that depends on them (reviews, order lines, cart
+lines, purchases, sales rollups) in primary-key chunks, one short
+transaction each. Run it from cron, or keep it running with ``--loop``
+next to the web server. An interrupted run loses nothing: rows not yet
+removed are still flagged and are picked up by the next run.
+'''
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product.deletion import PURGE_CHUNK_SIZE, purge_deleted
+from product.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Remove deleted stores and products with their dependent rows.'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        :param parser: Argument parser for the command.
+        """
+        parser.add_argument(
+            '--chunk-size', type=int, default=PURGE_CHUNK_SIZE,
+            help='Rows deleted per transaction.'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to wait between chunks, to ease database load.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling for new deletions instead of exiting.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=60.0,
+            help='Seconds between polls when running with --loop.'
+        )
+
+    def handle(self, *args, **options):
+        """Purge everything deleted so far, once or forever with --loop.
+
+        :return: None.
+        """
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        while True:
+            products, stores, rows = self._purge(options)
+            if products or stores or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Done: {products} products and {stores} stores '
+                    f'purged, {rows} rows deleted.'
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def _purge(self, options):
+        """Run one purge pass, reporting each step as it finishes.
+
+        :param options: Command options.
+        :return: Tuple (products purged, stores purged, rows deleted).
+        """
+        products = stores = rows = 0
+        for step in purge_deleted(options['chunk_size']):
+            rows += step.rows
+            if step.model is Product:
+                products += len(step.ids)
+                self.stdout.write(
+                    f'Purged products {step.ids[0]}-{step.ids[-1]} '
+                    f'({step.rows} rows).'
+                )
+            else:
+                stores += 1
+                self.stdout.write(
+                    f'Purged store {step.ids[0]} ({step.rows} rows).'
+                )
+            if options['pause']:
+                time.sleep(options['pause'])
+        return products, stores, rows
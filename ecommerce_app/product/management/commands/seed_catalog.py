@@ -0,0 +1,431 @@
+'''Management command to generate a large synthetic dataset.
+
+Writes users, stores, products, orders, order items, verified purchases
+and reviews with ``bulk_create`` in fixed-size batches. Primary keys are
+assigned up front so foreign keys can be filled in without reading rows
+back, and ``bulk_create`` never sends ``post_save``, so no tweets are
+triggered.
+
+Distributions:
+- vendor and store sizes are Zipf-skewed (a few very large sellers)
+- product popularity in orders is Zipfian
+- reviews are only written for products a buyer actually ordered
+
+Product review aggregates, and with them the top-rated leaderboard, and
+the daily sales rollups are computed once at the end, since the bulk
+inserted reviews and orders never reach the code that maintains them.
+For the same reason the collection versions behind the API's ETags are
+bumped at the end.
+
+The same ``--seed`` on the same starting database always produces the
+same rows, so benchmark runs are comparable.
+'''
+
+import random
+import time
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from cart.models import Order, OrderItem, PurchasedProduct
+from ecommerce_app.conditional import (
+    PRODUCTS, REVIEWS, STORES, bump_collections
+)
+from product.models import Product
+from reviews.aggregates import rebuild_aggregates
+from reviews.models import Review
+from sales.rollups import rebuild_rollups
+from search.index import reindex_queryset
+from store.models import Store
+from users.models import User
+
+SEED_PASSWORD = 'Seed1234'
+ORDER_STATUSES = (('completed', 95), ('cancelled', 3), ('pending', 2))
+RATING_WEIGHTS = (5, 7, 13, 30, 45)
+WORDS = (
+    'smart', 'classic', 'deluxe', 'compact', 'wireless', 'organic', 'eco',
+    'premium', 'portable', 'vintage', 'ultra', 'mini', 'pro', 'soft',
+    'steel', 'cotton', 'bamboo', 'digital', 'family', 'travel',
+)
+NOUNS = (
+    'lamp', 'speaker', 'jacket', 'kettle', 'novel', 'puzzle', 'blender',
+    'backpack', 'headphones', 'mug', 'sneakers', 'tablet', 'blanket',
+    'watch', 'camera', 'notebook', 'drone', 'chair', 'toaster', 'scarf',
+)
+
+
+class ZipfSampler:
+    """Draw ranks 0..n-1 with probability proportional to 1 / (r + 1)^s.
+
+    :param n: Number of ranks.
+    :param s: Zipf exponent; larger values give a steeper skew.
+    :param rng: random.Random instance.
+    """
+
+    def __init__(self, n, s, rng):
+        self.rng = rng
+        self.cumulative = array(
+            'd', accumulate(1.0 / (rank + 1) ** s for rank in range(n))
+        )
+        self.total = self.cumulative[-1]
+
+    def sample(self):
+        """Return one rank.
+
+        :return: Integer rank, 0 being the most popular.
+        """
+        point = self.rng.random() * self.total
+        return min(
+            bisect_right(self.cumulative, point), len(self.cumulative) - 1
+        )
+
+
+def _next_pk(model):
+    """Return the first free primary key of a model.
+
+    :param model: Django model class.
+    :return: Integer primary key.
+    """
+    field = model._meta.pk.attname
+    # Deleted rows waiting for the purge still hold their keys
+    top = model._base_manager.aggregate(top=Max(field))['top']
+    return (top or 0) + 1
+
+
+@contextmanager
+def _manual_timestamps(*fields):
+    """Let bulk inserts keep the ``auto_now_add`` values they were given.
+
+    :param fields: Model fields whose ``auto_now_add`` is suspended.
+    """
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic catalog for load testing.'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        :param parser: Argument parser for the command.
+        """
+        parser.add_argument('--vendors', type=int, default=20)
+        parser.add_argument('--stores', type=int, default=50)
+        parser.add_argument('--buyers', type=int, default=1000)
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--orders', type=int, default=20000)
+        parser.add_argument(
+            '--max-items', type=int, default=5,
+            help='Maximum number of lines per order.'
+        )
+        parser.add_argument(
+            '--review-rate', type=float, default=0.3,
+            help='Share of purchased order lines that get a review.'
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Zipf exponent for store sizes and product popularity.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Spread orders and reviews over this many days.'
+        )
+        parser.add_argument(
+            '--start-date', default='2025-01-01',
+            help='First day of the generated order history (YYYY-MM-DD).'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--skip-index', action='store_true',
+            help='Do not build search postings for the new products.'
+        )
+
+    def handle(self, *args, **options):
+        """Generate every table in dependency order.
+
+        :return: None.
+        """
+        for name in ('vendors', 'stores', 'buyers', 'products', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be >= 1')
+        try:
+            start = datetime.strptime(options['start_date'], '%Y-%m-%d')
+        except ValueError:
+            raise CommandError('--start-date must look like YYYY-MM-DD')
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.start = start.replace(tzinfo=dt_timezone.utc)
+        self.batch_size = options['batch_size']
+
+        vendor_ids = self._seed_users('vendor', options['vendors'])
+        buyer_ids = self._seed_users('buyer', options['buyers'])
+        store_ids = self._seed_stores(vendor_ids)
+        prices = self._seed_products(store_ids)
+        self._seed_orders(buyer_ids, prices)
+
+        started = time.monotonic()
+        _, fixed = rebuild_aggregates(
+            Product.objects.filter(prod_id__gte=self.first_product)
+        )
+        self._report('review stats', fixed, started)
+
+        started = time.monotonic()
+        seeded = Order.objects.filter(
+            order_id__gte=self.first_order
+        ).aggregate(first=Min('created_at'), last=Max('created_at'))
+        if seeded['first'] is not None:
+            _, fixed = rebuild_rollups(
+                timezone.localdate(seeded['first']),
+                timezone.localdate(seeded['last']),
+            )
+            self._report('sales rollups', fixed, started)
+
+        if not options['skip_index']:
+            started = time.monotonic()
+            total = reindex_queryset(
+                Product.objects.filter(prod_id__gte=self.first_product)
+            )
+            self._report('search index', total, started)
+        bump_collections(STORES, PRODUCTS, REVIEWS)
+
+    def _report(self, label, count, started):
+        """Print how many rows a step wrote and how long it took.
+
+        :param label: Name of the generated table.
+        :param count: Number of rows written.
+        :param started: time.monotonic() value when the step began.
+        """
+        self.stdout.write(
+            f'{label:<14} {count:>10} rows  {time.monotonic() - started:.1f}s'
+        )
+
+    def _insert(self, model, objects):
+        """Insert objects in batches, one short transaction per batch.
+
+        :param model: Django model class.
+        :param objects: Iterable of unsaved model instances.
+        :return: Number of rows written.
+        """
+        total = 0
+        objects = iter(objects)
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                return total
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            total += len(batch)
+
+    def _moment(self):
+        """Pick a random timestamp inside the generated history.
+
+        :return: Aware datetime.
+        """
+        seconds = self.rng.randrange(self.options['days'] * 86400)
+        return self.start + timedelta(seconds=seconds)
+
+    def _seed_users(self, user_type, count):
+        """Create vendors or buyers sharing one pre-hashed password.
+
+        :param user_type: 'vendor' or 'buyer'.
+        :param count: Number of users to create.
+        :return: List of new user primary keys.
+        """
+        started = time.monotonic()
+        first = _next_pk(User)
+        password = make_password(SEED_PASSWORD)
+        ids = list(range(first, first + count))
+        self._insert(User, (
+            User(
+                user_id=pk,
+                username=f'seed_{user_type}_{pk}',
+                email=f'seed_{user_type}_{pk}@example.com',
+                first_name='Seed',
+                last_name=f'{user_type.title()} {pk}',
+                user_type=user_type,
+                password=password,
+            )
+            for pk in ids
+        ))
+        self._report(f'{user_type}s', count, started)
+        return ids
+
+    def _seed_stores(self, vendor_ids):
+        """Create stores, with a few vendors owning most of them.
+
+        :param vendor_ids: Primary keys of the seeded vendors.
+        :return: List of new store primary keys.
+        """
+        started = time.monotonic()
+        count = self.options['stores']
+        first = _next_pk(Store)
+        ids = list(range(first, first + count))
+        vendors = ZipfSampler(len(vendor_ids), self.options['zipf'], self.rng)
+        categories = [key for key, _ in Store.STORE_CATEGORIES]
+        self._insert(Store, (
+            Store(
+                store_id=pk,
+                store_name=f'{self.rng.choice(WORDS).title()} Store {pk}',
+                store_description='Generated for load testing',
+                store_category=self.rng.choice(categories),
+                vendor_id=vendor_ids[vendors.sample()],
+            )
+            for pk in ids
+        ))
+        self._report('stores', count, started)
+        return ids
+
+    def _seed_products(self, store_ids):
+        """Create products spread over stores with a Zipf-skewed size.
+
+        :param store_ids: Primary keys of the seeded stores.
+        :return: Array of product prices in cents, indexed by rank.
+        """
+        started = time.monotonic()
+        count = self.options['products']
+        self.first_product = _next_pk(Product)
+        stores = ZipfSampler(len(store_ids), self.options['zipf'], self.rng)
+        prices = array('q')
+
+        def products():
+            for offset in range(count):
+                cents = int(self.rng.lognormvariate(7.5, 1.0)) + 99
+                prices.append(cents)
+                word, noun = self.rng.choice(WORDS), self.rng.choice(NOUNS)
+                yield Product(
+                    prod_id=self.first_product + offset,
+                    name=f'{word.title()} {noun} {offset}',
+                    description=(
+                        f'A {word} {noun} from the {self.rng.choice(WORDS)} '
+                        f'range, built to last.'
+                    ),
+                    price=Decimal(cents) / 100,
+                    store_id=store_ids[stores.sample()],
+                )
+
+        self._insert(Product, products())
+        self._report('products', count, started)
+        return prices
+
+    def _seed_orders(self, buyer_ids, prices):
+        """Create orders, their lines, and reviews of purchased products.
+
+        Product popularity follows a Zipf distribution over product rank,
+        and reviews are only written for lines of completed orders.
+
+        :param buyer_ids: Primary keys of the seeded buyers.
+        :param prices: Product prices in cents, indexed by rank.
+        """
+        started = time.monotonic()
+        count = self.options['orders']
+        max_items = max(1, self.options['max_items'])
+        popularity = ZipfSampler(len(prices), self.options['zipf'], self.rng)
+        statuses = [status for status, _ in ORDER_STATUSES]
+        status_weights = [weight for _, weight in ORDER_STATUSES]
+        first_order = self.first_order = _next_pk(Order)
+        first_item = _next_pk(OrderItem)
+        first_review = _next_pk(Review)
+
+        orders, items, reviews = [], [], []
+        purchases = set()
+        totals = {'orders': 0, 'order items': 0, 'reviews': 0}
+
+        def flush():
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                OrderItem.objects.bulk_create(items)
+                Review.objects.bulk_create(reviews)
+                # Pairs bought again in a later batch already exist
+                PurchasedProduct.objects.bulk_create(
+                    [
+                        PurchasedProduct(user_id=user_id, product_id=pid)
+                        for user_id, pid in purchases
+                    ],
+                    ignore_conflicts=True,
+                )
+            totals['orders'] += len(orders)
+            totals['order items'] += len(items)
+            totals['reviews'] += len(reviews)
+            orders.clear()
+            items.clear()
+            reviews.clear()
+            purchases.clear()
+
+        timestamps = (
+            Order._meta.get_field('created_at'),
+            Review._meta.get_field('created_at'),
+        )
+        with _manual_timestamps(*timestamps):
+            for offset in range(count):
+                order_id = first_order + offset
+                buyer_id = buyer_ids[self.rng.randrange(len(buyer_ids))]
+                status = self.rng.choices(statuses, status_weights)[0]
+                created_at = self._moment()
+                ranks = {
+                    popularity.sample()
+                    for _ in range(self.rng.randint(1, max_items))
+                }
+                total_cents = 0
+                for rank in sorted(ranks):
+                    quantity = self.rng.choices((1, 2, 3), (80, 15, 5))[0]
+                    total_cents += prices[rank] * quantity
+                    product_id = self.first_product + rank
+                    items.append(OrderItem(
+                        id=first_item + totals['order items'] + len(items),
+                        order_id=order_id,
+                        product_id=product_id,
+                        quantity=quantity,
+                        price=Decimal(prices[rank]) / 100,
+                    ))
+                    if status == 'completed':
+                        purchases.add((buyer_id, product_id))
+                    reviewed = (
+                        status == 'completed'
+                        and self.rng.random() < self.options['review_rate']
+                    )
+                    if reviewed:
+                        rating = self.rng.choices(
+                            range(1, 6), RATING_WEIGHTS)[0]
+                        review_id = (
+                            first_review + totals['reviews'] + len(reviews)
+                        )
+                        reviews.append(Review(
+                            review_id=review_id,
+                            product_id=product_id,
+                            user_id=buyer_id,
+                            username=f'seed_buyer_{buyer_id}',
+                            rating=rating,
+                            comment=f'{rating} stars for this one.',
+                            created_at=created_at + timedelta(days=3),
+                            is_verified_purchase=True,
+                        ))
+                orders.append(Order(
+                    order_id=order_id,
+                    user_id=buyer_id,
+                    created_at=created_at,
+                    total_amount=Decimal(total_cents) / 100,
+                    status=status,
+                ))
+                if len(items) >= self.batch_size:
+                    flush()
+            flush()
+
+        for label, total in totals.items():
+            self._report(label, total, started)
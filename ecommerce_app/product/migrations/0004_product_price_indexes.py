@@ -0,0 +1,25 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Add composite price indexes for filtered and sorted browsing."""
+
+    dependencies = [
+        ('product', '0003_product_updated_at'),
+        ('store', '0005_store_category_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(
+                fields=['store', 'price'], name='product_store_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(
+                fields=['price', 'prod_id'], name='product_price_idx'),
+        ),
+    ]
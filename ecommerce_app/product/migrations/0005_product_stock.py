@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Add stock tracking; existing products stay untracked (NULL)."""
+
+    dependencies = [
+        ('product', '0004_product_price_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.10 on 2026-10-17 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Add the soft-delete timestamp to products."""
+
+    dependencies = [
+        ('product', '0005_product_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='deleted_at',
+            field=models.DateTimeField(
+                blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
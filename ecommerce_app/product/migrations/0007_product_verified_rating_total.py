@@ -0,0 +1,46 @@
+# Generated by Django 5.2.10 on 2026-10-17 11:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_verified_totals(apps, schema_editor):
+    """Sum the ratings of each product's verified purchase reviews.
+
+    :param apps: Historical app registry.
+    :param schema_editor: Schema editor in use.
+    """
+    Product = apps.get_model('product', 'Product')
+    Review = apps.get_model('reviews', 'Review')
+    totals = (
+        Review.objects.filter(
+            product_id=OuterRef('pk'), is_verified_purchase=True
+        )
+        .values('product_id')
+        .annotate(total=Sum('rating'))
+        .values('total')
+    )
+    Product.objects.filter(verified_review_count__gt=0).update(
+        verified_rating_total=Coalesce(Subquery(totals), 0)
+    )
+
+
+class Migration(migrations.Migration):
+    """Add the verified purchase rating total to products."""
+
+    dependencies = [
+        ('product', '0006_product_deleted_at'),
+        ('reviews', '0005_review_product_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='verified_rating_total',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            backfill_verified_totals, migrations.RunPython.noop
+        ),
+    ]
@@ -5,6 +5,13 @@ Include fields:
 - description: TextField
 - price: DecimalField (max_digits=10, decimal_places=2)
 - store_id: ForeignKey to Store model
+- avg_rating, review_count, verified_review_count, rating_total,
+  verified_rating_total: review aggregates maintained by
+  reviews.aggregates
+- stock: PositiveIntegerField, units left; NULL means not tracked
+- updated_at: DateTimeField (auto_now=True), drives API ETags
+- deleted_at: DateTimeField, set when the product or its store is
+  deleted; the row is removed later by ``purge_deleted``
 '''
 
 from django.db import models
@@ -13,6 +20,24 @@ from django.core.validators import MinValueValidator
 from rest_framework import serializers
 
 
+# Maintained by reviews.aggregates, never written by forms or the API
+AGGREGATE_FIELDS = (
+    'avg_rating', 'review_count', 'verified_review_count', 'rating_total',
+    'verified_rating_total',
+)
+# Only changed by conditional UPDATEs (product.stock), never by save()
+STOCK_FIELDS = ('stock',)
+# Only set by product.deletion, so an edit cannot bring a product back
+DELETION_FIELDS = ('deleted_at',)
+
+
+class LiveProductManager(models.Manager):
+    """Products that have not been deleted."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Product(models.Model):
     prod_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100)
@@ -27,12 +52,80 @@ class Product(models.Model):
         on_delete=models.CASCADE,
         related_name='products'
     )
+    avg_rating = models.DecimalField(
+        max_digits=3,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
+    review_count = models.IntegerField(default=0, editable=False)
+    verified_review_count = models.IntegerField(default=0, editable=False)
+    rating_total = models.IntegerField(default=0, editable=False)
+    # Ratings of the verified purchase reviews alone, for the leaderboard
+    verified_rating_total = models.IntegerField(default=0, editable=False)
+    stock = models.PositiveIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    deleted_at = models.DateTimeField(
+        null=True, blank=True, editable=False, db_index=True
+    )
+
+    objects = LiveProductManager()
+    # Includes deleted products waiting to be purged
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # Store pages and the store filter, ranged or sorted by price
+            models.Index(
+                fields=['store', 'price'], name='product_store_price_idx'
+            ),
+            # Catalog-wide price sort and price range filter
+            models.Index(
+                fields=['price', 'prod_id'], name='product_price_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # A product loaded before a review was posted, a unit was sold or
+        # the product was deleted must not write its stale aggregates,
+        # stock or deletion flag back, so updates leave them out
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in AGGREGATE_FIELDS
+                and field.name not in STOCK_FIELDS
+                and field.name not in DELETION_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = ['prod_id', 'name', 'description', 'price', 'store']
+        fields = [
+            'prod_id', 'name', 'description', 'price', 'store',
+            'avg_rating', 'review_count', 'verified_review_count', 'stock',
+            'updated_at'
+        ]
+
+
+class BulkProductSerializer(ProductSerializer):
+    """ProductSerializer for bulk uploads.
+
+    The store is checked against ``context['store_ids']`` (the uploading
+    vendor's stores, loaded once) instead of with one query per row.
+    """
+    store = serializers.IntegerField()
+
+    def validate_store(self, value):
+        if value not in self.context['store_ids']:
+            raise serializers.ValidationError(
+                'Unknown store, or not one of your stores.'
+            )
+        return value
@@ -1,11 +1,36 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .cache import product_cache
 from .models import Product
+from ecommerce_app.conditional import PRODUCTS, bump_collections
 from ecommerce_app.integrations.x_client import tweet_new_product
+from search.index import index_product, unindex_products
 
 
 @receiver(post_save, sender=Product)
 def product_created_tweet(sender, instance, created, **kwargs):
     if created:
         tweet_new_product(instance)
+
+
+@receiver(post_save, sender=Product)
+def product_search_index(sender, instance, **kwargs):
+    index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_search_unindex(sender, instance, **kwargs):
+    unindex_products([instance.prod_id])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_cache_invalidate(sender, instance, **kwargs):
+    product_cache.invalidate(instance.prod_id)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_collection_changed(sender, instance, **kwargs):
+    bump_collections(PRODUCTS)
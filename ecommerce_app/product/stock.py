@@ -0,0 +1,61 @@
+'''Stock changes that never read-modify-write the product row.
+Includes:
+- Reserving stock for several products with one conditional UPDATE
+- Setting a product's stock from the vendor form
+'''
+
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from ecommerce_app.conditional import PRODUCTS, bump_collections
+from .cache import product_cache
+from .models import Product
+
+
+def reserve_stock(quantities):
+    """Take stock for several products in one conditional UPDATE.
+
+    Runs ``UPDATE ... SET stock = stock - n WHERE stock >= n`` for all
+    products at once; the database checks and decrements each row
+    atomically, so concurrent checkouts can never take more than is left.
+    Products that do not track stock must not be passed in.
+
+    Call it inside ``transaction.atomic`` and roll back when it returns
+    False: rows that did have enough stock were already decremented.
+
+    :param quantities: Dict of product id to units wanted.
+    :return: True if every product had enough stock.
+    """
+    if not quantities:
+        return True
+    # One WHEN per distinct quantity keeps the statement short for carts
+    # of many lines that mostly want one or two units
+    by_quantity = {}
+    for product_id, quantity in quantities.items():
+        by_quantity.setdefault(quantity, []).append(product_id)
+    needed = Case(
+        *[
+            When(prod_id__in=product_ids, then=Value(quantity))
+            for quantity, product_ids in by_quantity.items()
+        ],
+        output_field=IntegerField(),
+    )
+    reserved = Product.objects.filter(
+        prod_id__in=list(quantities), stock__gte=needed
+    ).update(stock=F('stock') - needed, updated_at=timezone.now())
+    product_cache.invalidate_many(quantities)
+    bump_collections(PRODUCTS)
+    return reserved == len(quantities)
+
+
+def set_stock(product_id, stock):
+    """Set the stock of a product, or stop tracking it.
+
+    :param product_id: Product primary key.
+    :param stock: Units available, or None to stop tracking stock.
+    """
+    Product.objects.filter(pk=product_id).update(
+        stock=stock, updated_at=timezone.now()
+    )
+    product_cache.invalidate(product_id)
+    bump_collections(PRODUCTS)
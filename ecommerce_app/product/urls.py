@@ -21,5 +21,8 @@ urlpatterns = [
          views.product_delete, name='product_delete'),
     path('get/products', views.view_products),
     path('get/products/xml', views.view_products_xml),
+    path('get/products/facets', views.view_product_facets),
     path('add/product', views.add_product),
+    path('add/products', views.add_products_bulk),
+    path('get/cache/stats', views.view_cache_stats),
 ]
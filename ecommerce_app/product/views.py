@@ -4,43 +4,156 @@ Includes:
 - Product detail view
 - Create new product
 - Update existing product
-- Delete product
+- Delete product, hiding it at once and leaving the rows to the purge
 '''
 
+from decimal import Decimal
+
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
+from .bulk import BulkFormatError, ingest_products, read_rows
+from .cache import get_product_or_404
+from .deletion import soft_delete_product
 from .models import Product, ProductSerializer
-from .forms import ProductForm
+from .facets import catalog_facets
+from .forms import ProductFilterForm, ProductForm
+from .stock import set_stock
 from django.http import JsonResponse
+from django.urls import reverse
+from ecommerce_app.pagination import (
+    InvalidCursor, get_page_size, next_page_url, paginate_keyset,
+    set_page_headers
+)
+from ecommerce_app.conditional import PRODUCTS, conditional_collection
+from ecommerce_app.object_cache import cache_stats
+from ecommerce_app.streaming import stream_export
+from reviews.histogram import rating_histogram
+from reviews.views import product_reviews_page
 from rest_framework.decorators import (
-    api_view, renderer_classes, authentication_classes, permission_classes
+    api_view, renderer_classes, authentication_classes, permission_classes,
+    parser_classes
 )
 from rest_framework.response import Response
 from rest_framework_xml.renderers import XMLRenderer
 from rest_framework import status
 from rest_framework.authentication import BasicAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+
+
+def _product_page(request, filters, page_size):
+    """Fetch one keyset page of filtered products with their stores joined.
+
+    :param request: Django or DRF request carrying an optional cursor.
+    :param filters: Validated ProductFilterForm.
+    :param page_size: Number of products per page.
+    :return: KeysetPage of products.
+    :raises InvalidCursor: If the cursor is malformed.
+    """
+    products = filters.filter(Product.objects.select_related('store'))
+    return paginate_keyset(
+        products, filters.ordering,
+        cursor=request.GET.get('cursor'),
+        limit=page_size,
+    )
+
+
+def _browse_url(params, **changes):
+    """Build a product list URL from the current filters plus changes.
+
+    The cursor is always dropped, since a new filter starts a new list.
+
+    :param params: QueryDict of the current request.
+    :param changes: Parameters to set, or to remove when None.
+    :return: Query string URL.
+    """
+    params = params.copy()
+    params.pop('cursor', None)
+    for key, value in changes.items():
+        if value is None:
+            params.pop(key, None)
+        else:
+            params[key] = value
+    return f'?{params.urlencode()}'
+
+
+def _facet_links(request, filters):
+    """Attach browse URLs and the active flag to the cached facets.
+
+    :param request: Django HttpRequest.
+    :param filters: Validated ProductFilterForm.
+    :return: Dict of category and price facets.
+    """
+    facets = catalog_facets()
+    data = filters.cleaned_data
+    current = (data.get('min_price'), data.get('max_price'))
+    categories = [
+        {**facet,
+         'url': _browse_url(request.GET, category=facet['category']),
+         'active': facet['category'] == data.get('category')}
+        for facet in facets['categories']
+    ]
+    prices = [
+        {**facet,
+         'url': _browse_url(
+             request.GET,
+             min_price=facet['min_price'], max_price=facet['max_price']),
+         'active': current == tuple(
+             Decimal(bound) if bound is not None else None
+             for bound in (facet['min_price'], facet['max_price']))}
+        for facet in facets['prices']
+    ]
+    return {'categories': categories, 'prices': prices}
 
 
 def product_list(request):
-    """List all products.
+    """List products one keyset page at a time, filtered and sorted.
+
+    Invalid filter values are ignored and reported on the filter form.
 
     :param request: Django HttpRequest.
     :return: Rendered product list page.
     """
-    products = Product.objects.all()
-    return render(request, 'product/product_list.html', {'products': products})
+    filters = ProductFilterForm(request.GET)
+    filters.is_valid()
+    try:
+        page = _product_page(request, filters, settings.PRODUCT_PAGE_SIZE)
+    except InvalidCursor:
+        return redirect(
+            reverse('product_list') + _browse_url(request.GET)
+        )
+    return render(request, 'product/product_list.html', {
+        'products': page.items,
+        'filters': filters,
+        'facets': _facet_links(request, filters),
+        'clear_url': reverse('product_list'),
+        'next_url': next_page_url(request, page),
+        'first_url': _browse_url(request.GET),
+        'is_first_page': not request.GET.get('cursor'),
+    })
 
 
 def product_detail(request, prod_id):
-    """Display details for a single product.
+    """Display a product with one page of its reviews and their histogram.
 
     :param request: Django HttpRequest.
     :param prod_id: Product identifier.
     :return: Rendered product detail page.
     """
-    product = get_object_or_404(Product, pk=prod_id)
-    return render(request, 'product/product_detail.html', {'product': product})
+    product = get_product_or_404(prod_id)
+    try:
+        reviews = product_reviews_page(request, product)
+    except InvalidCursor:
+        return redirect('product_detail', prod_id=prod_id)
+    return render(request, 'product/product_detail.html', {
+        'product': product,
+        'reviews': reviews.items,
+        'histogram': rating_histogram(product.prod_id),
+        'next_url': next_page_url(request, reviews),
+        'first_url': reverse('product_detail', args=[prod_id]),
+        'is_first_page': not request.GET.get('cursor'),
+    })
 
 
 @login_required
@@ -108,6 +221,8 @@ def product_update(request, prod_id):
         form = ProductForm(data, instance=product, user=request.user)
         if form.is_valid():
             form.save()
+            if form.stock_changed():
+                set_stock(product.prod_id, form.cleaned_data['stock'])
             messages.success(
                 request, f'Product "{product.name}" updated successfully!'
             )
@@ -127,6 +242,9 @@ def product_update(request, prod_id):
 def product_delete(request, prod_id):
     """Delete a product (vendors only).
 
+    The product is hidden straight away; ``purge_deleted`` removes it and
+    its reviews and order lines later.
+
     :param request: Django HttpRequest.
     :param prod_id: Product identifier.
     :return: Rendered confirmation or redirect.
@@ -142,7 +260,7 @@ def product_delete(request, prod_id):
 
     if request.method == 'POST':
         product_name = product.name
-        product.delete()
+        soft_delete_product(product)
         messages.success(
             request, f'Product "{product_name}" deleted successfully!'
         )
@@ -155,27 +273,86 @@ def product_delete(request, prod_id):
     )
 
 
+def _api_product_page(request, filters):
+    """Fetch the page of products requested by an API client.
+
+    :param request: DRF request with optional ``cursor`` and ``limit``.
+    :param filters: Validated ProductFilterForm.
+    :return: KeysetPage of products.
+    :raises InvalidCursor: If the cursor is malformed.
+    """
+    page_size = get_page_size(
+        request, settings.API_PAGE_SIZE, settings.API_MAX_PAGE_SIZE
+    )
+    return _product_page(request, filters, page_size)
+
+
+@conditional_collection(PRODUCTS)
 @api_view(['GET'])
 def view_products(request):
-    """Return all products in JSON format.
+    """Return one page of products in JSON format.
+
+    Accepts the ``category``, ``min_price``, ``max_price``, ``store`` and
+    ``sort`` filters of the product list. The next page is advertised in
+    the ``Link`` and ``X-Next-Cursor`` response headers. ``?stream=json``
+    or ``?stream=ndjson`` streams every matching product instead.
 
     :param request: Django HttpRequest.
-    :return: JsonResponse with products.
+    :return: JsonResponse or StreamingHttpResponse with products.
     """
-    serializer = ProductSerializer(Product.objects.all(), many=True)
-    return JsonResponse(data=serializer.data, safe=False)
+    filters = ProductFilterForm(request.GET)
+    if not filters.is_valid():
+        return JsonResponse(
+            filters.errors, status=status.HTTP_400_BAD_REQUEST)
+    streamed = stream_export(
+        request, filters.filter(Product.objects.all()), ProductSerializer,
+        ('prod_id',)
+    )
+    if streamed is not None:
+        return streamed
+    try:
+        page = _api_product_page(request, filters)
+    except InvalidCursor as exc:
+        return JsonResponse(
+            {'cursor': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = ProductSerializer(page.items, many=True)
+    response = JsonResponse(data=serializer.data, safe=False)
+    return set_page_headers(response, request, page)
 
 
+@conditional_collection(PRODUCTS)
 @api_view(['GET'])
 @renderer_classes([XMLRenderer])
 def view_products_xml(request):
-    """Return all products in XML format.
+    """Return one page of products in XML format.
+
+    Takes the same filters as :func:`view_products`.
 
     :param request: Django HttpRequest.
     :return: DRF Response with products in XML.
     """
-    serializer = ProductSerializer(Product.objects.all(), many=True)
-    return Response(data=serializer.data)
+    filters = ProductFilterForm(request.GET)
+    if not filters.is_valid():
+        return Response(
+            filters.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = _api_product_page(request, filters)
+    except InvalidCursor as exc:
+        return Response(
+            {'cursor': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = ProductSerializer(page.items, many=True)
+    response = Response(data=serializer.data)
+    return set_page_headers(response, request, page)
+
+
+@api_view(['GET'])
+def view_product_facets(request):
+    """Return product counts per store category and price bucket.
+
+    :param request: Django HttpRequest.
+    :return: JsonResponse with cached facet counts.
+    """
+    return JsonResponse(catalog_facets())
 
 
 @api_view(['POST'])
@@ -198,3 +375,52 @@ def add_product(request):
     return JsonResponse(
         {'Permission denied': 'Only vendors can create products'},
         status=status.HTTP_403_FORBIDDEN)
+
+
+@api_view(['POST'])
+@parser_classes([JSONParser, MultiPartParser])
+@authentication_classes([BasicAuthentication])
+@permission_classes([IsAuthenticated])
+def add_products_bulk(request):
+    """Create many products in one call (vendors only).
+
+    Accepts a JSON array, NDJSON, CSV or a multipart ``file`` upload.
+    Valid rows are inserted in batches; rejected rows are reported by
+    their 1-based position in the upload.
+
+    :param request: Django HttpRequest.
+    :return: JsonResponse with created and failed counts and row errors.
+    """
+    if request.user.user_type != 'vendor':
+        return JsonResponse(
+            {'Permission denied': 'Only vendors can create products'},
+            status=status.HTTP_403_FORBIDDEN)
+    try:
+        rows = read_rows(request)
+        report = ingest_products(
+            rows, request.user,
+            batch_size=settings.BULK_PRODUCT_BATCH_SIZE,
+            max_rows=settings.BULK_PRODUCT_MAX_ROWS,
+        )
+    except BulkFormatError as exc:
+        return JsonResponse(
+            {'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    if not report['failed']:
+        code = status.HTTP_201_CREATED
+    elif report['created']:
+        code = status.HTTP_207_MULTI_STATUS
+    else:
+        code = status.HTTP_400_BAD_REQUEST
+    return JsonResponse(report, status=code)
+
+
+@api_view(['GET'])
+@authentication_classes([BasicAuthentication])
+@permission_classes([IsAdminUser])
+def view_cache_stats(request):
+    """Return this worker's object cache counters (admin only).
+
+    :param request: Django HttpRequest.
+    :return: JsonResponse with hit and miss counts per cache.
+    """
+    return JsonResponse(cache_stats())
@@ -0,0 +1,174 @@
+'''Keep the review aggregates stored on Product up to date.
+Includes:
+- Incremental updates when a single review is added or removed
+- Recomputing the aggregates of some or all products from scratch
+'''
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import (
+    Case, Count, DecimalField, F, FloatField, Q, Sum, Value, When
+)
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from ecommerce_app.conditional import PRODUCTS, bump_collections
+from ecommerce_app.pagination import iter_keyset_chunks
+from leaderboard.ranking import refresh_products
+from product.cache import product_cache
+from product.models import AGGREGATE_FIELDS, Product
+from .models import Review
+
+REBUILD_CHUNK_SIZE = 1000
+
+# avg_rating recomputed from the stored counters by the database
+AVERAGE_RATING = Case(
+    When(review_count__lte=0, then=Value(Decimal('0'))),
+    default=Round(
+        F('rating_total') * Value(1.0, output_field=FloatField())
+        / F('review_count'),
+        2,
+    ),
+    output_field=DecimalField(max_digits=3, decimal_places=2),
+)
+
+
+def _adjust(review, sign):
+    """Add (sign=1) or remove (sign=-1) one review from its product.
+
+    :param review: Review instance.
+    :param sign: 1 or -1.
+    """
+    products = Product.objects.filter(pk=review.product_id)
+    with transaction.atomic(savepoint=False):
+        products.update(
+            review_count=F('review_count') + sign,
+            rating_total=F('rating_total') + sign * review.rating,
+            verified_review_count=(
+                F('verified_review_count')
+                + (sign if review.is_verified_purchase else 0)
+            ),
+            verified_rating_total=(
+                F('verified_rating_total')
+                + (sign * review.rating if review.is_verified_purchase else 0)
+            ),
+            updated_at=timezone.now(),
+        )
+        # Separate statement: MySQL applies SET clauses left to right, so
+        # combining both would make the result depend on the backend
+        products.update(avg_rating=AVERAGE_RATING)
+        refresh_products([review.product_id])
+    product_cache.invalidate(review.product_id)
+
+
+def review_added(review):
+    """Count a newly created review in its product's aggregates.
+
+    :param review: Saved Review instance.
+    """
+    _adjust(review, 1)
+
+
+def review_removed(review):
+    """Remove a deleted review from its product's aggregates.
+
+    :param review: Deleted Review instance.
+    """
+    _adjust(review, -1)
+
+
+def _review_stats(product_ids):
+    """Aggregate the reviews of some products in one grouped query.
+
+    :param product_ids: List of product primary keys.
+    :return: Dict mapping product id to (count, total, verified,
+        verified total).
+    """
+    rows = (
+        Review.objects.filter(product_id__in=product_ids)
+        .values('product_id')
+        .annotate(
+            count=Count('review_id'),
+            total=Sum('rating'),
+            verified=Count(
+                'review_id', filter=Q(is_verified_purchase=True)
+            ),
+            verified_total=Sum(
+                'rating', filter=Q(is_verified_purchase=True), default=0
+            ),
+        )
+    )
+    return {
+        row['product_id']: (
+            row['count'], row['total'], row['verified'],
+            row['verified_total'],
+        )
+        for row in rows
+    }
+
+
+def rebuild_aggregates(queryset=None, chunk_size=REBUILD_CHUNK_SIZE):
+    """Recompute review aggregates from the Review table, fixing drift.
+
+    Products are processed in primary-key chunks. Each chunk locks its
+    product rows first, so reviews posted meanwhile wait for the chunk to
+    commit and are then counted on top of the rebuilt values.
+
+    :param queryset: Products to rebuild, all products when None.
+    :param chunk_size: Number of products per transaction.
+    :return: Tuple (products checked, products corrected).
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+    checked = fixed = 0
+    chunks = iter_keyset_chunks(
+        queryset.only('prod_id'), ('prod_id',), chunk_size
+    )
+    for chunk in chunks:
+        ids = [product.prod_id for product in chunk]
+        with transaction.atomic():
+            products = list(
+                Product.objects.select_for_update()
+                .filter(prod_id__in=ids)
+                .only('prod_id', *AGGREGATE_FIELDS)
+            )
+            stats = _review_stats(ids)
+            changed = []
+            for product in products:
+                count, total, verified, verified_total = stats.get(
+                    product.prod_id, (0, 0, 0, 0)
+                )
+                average = (
+                    (Decimal(total) / count).quantize(
+                        Decimal('0.01'), ROUND_HALF_UP)
+                    if count else Decimal('0.00')
+                )
+                current = (
+                    product.review_count, product.rating_total,
+                    product.verified_review_count,
+                    product.verified_rating_total, product.avg_rating,
+                )
+                fresh = (count, total, verified, verified_total, average)
+                if current != fresh:
+                    product.review_count = count
+                    product.rating_total = total
+                    product.verified_review_count = verified
+                    product.verified_rating_total = verified_total
+                    product.avg_rating = average
+                    changed.append(product)
+            if changed:
+                now = timezone.now()
+                for product in changed:
+                    product.updated_at = now
+                Product.objects.bulk_update(
+                    changed, (*AGGREGATE_FIELDS, 'updated_at')
+                )
+                refresh_products(product.prod_id for product in changed)
+        for product in changed:
+            product_cache.invalidate(product.prod_id)
+        if changed:
+            bump_collections(PRODUCTS)
+        checked += len(products)
+        fixed += len(changed)
+    return checked, fixed
@@ -0,0 +1,119 @@
+'''Bulk review ingestion for partners migrating review history.
+Includes:
+- Validating rows against products and users once per batch
+- Flagging verified purchases with one lookup per batch
+- Inserting each batch and recounting its products' aggregates once
+'''
+
+from django.db import transaction
+
+from cart.purchases import purchased_pairs
+from ecommerce_app.conditional import REVIEWS, bump_collections
+from product.models import Product
+from users.models import User
+from .aggregates import rebuild_aggregates
+from .histogram import invalidate_histograms
+from .models import BulkReviewSerializer, Review
+
+
+def _insert_batch(batch):
+    """Insert one batch of validated rows and update their products.
+
+    :param batch: List of (row number, validated data) tuples.
+    :return: Tuple (reviews inserted, row errors).
+    """
+    product_ids = {values['product'] for _, values in batch}
+    user_ids = {values['user'] for _, values in batch}
+    known_products = set(
+        Product.objects.filter(prod_id__in=product_ids)
+        .values_list('prod_id', flat=True)
+    )
+    usernames = dict(
+        User.objects.filter(pk__in=user_ids).values_list('pk', 'username')
+    )
+
+    reviews = []
+    errors = []
+    for number, values in batch:
+        problems = {}
+        if values['product'] not in known_products:
+            problems['product'] = ['Unknown product.']
+        if values['user'] not in usernames:
+            problems['user'] = ['Unknown user.']
+        if problems:
+            errors.append({'row': number, 'errors': problems})
+            continue
+        reviews.append(Review(
+            product_id=values['product'],
+            user_id=values['user'],
+            username=usernames[values['user']],
+            rating=values['rating'],
+            comment=values['comment'],
+        ))
+    if not reviews:
+        return 0, errors
+
+    verified = purchased_pairs(
+        (review.user_id, review.product_id) for review in reviews
+    )
+    for review in reviews:
+        review.is_verified_purchase = (
+            (review.user_id, review.product_id) in verified
+        )
+    touched = {review.product_id for review in reviews}
+    # bulk_create skips the review signals; recount each product once
+    with transaction.atomic():
+        Review.objects.bulk_create(reviews)
+        rebuild_aggregates(Product.objects.filter(prod_id__in=touched))
+    invalidate_histograms(touched)
+    bump_collections(REVIEWS)
+    return len(reviews), errors
+
+
+def ingest_reviews(rows, submitter, batch_size, max_rows):
+    """Validate and insert uploaded reviews in batches.
+
+    Staff may submit reviews on behalf of any user; everyone else only
+    their own. Valid rows are inserted even when others fail, and the
+    report lists every rejected row by its position in the upload.
+
+    :param rows: Iterator from :func:`product.bulk.read_rows`.
+    :param submitter: Authenticated user sending the upload.
+    :param batch_size: Number of reviews per insert transaction.
+    :param max_rows: Largest number of rows accepted in one upload.
+    :return: Dict with ``created``, ``failed`` and per-row ``errors``.
+    """
+    context = {'user_id': None if submitter.is_staff else submitter.pk}
+    created = 0
+    errors = []
+    batch = []
+    for number, record, error in rows:
+        if number > max_rows:
+            errors.append({'row': number, 'errors': {'non_field_errors': [
+                f'Uploads are limited to {max_rows} rows; the rest was '
+                f'not read.'
+            ]}})
+            break
+        if error is None and not isinstance(record, dict):
+            error = 'Expected an object.'
+        if error is not None:
+            errors.append({
+                'row': number, 'errors': {'non_field_errors': [error]}
+            })
+            continue
+        serializer = BulkReviewSerializer(data=record, context=context)
+        if not serializer.is_valid():
+            errors.append({'row': number, 'errors': serializer.errors})
+            continue
+        batch.append((number, serializer.validated_data))
+        if len(batch) >= batch_size:
+            inserted, rejected = _insert_batch(batch)
+            created += inserted
+            errors.extend(rejected)
+            batch = []
+    if batch:
+        inserted, rejected = _insert_batch(batch)
+        created += inserted
+        errors.extend(rejected)
+    errors.sort(key=lambda error: error['row'])
+    return {'created': created, 'failed': len(errors), 'errors': errors}
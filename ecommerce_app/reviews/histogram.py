@@ -0,0 +1,74 @@
+'''Star rating histograms for the product page.
+
+A product's reviews are counted per rating in one grouped query on the
+(product, created_at) index and cached for
+``REVIEW_HISTOGRAM_CACHE_TIMEOUT`` seconds. Review signals drop the
+cached copy whenever a review of the product changes.
+'''
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Review
+
+RATINGS = (5, 4, 3, 2, 1)
+
+
+def _key(product_id):
+    return f'reviews:histogram:{product_id}'
+
+
+def compute_histogram(product_id):
+    """Count a product's reviews per star rating.
+
+    :param product_id: Product primary key.
+    :return: Dict mapping each rating 1-5 to its number of reviews.
+    """
+    rows = (
+        Review.objects.filter(product_id=product_id)
+        .values('rating')
+        .annotate(count=Count('review_id'))
+        .order_by()
+    )
+    counts = dict.fromkeys(RATINGS, 0)
+    counts.update((row['rating'], row['count']) for row in rows)
+    return counts
+
+
+def rating_histogram(product_id):
+    """Return the cached histogram of a product, computing it when missing.
+
+    :param product_id: Product primary key.
+    :return: List of dicts with rating, count and percent, from 5 stars
+        down to 1.
+    """
+    counts = cache.get(_key(product_id))
+    if counts is None:
+        counts = compute_histogram(product_id)
+        cache.set(
+            _key(product_id), counts,
+            settings.REVIEW_HISTOGRAM_CACHE_TIMEOUT,
+        )
+    total = sum(counts.values())
+    return [
+        {'rating': rating, 'count': counts[rating],
+         'percent': round(100 * counts[rating] / total) if total else 0}
+        for rating in RATINGS
+    ]
+
+
+def invalidate_histograms(product_ids):
+    """Forget the cached histograms of some products.
+
+    Like the object caches, the entries are dropped straight away and
+    again on commit, so a concurrent reader cannot cache the old counts.
+
+    :param product_ids: Product primary keys.
+    """
+    keys = [_key(product_id) for product_id in product_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
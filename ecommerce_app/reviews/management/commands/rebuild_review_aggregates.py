@@ -0,0 +1,36 @@
+'''Management command to recompute product review aggregates.
+
+Signals keep the aggregates current for single review saves and deletes;
+run this after bulk imports or raw SQL changes that bypass them.
+'''
+
+from django.core.management.base import BaseCommand
+
+from product.models import Product
+from reviews.aggregates import REBUILD_CHUNK_SIZE, rebuild_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Recompute avg_rating and review counts of every product.'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        :param parser: Argument parser for the command.
+        """
+        parser.add_argument(
+            '--chunk-size', type=int, default=REBUILD_CHUNK_SIZE,
+            help='Number of products checked per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        """Compare every product with its reviews and fix any drift.
+
+        :return: None.
+        """
+        checked, fixed = rebuild_aggregates(
+            Product.objects.all(), chunk_size=options['chunk_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} products, corrected {fixed}.'
+        ))
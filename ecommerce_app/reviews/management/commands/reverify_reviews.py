@@ -0,0 +1,145 @@
+'''Management command to recompute the verified-purchase flag of reviews.
+
+Reviews are flagged when they are written; run this after rebuilding the
+purchases table or changing orders in bulk. Reviews are fixed in
+primary-key ranges, one short transaction each. Progress is saved to a
+checkpoint file after every range, so an interrupted run carries on
+where it stopped when started again.
+'''
+
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.verification import (
+    REVERIFY_CHUNK_SIZE, reverify_range, review_id_range
+)
+
+DEFAULT_CHECKPOINT = 'reverify_reviews.checkpoint'
+
+
+def read_checkpoint(path):
+    """Load the progress of an interrupted run.
+
+    :param path: Checkpoint file path.
+    :return: Dict with next_id, verified and unverified, or None.
+    """
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+    except ValueError as exc:
+        raise CommandError(f'Unreadable checkpoint {path}: {exc}')
+
+
+def write_checkpoint(path, progress):
+    """Save progress atomically, so a crash never leaves half a file.
+
+    :param path: Checkpoint file path.
+    :param progress: Dict with next_id, verified and unverified.
+    """
+    temp = f'{path}.tmp'
+    with open(temp, 'w') as handle:
+        json.dump(progress, handle)
+    os.replace(temp, path)
+
+
+class Command(BaseCommand):
+    help = 'Recompute is_verified_purchase of every review from purchases.'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        :param parser: Argument parser for the command.
+        """
+        parser.add_argument(
+            '--chunk-size', type=int, default=REVERIFY_CHUNK_SIZE,
+            help='Width of the review id range fixed per transaction.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='List the reviews that would change without saving.'
+        )
+        parser.add_argument(
+            '--checkpoint', default=DEFAULT_CHECKPOINT,
+            help='File recording progress between runs.'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore the checkpoint and start from the first review.'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to wait between ranges, to ease database load.'
+        )
+
+    def handle(self, *args, **options):
+        """Fix every range of reviews, resuming from the checkpoint.
+
+        :return: None.
+        """
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        path = options['checkpoint']
+
+        # A dry run saves no progress, so it also starts from no progress
+        progress = (
+            None if options['restart'] or dry_run
+            else read_checkpoint(path)
+        )
+        bounds = review_id_range()
+        if bounds is None:
+            self.stdout.write('No reviews to check.')
+            return
+        if progress is None:
+            progress = {
+                'next_id': bounds[0], 'verified': 0, 'unverified': 0,
+            }
+        else:
+            self.stdout.write(f'Resuming at review {progress["next_id"]}.')
+
+        start = progress['next_id']
+        while start <= bounds[1]:
+            end = start + chunk_size
+            verified, unverified = reverify_range(start, end, dry_run)
+            for review_id, product_id in verified:
+                self._report('+', review_id, product_id, dry_run)
+            for review_id, product_id in unverified:
+                self._report('-', review_id, product_id, dry_run)
+            progress['verified'] += len(verified)
+            progress['unverified'] += len(unverified)
+            progress['next_id'] = start = end
+            if not dry_run:
+                write_checkpoint(path, progress)
+            if options['pause'] and start <= bounds[1]:
+                time.sleep(options['pause'])
+
+        summary = (
+            f'{progress["verified"]} reviews verified, '
+            f'{progress["unverified"]} no longer verified.'
+        )
+        if dry_run:
+            self.stdout.write(f'Dry run: {summary}')
+            return
+        if os.path.exists(path):
+            os.remove(path)
+        self.stdout.write(self.style.SUCCESS(f'Done: {summary}'))
+
+    def _report(self, sign, review_id, product_id, dry_run):
+        """Print one changed review in dry runs or at verbosity 2.
+
+        :param sign: ``+`` when newly verified, ``-`` when no longer.
+        :param review_id: Primary key of the review.
+        :param product_id: Primary key of its product.
+        :param dry_run: Whether the command is only reporting.
+        """
+        if dry_run or self.verbosity > 1:
+            self.stdout.write(
+                f'{sign} review {review_id} (product {product_id})'
+            )
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:40
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def backfill_aggregates(apps, schema_editor):
+    """Compute review aggregates of products reviewed before they existed.
+
+    :param apps: Historical app registry.
+    :param schema_editor: Schema editor in use.
+    """
+    Product = apps.get_model('product', 'Product')
+    Review = apps.get_model('reviews', 'Review')
+    rows = (
+        Review.objects.values('product_id')
+        .annotate(
+            count=Count('review_id'),
+            total=Sum('rating'),
+            verified=Count('review_id', filter=Q(is_verified_purchase=True)),
+        )
+        .order_by('product_id')
+    )
+    changed = []
+    for row in rows.iterator():
+        changed.append(Product(
+            prod_id=row['product_id'],
+            review_count=row['count'],
+            rating_total=row['total'],
+            verified_review_count=row['verified'],
+            avg_rating=(
+                Decimal(row['total']) / row['count']
+            ).quantize(Decimal('0.01'), ROUND_HALF_UP),
+        ))
+        if len(changed) >= 1000:
+            Product.objects.bulk_update(changed, [
+                'review_count', 'rating_total', 'verified_review_count',
+                'avg_rating',
+            ])
+            changed = []
+    Product.objects.bulk_update(changed, [
+        'review_count', 'rating_total', 'verified_review_count',
+        'avg_rating',
+    ])
+
+
+class Migration(migrations.Migration):
+    """Fill in product review aggregates from existing reviews."""
+
+    dependencies = [
+        ('reviews', '0002_review_is_verified_purchase'),
+        ('product', '0002_product_review_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
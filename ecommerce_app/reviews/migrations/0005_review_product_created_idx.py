@@ -0,0 +1,20 @@
+# Generated by Django 5.2.10 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Index reviews by product and date for the product review pages."""
+
+    dependencies = [
+        ('reviews', '0004_review_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(
+                fields=['product', 'created_at'],
+                name='review_product_created_idx'),
+        ),
+    ]
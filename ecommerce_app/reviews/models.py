@@ -7,9 +7,10 @@ Includes fields:
 - rating: IntegerField (1 to 5)
 - comment: TextField
 - created_at: DateTimeField (auto_now_add=True)
+- updated_at: DateTimeField (auto_now=True), drives API ETags
 '''
 
-from django.db import models
+from django.db import models, transaction
 from product.models import Product
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -38,6 +39,16 @@ class Review(models.Model):
         default=False,
         help_text='True if the user purchased this product'
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # A product's reviews newest first, and its rating histogram
+            models.Index(
+                fields=['product', 'created_at'],
+                name='review_product_created_idx',
+            ),
+        ]
 
     def __str__(self):
         return (
@@ -45,14 +56,16 @@ class Review(models.Model):
             f'for {self.product.name}'
         )
 
+    def save(self, *args, **kwargs):
+        # post_save updates the product's review aggregates; keep that in
+        # the same transaction as the review itself
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def check_verified_purchase(self):
         """Check if the user who wrote this review purchased the product"""
-        from cart.models import OrderItem
-        return OrderItem.objects.filter(
-            order__user=self.user,
-            product=self.product,
-            order__status='completed'
-        ).exists()
+        from cart.purchases import has_purchased
+        return has_purchased(self.user_id, self.product_id)
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -60,5 +73,29 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = [
             'review_id', 'product', 'user', 'username',
-            'rating', 'comment', 'created_at', 'is_verified_purchase'
+            'rating', 'comment', 'created_at', 'is_verified_purchase',
+            'updated_at'
         ]
+
+
+class BulkReviewSerializer(serializers.ModelSerializer):
+    """Review fields accepted by bulk uploads.
+
+    The product and author are plain ids, checked for a whole batch at
+    once instead of with one query per row. When
+    ``context['user_id']`` is set, rows may only be written as that user.
+    """
+    product = serializers.IntegerField()
+    user = serializers.IntegerField()
+
+    class Meta:
+        model = Review
+        fields = ['product', 'user', 'rating', 'comment']
+
+    def validate_user(self, value):
+        owner = self.context.get('user_id')
+        if owner is not None and value != owner:
+            raise serializers.ValidationError(
+                'You can only submit your own reviews.'
+            )
+        return value
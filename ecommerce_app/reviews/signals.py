@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ecommerce_app.conditional import PRODUCTS, REVIEWS, bump_collections
+from .aggregates import rebuild_aggregates, review_added, review_removed
+from .histogram import invalidate_histograms
+from .models import Review
+from product.models import Product
+from store.models import Store
+
+
+@receiver(post_save, sender=Review)
+def review_aggregates_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        review_added(instance)
+    else:
+        # Rating or verification may have changed; recount this product
+        rebuild_aggregates(Product.objects.filter(pk=instance.product_id))
+    invalidate_histograms([instance.product_id])
+
+
+@receiver(post_delete, sender=Review)
+def review_aggregates_delete(sender, instance, origin=None, **kwargs):
+    # Reviews cascading from a product or store delete take the product
+    # with them, so there is nothing left to update
+    if getattr(origin, 'model', type(origin)) in (Product, Store):
+        return
+    review_removed(instance)
+    invalidate_histograms([instance.product_id])
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_collection_changed(sender, instance, **kwargs):
+    # The product's review counts and average change with it
+    bump_collections(REVIEWS, PRODUCTS)
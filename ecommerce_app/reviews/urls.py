@@ -3,6 +3,7 @@ Including:
 - URL pattern for listing reviews
 - URL pattern for review detail
 - URL pattern for creating a review
+- API URL patterns for reading, adding and bulk uploading reviews
 '''
 
 from django.urls import path
@@ -16,4 +17,5 @@ urlpatterns = [
     path('get/reviews', views.view_reviews),
     path('get/reviews/xml', views.view_reviews_xml),
     path('add/review', views.add_review),
+    path('add/reviews', views.add_reviews_bulk),
 ]
@@ -0,0 +1,94 @@
+'''Recompute Review.is_verified_purchase in bulk.
+Includes:
+- Finding reviews whose verified flag disagrees with the purchases
+- Fixing one primary-key range of reviews with set-based UPDATEs
+
+A review is verified when its author bought the product in a completed
+order, i.e. a matching cart.PurchasedProduct row exists.
+'''
+
+from django.db import transaction
+from django.db.models import Exists, Max, Min, OuterRef
+from django.utils import timezone
+
+from cart.models import PurchasedProduct
+from ecommerce_app.conditional import REVIEWS, bump_collections
+from product.models import Product
+from .aggregates import rebuild_aggregates
+from .models import Review
+
+REVERIFY_CHUNK_SIZE = 5000
+
+PURCHASED = Exists(
+    PurchasedProduct.objects.filter(
+        user_id=OuterRef('user_id'), product_id=OuterRef('product_id')
+    )
+)
+
+
+def review_id_range():
+    """Return the lowest and highest review primary key.
+
+    :return: Tuple (first id, last id), or None without reviews.
+    """
+    bounds = Review.objects.aggregate(
+        first=Min('review_id'), last=Max('review_id')
+    )
+    if bounds['first'] is None:
+        return None
+    return bounds['first'], bounds['last']
+
+
+def _mismatches(start, end):
+    """Select the reviews of a key range whose flag is wrong.
+
+    :param start: First review id of the range.
+    :param end: Review id just past the range.
+    :return: Tuple of querysets (to verify, to unverify).
+    """
+    reviews = Review.objects.filter(review_id__gte=start, review_id__lt=end)
+    return (
+        reviews.filter(PURCHASED, is_verified_purchase=False),
+        reviews.filter(~PURCHASED, is_verified_purchase=True),
+    )
+
+
+def reverify_range(start, end, dry_run=False):
+    """Bring the verified flag of a range of reviews in line with purchases.
+
+    Two ``UPDATE ... WHERE [NOT] EXISTS`` statements fix the whole range,
+    and only the products whose reviews changed have their aggregates
+    recounted. The flags and the counts are fixed in one short
+    transaction, so locks are held for one range at a time.
+
+    :param start: First review id of the range.
+    :param end: Review id just past the range.
+    :param dry_run: When True only report what would change.
+    :return: Tuple of lists of (review id, product id) pairs
+        (newly verified, no longer verified).
+    """
+    to_verify, to_unverify = _mismatches(start, end)
+    with transaction.atomic():
+        if not dry_run:
+            # Lock the rows about to flip so the reported diff and the
+            # UPDATEs below agree
+            to_verify = to_verify.select_for_update()
+            to_unverify = to_unverify.select_for_update()
+        verified = list(to_verify.values_list('review_id', 'product_id'))
+        unverified = list(
+            to_unverify.values_list('review_id', 'product_id')
+        )
+        if dry_run or not (verified or unverified):
+            return verified, unverified
+
+        now = timezone.now()
+        to_verify, to_unverify = _mismatches(start, end)
+        to_verify.update(is_verified_purchase=True, updated_at=now)
+        to_unverify.update(is_verified_purchase=False, updated_at=now)
+        bump_collections(REVIEWS)
+        # Recounted before the commit, so no reader ever sees the new
+        # flags with the old counts; the product cache entries are
+        # dropped again once the transaction commits
+        product_ids = {product_id for _, product_id in verified + unverified}
+        rebuild_aggregates(Product.objects.filter(prod_id__in=product_ids))
+    return verified, unverified
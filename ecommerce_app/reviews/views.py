@@ -1,33 +1,98 @@
 ''' module for review views
 Includes:
-- List all reviews
+- Review feed, newest first, one keyset page at a time
+- Review API, one keyset page at a time or streamed
 - Review detail view
 - Create new review
+- Bulk review upload for migrating review history
 '''
+from django.conf import settings
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from .bulk import ingest_reviews
 from .models import Review, ReviewSerializer
 from .forms import ReviewForm
 from django.http import JsonResponse
+from django.urls import reverse
+from ecommerce_app.conditional import REVIEWS, conditional_collection
+from ecommerce_app.pagination import (
+    InvalidCursor, get_page_size, next_page_url, paginate_keyset,
+    set_page_headers
+)
+from ecommerce_app.streaming import stream_export
+from product.bulk import BulkFormatError, read_rows
 from rest_framework.decorators import (
-    api_view, renderer_classes, authentication_classes, permission_classes
+    api_view, renderer_classes, authentication_classes, permission_classes,
+    parser_classes
 )
 from rest_framework.response import Response
 from rest_framework_xml.renderers import XMLRenderer
 from rest_framework import status
 from rest_framework.authentication import BasicAuthentication
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 
 
+# Review ids grow with created_at, so the feed is read newest first
+# straight off the primary key
+FEED_KEYS = ('-review_id',)
+# Served by the (product, created_at) index
+PRODUCT_REVIEW_KEYS = ('-created_at', '-review_id')
+# The API lists and exports reviews oldest first
+API_KEYS = ('review_id',)
+
+
+def _visible_reviews():
+    """Reviews of products that have not been deleted.
+
+    A deleted product's reviews stay in the table until the purge
+    removes them, but are no longer listed.
+
+    :return: Review queryset.
+    """
+    return Review.objects.filter(product__deleted_at__isnull=True)
+
+
+def product_reviews_page(request, product):
+    """Fetch one keyset page of a product's reviews, newest first.
+
+    :param request: Django HttpRequest carrying an optional cursor.
+    :param product: Product whose reviews are listed.
+    :return: KeysetPage of reviews with ``product`` attached.
+    :raises InvalidCursor: If the cursor is malformed.
+    """
+    page = paginate_keyset(
+        Review.objects.filter(product_id=product.prod_id),
+        PRODUCT_REVIEW_KEYS,
+        cursor=request.GET.get('cursor'),
+        limit=settings.REVIEW_PAGE_SIZE,
+    )
+    for review in page:
+        review.product = product
+    return page
+
+
 def review_list(request):
-    """List all reviews.
+    """List reviews newest first, one keyset page at a time.
 
     :param request: Django HttpRequest.
     :return: Rendered review list page.
     """
-    reviews = Review.objects.all()
-    return render(request, 'reviews/review_list.html', {'reviews': reviews})
+    try:
+        page = paginate_keyset(
+            _visible_reviews().select_related('product'), FEED_KEYS,
+            cursor=request.GET.get('cursor'),
+            limit=settings.REVIEW_PAGE_SIZE,
+        )
+    except InvalidCursor:
+        return redirect('review_list')
+    return render(request, 'reviews/review_list.html', {
+        'reviews': page.items,
+        'next_url': next_page_url(request, page),
+        'first_url': reverse('review_list'),
+        'is_first_page': not request.GET.get('cursor'),
+    })
 
 
 def review_detail(request, review_id):
@@ -37,7 +102,7 @@ def review_detail(request, review_id):
     :param review_id: Review identifier.
     :return: Rendered review detail page.
     """
-    review = get_object_or_404(Review, pk=review_id)
+    review = get_object_or_404(_visible_reviews(), pk=review_id)
     return render(request, 'reviews/review_detail.html', {'review': review})
 
 
@@ -49,7 +114,7 @@ def review_create(request):
     :return: Rendered form or redirect.
     """
     from product.models import Product
-    from cart.models import OrderItem
+    from cart.purchases import has_purchased
 
     if request.method == 'POST':
         data = request.POST.copy()
@@ -60,11 +125,7 @@ def review_create(request):
             product_id = form.cleaned_data['product'].prod_id
 
             # Check if user purchased this product
-            is_verified = OrderItem.objects.filter(
-                order__user=request.user,
-                product_id=product_id,
-                order__status='completed'
-            ).exists()
+            is_verified = has_purchased(request.user, product_id)
 
             review = form.save(commit=False)
             review.user = request.user
@@ -92,27 +153,69 @@ def review_create(request):
     })
 
 
+def _api_review_page(request):
+    """Fetch the page of reviews requested by an API client.
+
+    :param request: DRF request with optional ``cursor`` and ``limit``.
+    :return: KeysetPage of reviews.
+    :raises InvalidCursor: If the cursor is malformed.
+    """
+    page_size = get_page_size(
+        request, settings.API_PAGE_SIZE, settings.API_MAX_PAGE_SIZE
+    )
+    return paginate_keyset(
+        _visible_reviews(), API_KEYS,
+        cursor=request.GET.get('cursor'),
+        limit=page_size,
+    )
+
+
+@conditional_collection(REVIEWS)
 @api_view(['GET'])
 def view_reviews(request):
-    """Return all reviews in JSON format.
+    """Return one page of reviews in JSON format.
+
+    The next page is advertised in the ``Link`` and ``X-Next-Cursor``
+    response headers. ``?stream=json`` or ``?stream=ndjson`` streams
+    every review in chunks instead.
 
     :param request: Django HttpRequest.
-    :return: JsonResponse with reviews.
+    :return: JsonResponse or StreamingHttpResponse with reviews.
     """
-    serializer = ReviewSerializer(Review.objects.all(), many=True)
-    return JsonResponse(data=serializer.data, safe=False)
+    streamed = stream_export(
+        request, _visible_reviews(), ReviewSerializer, API_KEYS
+    )
+    if streamed is not None:
+        return streamed
+    try:
+        page = _api_review_page(request)
+    except InvalidCursor as exc:
+        return JsonResponse(
+            {'cursor': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = ReviewSerializer(page.items, many=True)
+    response = JsonResponse(data=serializer.data, safe=False)
+    return set_page_headers(response, request, page)
 
 
+@conditional_collection(REVIEWS)
 @api_view(['GET'])
 @renderer_classes([XMLRenderer])
 def view_reviews_xml(request):
-    """Return all reviews in XML format.
+    """Return one page of reviews in XML format.
+
+    Paged like :func:`view_reviews`.
 
     :param request: Django HttpRequest.
     :return: DRF Response with reviews in XML.
     """
-    serializer = ReviewSerializer(Review.objects.all(), many=True)
-    return Response(data=serializer.data)
+    try:
+        page = _api_review_page(request)
+    except InvalidCursor as exc:
+        return Response(
+            {'cursor': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = ReviewSerializer(page.items, many=True)
+    response = Response(data=serializer.data)
+    return set_page_headers(response, request, page)
 
 
 @api_view(['POST'])
@@ -124,10 +227,15 @@ def add_review(request):
     :param request: Django HttpRequest.
     :return: JsonResponse with review data or errors.
     """
-    if request.user.id == request.data.get('user'):
+    from cart.purchases import has_purchased
+
+    if request.user.pk == request.data.get('user'):
         serializer = ReviewSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            product = serializer.validated_data['product']
+            serializer.save(is_verified_purchase=has_purchased(
+                request.user, product.prod_id
+            ))
             return JsonResponse(
                 data=serializer.data, status=status.HTTP_201_CREATED)
         return JsonResponse(
@@ -135,3 +243,37 @@ def add_review(request):
     return JsonResponse(
         {'ID mismatch': 'User Id and Review user ID not matching'},
         status=status.HTTP_403_FORBIDDEN)
+
+
+@api_view(['POST'])
+@parser_classes([JSONParser, MultiPartParser])
+@authentication_classes([BasicAuthentication])
+@permission_classes([IsAuthenticated])
+def add_reviews_bulk(request):
+    """Create many reviews in one call.
+
+    Accepts a JSON array, NDJSON, CSV or a multipart ``file`` upload.
+    Staff may submit reviews for any user, everyone else only their
+    own. Verified purchases are looked up once per batch, and each
+    batch updates its products' rating aggregates once.
+
+    :param request: Django HttpRequest.
+    :return: JsonResponse with created and failed counts and row errors.
+    """
+    try:
+        rows = read_rows(request, label='reviews')
+        report = ingest_reviews(
+            rows, request.user,
+            batch_size=settings.BULK_REVIEW_BATCH_SIZE,
+            max_rows=settings.BULK_REVIEW_MAX_ROWS,
+        )
+    except BulkFormatError as exc:
+        return JsonResponse(
+            {'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    if not report['failed']:
+        code = status.HTTP_201_CREATED
+    elif report['created']:
+        code = status.HTTP_207_MULTI_STATUS
+    else:
+        code = status.HTTP_400_BAD_REQUEST
+    return JsonResponse(report, status=code)
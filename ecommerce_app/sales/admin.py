@@ -0,0 +1,18 @@
+from django.contrib import admin
+from .models import ProductDailySales, StoreDailySales
+
+# Register sales rollups for admin
+
+
+@admin.register(StoreDailySales)
+class StoreDailySalesAdmin(admin.ModelAdmin):
+    list_display = ('store', 'day', 'units', 'revenue', 'orders')
+    list_filter = ('day',)
+    raw_id_fields = ('store',)
+
+
+@admin.register(ProductDailySales)
+class ProductDailySalesAdmin(admin.ModelAdmin):
+    list_display = ('product', 'store', 'day', 'units', 'revenue', 'orders')
+    list_filter = ('day',)
+    raw_id_fields = ('product', 'store')
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.10 on 2026-10-17 00:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Initial migration for the daily store and product sales rollups."""
+
+    initial = True
+
+    dependencies = [
+        ('product', '0005_product_stock'),
+        ('store', '0005_store_category_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(
+                    decimal_places=2, default=0, max_digits=14)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='daily_sales',
+                    to='product.product',
+                )),
+                ('store', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='+',
+                    to='store.store',
+                )),
+            ],
+            options={
+                'ordering': ['day'],
+                'indexes': [
+                    models.Index(
+                        fields=['store', 'day'],
+                        name='productsales_store_day_idx',
+                    ),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('product', 'day'),
+                        name='productsales_product_day_uniq',
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='StoreDailySales',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(
+                    decimal_places=2, default=0, max_digits=14)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('store', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='daily_sales',
+                    to='store.store',
+                )),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('store', 'day'),
+                        name='storesales_store_day_uniq',
+                    ),
+                ],
+            },
+        ),
+    ]
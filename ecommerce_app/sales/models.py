@@ -0,0 +1,86 @@
+'''Daily sales rollups.
+Includes fields:
+- store or product, and the day the orders were placed (local date)
+- units sold, revenue and number of orders
+
+Checkout adds each order to its rows in the same transaction, so the
+vendor dashboard reads a handful of rows per day instead of scanning the
+order history. ``rebuild_sales_rollups`` backfills and reconciles them.
+'''
+
+from django.db import models
+from product.models import Product
+from store.models import Store
+
+
+class StoreDailySales(models.Model):
+    """Sales of one store on one day"""
+    store = models.ForeignKey(
+        Store,
+        on_delete=models.CASCADE,
+        related_name='daily_sales'
+    )
+    day = models.DateField()
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    orders = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        """Return a readable label for the rollup row.
+
+        :return: Human-readable label.
+        """
+        return f'Store {self.store_id} on {self.day}'
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['store', 'day'], name='storesales_store_day_uniq'
+            ),
+        ]
+
+
+class ProductDailySales(models.Model):
+    """Sales of one product on one day"""
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='daily_sales'
+    )
+    # Copied from the product so a vendor's rows are found without a join
+    store = models.ForeignKey(
+        Store,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    day = models.DateField()
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    orders = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        """Return a readable label for the rollup row.
+
+        :return: Human-readable label.
+        """
+        return f'Product {self.product_id} on {self.day}'
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'day'],
+                name='productsales_product_day_uniq',
+            ),
+        ]
+        indexes = [
+            # Dashboard: top products of a vendor's stores over a window
+            models.Index(
+                fields=['store', 'day'], name='productsales_store_day_idx'
+            ),
+        ]
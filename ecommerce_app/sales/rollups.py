@@ -0,0 +1,276 @@
+'''Keep the daily sales rollups up to date.
+Includes:
+- Adding a placed order to its store and product rows
+- Moving an order in or out of them when its status changes
+- Recomputing the rows of some or all days from the order history
+'''
+
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.db.models import (
+    Count, DecimalField, F, Max, Min, OuterRef, Subquery, Sum
+)
+from django.utils import timezone
+
+from cart.models import Order, OrderItem
+from .models import ProductDailySales, StoreDailySales
+
+ROLLUP_FIELDS = ('units', 'revenue', 'orders')
+# Only orders with this status are counted
+COUNTED_STATUS = 'completed'
+
+LINE_REVENUE = Sum(
+    F('quantity') * F('price'),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+def _order_totals(order, group_by, outer):
+    """Sum an order's items per store or product, for use in an UPDATE.
+
+    :param order: Saved Order.
+    :param group_by: OrderItem field to group by, e.g. ``product``.
+    :param outer: Rollup field the group must match.
+    :return: Tuple (units subquery, revenue subquery).
+    """
+    items = (
+        OrderItem.objects.filter(order=order, **{group_by: OuterRef(outer)})
+        .order_by()
+        .values(group_by)
+    )
+    return (
+        Subquery(items.annotate(total=Sum('quantity')).values('total')),
+        Subquery(items.annotate(total=LINE_REVENUE).values('total')),
+    )
+
+
+def _insert_missing(order, day):
+    """Create the empty rollup rows an order adds to, skipping existing.
+
+    :param order: Saved Order whose items are written.
+    :param day: Day of the order.
+    """
+    pairs = set(
+        OrderItem.objects.filter(order=order)
+        .values_list('product', 'product__store')
+    )
+    StoreDailySales.objects.bulk_create(
+        [
+            StoreDailySales(store_id=store_id, day=day)
+            for store_id in {store_id for _, store_id in pairs}
+        ],
+        ignore_conflicts=True,
+    )
+    ProductDailySales.objects.bulk_create(
+        [
+            ProductDailySales(product_id=product_id, store_id=store_id,
+                              day=day)
+            for product_id, store_id in pairs
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _change_totals(order, day, sign):
+    """Add an order's items to its rollup rows, or take them away.
+
+    Rows left without orders after taking an order away are deleted, as
+    the rebuild would.
+
+    :param order: Saved Order whose items are written.
+    :param day: Day of the order.
+    :param sign: 1 to add the order, -1 to take it away.
+    """
+    items = OrderItem.objects.filter(order=order).order_by()
+    for model, key, group_by in (
+        (StoreDailySales, 'store', 'product__store'),
+        (ProductDailySales, 'product', 'product'),
+    ):
+        units, revenue = _order_totals(order, group_by, key)
+        rows = model.objects.filter(
+            **{f'{key}__in': items.values(group_by)}, day=day
+        )
+        if sign > 0:
+            rows.update(
+                units=F('units') + units,
+                revenue=F('revenue') + revenue,
+                orders=F('orders') + 1,
+            )
+        else:
+            rows.update(
+                units=F('units') - units,
+                revenue=F('revenue') - revenue,
+                orders=F('orders') - 1,
+            )
+            rows.filter(orders=0).delete()
+
+
+def record_order(order):
+    """Add a placed order to the rollups of its day.
+
+    The order's products are read once, missing rows are inserted empty
+    with ``bulk_create`` ignoring conflicts, then one UPDATE per table
+    adds the order's items, summed by correlated subqueries, to the
+    existing counters. Concurrent checkouts only ever increment, so none
+    of them is lost. Call it in the transaction that writes the order and
+    its items.
+
+    :param order: Saved Order whose items are written.
+    """
+    day = timezone.localdate(order.created_at)
+    _insert_missing(order, day)
+    _change_totals(order, day, 1)
+
+
+def record_status_change(order, previous):
+    """Move an order in or out of the rollups after its status changed.
+
+    Only completed orders are counted. When the previous status is not
+    known, the order's day is rebuilt instead.
+
+    :param order: Saved Order with its new status.
+    :param previous: Status the order had before, or None.
+    """
+    day = timezone.localdate(order.created_at)
+    if previous is None:
+        rebuild_rollups(day, day)
+        return
+    was_counted = previous == COUNTED_STATUS
+    if was_counted == (order.status == COUNTED_STATUS):
+        return
+    with transaction.atomic():
+        if was_counted:
+            _change_totals(order, day, -1)
+        else:
+            _insert_missing(order, day)
+            _change_totals(order, day, 1)
+
+
+def _day_bounds(day):
+    """Return the first moment of a local day and of the next one.
+
+    :param day: Date.
+    :return: Tuple of aware datetimes (start, end).
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _rebuild_day(model, key, items, day):
+    """Replace the rollup rows of one table and day with fresh totals.
+
+    :param model: StoreDailySales or ProductDailySales.
+    :param key: Rollup field identifying a row, ``store`` or ``product``.
+    :param items: That day's OrderItems grouped by ``key`` with totals.
+    :param day: Date being rebuilt.
+    :return: Number of rows inserted, changed or deleted.
+    """
+    current = {
+        getattr(row, f'{key}_id'): row
+        for row in model.objects.select_for_update().filter(day=day)
+    }
+    changed = []
+    for totals in items:
+        row = current.pop(totals[key], None)
+        fresh = tuple(totals[field] for field in ROLLUP_FIELDS)
+        if row is not None and fresh == tuple(
+            getattr(row, field) for field in ROLLUP_FIELDS
+        ):
+            continue
+        row = model(**{f'{key}_id': totals[key]}, day=day)
+        for field in ROLLUP_FIELDS:
+            setattr(row, field, totals[field])
+        if model is ProductDailySales:
+            row.store_id = totals['store']
+        changed.append(row)
+
+    if changed:
+        # MySQL upserts on any unique key and rejects an explicit target
+        unique_fields = None
+        if connection.features.supports_update_conflicts_with_target:
+            unique_fields = [key, 'day']
+        update_fields = list(ROLLUP_FIELDS)
+        if model is ProductDailySales:
+            update_fields.append('store')
+        model.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+    if current:
+        stale = [row.pk for row in current.values()]
+        model.objects.filter(pk__in=stale).delete()
+    return len(changed) + len(current)
+
+
+def _history_range():
+    """Find the first and last day that has orders or rollup rows.
+
+    :return: Tuple of dates (first, last), or None when there is nothing.
+    """
+    orders = Order.objects.aggregate(
+        first=Min('created_at'), last=Max('created_at')
+    )
+    days = [
+        timezone.localdate(moment)
+        for moment in (orders['first'], orders['last']) if moment
+    ]
+    for model in (StoreDailySales, ProductDailySales):
+        rows = model.objects.aggregate(first=Min('day'), last=Max('day'))
+        days.extend(day for day in rows.values() if day)
+    if not days:
+        return None
+    return min(days), max(days)
+
+
+def rebuild_rollups(first=None, last=None):
+    """Recompute the rollups from completed orders, fixing drift.
+
+    Every day is rebuilt in its own transaction. Its rollup rows are
+    locked first, so checkouts writing to them wait for the day to
+    commit and are then added on top of the rebuilt totals.
+
+    :param first: First day to rebuild, the oldest order's day when None.
+    :param last: Last day to rebuild, the newest order's day when None.
+    :return: Tuple (days checked, rows corrected).
+    """
+    if first is None or last is None:
+        history = _history_range()
+        if history is None:
+            return 0, 0
+        first = first or history[0]
+        last = last or history[1]
+
+    days = fixed = 0
+    day = first
+    while day <= last:
+        start, end = _day_bounds(day)
+        items = OrderItem.objects.filter(
+            order__status=COUNTED_STATUS,
+            order__created_at__gte=start,
+            order__created_at__lt=end,
+        ).order_by()
+        with transaction.atomic():
+            fixed += _rebuild_day(
+                StoreDailySales, 'store',
+                items.values(store=F('product__store')).annotate(
+                    units=Sum('quantity'),
+                    revenue=LINE_REVENUE,
+                    orders=Count('order', distinct=True),
+                ),
+                day,
+            )
+            fixed += _rebuild_day(
+                ProductDailySales, 'product',
+                items.values('product', store=F('product__store')).annotate(
+                    units=Sum('quantity'),
+                    revenue=LINE_REVENUE,
+                    orders=Count('order', distinct=True),
+                ),
+                day,
+            )
+        days += 1
+        day += timedelta(days=1)
+    return days, fixed
@@ -0,0 +1,12 @@
+'''URL patterns for sales app
+Including:
+- Vendor sales dashboard
+- JSON sales report
+'''
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('sales/', views.sales_dashboard, name='sales_dashboard'),
+    path('get/sales', views.view_sales),
+]
@@ -0,0 +1,135 @@
+'''Sales views
+Includes:
+- Vendor sales dashboard (daily sales per store, top products)
+- JSON sales report for the signed-in vendor
+
+Both read only the daily rollups, never the order history. Rollups of
+deleted stores and products stay until the purge removes them, but are
+left out of the reports.
+'''
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db.models import Sum
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+
+from .models import ProductDailySales, StoreDailySales
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+TOP_PRODUCTS = 10
+
+
+def _parse_days(raw_value):
+    """Read the length of the report window, clamped to a sane range.
+
+    :param raw_value: Raw ``days`` value from the query string.
+    :return: Number of days to report on.
+    """
+    try:
+        days = int(raw_value)
+    except (TypeError, ValueError):
+        return DEFAULT_DAYS
+    return max(1, min(days, MAX_DAYS))
+
+
+def _sales_report(vendor, days):
+    """Summarise a vendor's sales over the last few days from rollups.
+
+    :param vendor: Vendor whose stores to report on.
+    :param days: Length of the window, ending today.
+    :return: Dict with since, until, stores (totals and daily rows) and
+        top_products.
+    """
+    until = timezone.localdate()
+    since = until - timedelta(days=days - 1)
+    window = {
+        'store__vendor': vendor, 'store__deleted_at__isnull': True,
+        'day__gte': since, 'day__lte': until,
+    }
+
+    stores = OrderedDict()
+    rows = (
+        StoreDailySales.objects.filter(**window)
+        .values('store', 'store__store_name', 'day', 'units', 'revenue',
+                'orders')
+        .order_by('store__store_name', 'store', 'day')
+    )
+    for row in rows:
+        store = stores.setdefault(row['store'], {
+            'store': row['store'],
+            'store_name': row['store__store_name'],
+            'units': 0, 'revenue': 0, 'orders': 0, 'days': [],
+        })
+        for field in ('units', 'revenue', 'orders'):
+            store[field] += row[field]
+        store['days'].append({
+            'day': row['day'], 'units': row['units'],
+            'revenue': row['revenue'], 'orders': row['orders'],
+        })
+
+    top_products = (
+        ProductDailySales.objects.filter(
+            product__deleted_at__isnull=True, **window
+        )
+        .values('product', 'product__name')
+        .annotate(
+            units=Sum('units'), revenue=Sum('revenue'), orders=Sum('orders')
+        )
+        .order_by('-revenue', 'product')[:TOP_PRODUCTS]
+    )
+    return {
+        'since': since,
+        'until': until,
+        'stores': list(stores.values()),
+        'top_products': [
+            {
+                'product': row['product'], 'name': row['product__name'],
+                'units': row['units'], 'revenue': row['revenue'],
+                'orders': row['orders'],
+            }
+            for row in top_products
+        ],
+    }
+
+
+@login_required
+def sales_dashboard(request):
+    """Show the signed-in vendor's daily sales (vendors only).
+
+    :param request: Django HttpRequest.
+    :return: Rendered dashboard or redirect.
+    """
+    if request.user.user_type != 'vendor':
+        messages.error(request, 'Only vendors can view sales')
+        return redirect('store_list')
+    days = _parse_days(request.GET.get('days'))
+    report = _sales_report(request.user, days)
+    return render(request, 'sales/dashboard.html', {
+        'report': report,
+        'days': days,
+        'day_choices': (7, 30, 90, 365),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def view_sales(request):
+    """Return the signed-in vendor's daily sales in JSON format.
+
+    :param request: Django HttpRequest.
+    :return: JsonResponse with per-store daily sales and top products.
+    """
+    if request.user.user_type != 'vendor':
+        return JsonResponse(
+            {'error': 'Only vendors can view sales'},
+            status=status.HTTP_403_FORBIDDEN)
+    days = _parse_days(request.GET.get('days'))
+    return JsonResponse(_sales_report(request.user, days))
@@ -0,0 +1,211 @@
+'''Build, maintain and query the product search index.
+Includes:
+- Tokenising product, description and store text, with case, accents
+  and width folded
+- Indexing and un-indexing single products or whole stores
+- Ranked search over the posting table
+'''
+
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from ecommerce_app.pagination import (
+    KeysetPage, iter_keyset_chunks, paginate_keyset
+)
+from product.models import Product
+from .models import SearchPosting
+
+# Relative importance of a term depending on where it occurs
+NAME_WEIGHT = 10
+STORE_WEIGHT = 4
+DESCRIPTION_WEIGHT = 1
+# Long descriptions should not outrank a match in the name
+MAX_DESCRIPTION_FREQUENCY = 5
+MAX_QUERY_TERMS = 8
+MAX_TERM_LENGTH = 64
+REINDEX_CHUNK_SIZE = 1000
+
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'the', 'this', 'to', 'with',
+})
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def fold(text):
+    """Fold case, accents and character width out of text.
+
+    MySQL compares terms with an accent- and case-insensitive collation,
+    so terms Python keeps apart, like ``resume`` and ``Résumé``, would
+    collide in the (term, product) primary key. Folding them first makes
+    Python and the database agree on what is the same term.
+
+    :param text: Text to fold.
+    :return: Folded text.
+    """
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return unicodedata.normalize('NFKC', ''.join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ))
+
+
+def tokenize(text):
+    """Split text into normalised search terms.
+
+    :param text: Free text to tokenise.
+    :return: List of folded terms, stop words removed.
+    """
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall(fold(text or ''))
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def product_terms(product):
+    """Compute the weighted terms of a product.
+
+    :param product: Product instance with its store available.
+    :return: Dict mapping term to weight.
+    """
+    weights = Counter()
+    for term in tokenize(product.name):
+        weights[term] += NAME_WEIGHT
+    for term in tokenize(product.store.store_name):
+        weights[term] += STORE_WEIGHT
+    description = Counter(tokenize(product.description))
+    for term, count in description.items():
+        weights[term] += (
+            DESCRIPTION_WEIGHT * min(count, MAX_DESCRIPTION_FREQUENCY)
+        )
+    return weights
+
+
+def index_products(products):
+    """Replace the postings of the given products.
+
+    :param products: Iterable of Product instances with stores loaded.
+    :return: Number of postings written.
+    """
+    products = list(products)
+    if not products:
+        return 0
+    postings = [
+        SearchPosting(term=term, product_id=product.prod_id, weight=weight)
+        for product in products
+        for term, weight in product_terms(product).items()
+    ]
+    with transaction.atomic():
+        unindex_products(product.prod_id for product in products)
+        SearchPosting.objects.bulk_create(postings, batch_size=1000)
+    return len(postings)
+
+
+def index_product(product):
+    """Replace the postings of a single product.
+
+    :param product: Product instance.
+    :return: Number of postings written.
+    """
+    return index_products([product])
+
+
+def unindex_products(product_ids):
+    """Remove all postings of the given products.
+
+    :param product_ids: Iterable of product primary keys.
+    :return: None.
+    """
+    SearchPosting.objects.filter(product_id__in=list(product_ids)).delete()
+
+
+def reindex_queryset(queryset, chunk_size=REINDEX_CHUNK_SIZE):
+    """Reindex every product of a queryset in primary-key chunks.
+
+    :param queryset: Product queryset to reindex.
+    :param chunk_size: Number of products per chunk.
+    :return: Number of products indexed.
+    """
+    total = 0
+    chunks = iter_keyset_chunks(
+        queryset.select_related('store'), ('prod_id',), chunk_size
+    )
+    for chunk in chunks:
+        index_products(chunk)
+        total += len(chunk)
+    return total
+
+
+def reindex_store(store):
+    """Reindex all products of a store, e.g. after it was renamed.
+
+    :param store: Store instance.
+    :return: Number of products indexed.
+    """
+    return reindex_queryset(Product.objects.filter(store=store))
+
+
+def _search_term(term, cursor, limit):
+    """Page through the products matching a single term.
+
+    The score is the posting's weight, so the page is read straight off
+    the (term, weight, product) index with the keyset cursor, without
+    scoring every match first.
+
+    :param term: Folded search term.
+    :param cursor: Cursor of the previous result page.
+    :param limit: Number of results per page.
+    :return: KeysetPage of products annotated with ``score``.
+    :raises InvalidCursor: If the cursor is malformed.
+    """
+    postings = SearchPosting.objects.filter(
+        term=term, product__deleted_at__isnull=True
+    ).select_related('product__store')
+    page = paginate_keyset(
+        postings, ('-weight', 'product_id'), cursor=cursor, limit=limit
+    )
+    products = []
+    for posting in page:
+        posting.product.score = posting.weight
+        products.append(posting.product)
+    return KeysetPage(products, page.next_cursor)
+
+
+def search_products(query, cursor=None, limit=20):
+    """Run a ranked search over the catalog.
+
+    All query terms must match. Results are ordered by the summed term
+    weights, best first, and paginated with the usual keyset cursor.
+    A single term is paged straight off the index; several terms are
+    scored together, since a product's score is only known once all its
+    postings are summed.
+
+    :param query: Raw search string.
+    :param cursor: Cursor of the previous result page.
+    :param limit: Number of results per page.
+    :return: KeysetPage of products annotated with ``score``.
+    :raises InvalidCursor: If the cursor is malformed.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return paginate_keyset(Product.objects.none(), ('prod_id',))
+    if len(terms) == 1:
+        return _search_term(terms[0], cursor, limit)
+    products = (
+        Product.objects
+        .filter(search_postings__term__in=terms)
+        .annotate(
+            score=Sum('search_postings__weight'),
+            matched=Count('search_postings__term'),
+        )
+        .filter(matched=len(terms))
+        .select_related('store')
+    )
+    return paginate_keyset(
+        products, ('-score', 'prod_id'), cursor=cursor, limit=limit
+    )
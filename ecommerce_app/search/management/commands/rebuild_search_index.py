@@ -0,0 +1,36 @@
+'''Management command to rebuild the product search index.
+
+Signals keep the index current for single saves and deletes; run this
+after bulk imports or raw SQL changes that bypass them.
+'''
+
+from django.core.management.base import BaseCommand
+
+from product.models import Product
+from search.index import REINDEX_CHUNK_SIZE, reindex_queryset
+from search.models import SearchPosting
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index from scratch.'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        :param parser: Argument parser for the command.
+        """
+        parser.add_argument(
+            '--chunk-size', type=int, default=REINDEX_CHUNK_SIZE,
+            help='Number of products indexed per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        """Drop every posting and index all products again.
+
+        :return: None.
+        """
+        SearchPosting.objects.all().delete()
+        total = reindex_queryset(
+            Product.objects.all(), chunk_size=options['chunk_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} products.'))
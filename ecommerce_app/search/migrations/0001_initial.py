@@ -0,0 +1,58 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_index(apps, schema_editor):
+    """Index the products that existed before the search app.
+
+    :param apps: Historical app registry.
+    :param schema_editor: Schema editor in use.
+    """
+    from search.index import product_terms
+
+    Product = apps.get_model('product', 'Product')
+    SearchPosting = apps.get_model('search', 'SearchPosting')
+    postings = []
+    for product in Product.objects.select_related('store').iterator():
+        postings.extend(
+            SearchPosting(term=term, product_id=product.pk, weight=weight)
+            for term, weight in product_terms(product).items()
+        )
+        if len(postings) >= 5000:
+            SearchPosting.objects.bulk_create(postings)
+            postings = []
+    SearchPosting.objects.bulk_create(postings)
+
+
+class Migration(migrations.Migration):
+    """Initial migration for the product search index."""
+
+    initial = True
+
+    dependencies = [
+        ('product', '0001_initial'),
+        ('store', '0003_store_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('pk', models.CompositePrimaryKey(
+                    'term', 'product', blank=True, editable=False,
+                    primary_key=True, serialize=False,
+                )),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField()),
+                ('product', models.ForeignKey(
+                    db_constraint=False,
+                    on_delete=django.db.models.deletion.DO_NOTHING,
+                    related_name='search_postings',
+                    to='product.product',
+                )),
+            ],
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
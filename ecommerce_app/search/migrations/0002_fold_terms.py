@@ -0,0 +1,45 @@
+# Generated by Django 5.2.10 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+def refold_index(apps, schema_editor):
+    """Rebuild the postings with case and accents folded out of terms.
+
+    :param apps: Historical app registry.
+    :param schema_editor: Schema editor in use.
+    """
+    from search.index import product_terms
+
+    Product = apps.get_model('product', 'Product')
+    SearchPosting = apps.get_model('search', 'SearchPosting')
+    SearchPosting.objects.all().delete()
+    postings = []
+    for product in Product.objects.select_related('store').iterator():
+        postings.extend(
+            SearchPosting(term=term, product_id=product.pk, weight=weight)
+            for term, weight in product_terms(product).items()
+        )
+        if len(postings) >= 5000:
+            SearchPosting.objects.bulk_create(postings)
+            postings = []
+    SearchPosting.objects.bulk_create(postings)
+
+
+class Migration(migrations.Migration):
+    """Fold search terms and index postings by term and weight."""
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(refold_index, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='searchposting',
+            index=models.Index(
+                fields=['term', '-weight', 'product'],
+                name='search_term_weight_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+'''Inverted index for product search.
+Includes fields:
+- term: CharField (max_length=64), search token with case and accents
+  folded, so MySQL's insensitive collation sees the same terms as Python
+- product: ForeignKey to Product model
+- weight: PositiveIntegerField, field-weighted term frequency
+
+The primary key is (term, product), so all postings of a term are
+stored next to each other and a lookup is a single clustered range scan.
+'''
+
+from django.db import models
+from product.models import Product
+
+
+class SearchPosting(models.Model):
+    pk = models.CompositePrimaryKey('term', 'product')
+    term = models.CharField(max_length=64)
+    # Postings are removed by the product post_delete hook, so the
+    # collector never has to load them when a product is deleted.
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='search_postings'
+    )
+    weight = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f'{self.term} -> {self.product_id} ({self.weight})'
+
+    class Meta:
+        indexes = [
+            # One-term searches, best match first, paged by keyset
+            models.Index(
+                fields=['term', '-weight', 'product'],
+                name='search_term_weight_idx',
+            ),
+        ]
@@ -0,0 +1,13 @@
+'''URL patterns for search app
+Including:
+- URL pattern for the search results page
+- URL pattern for search results in JSON format
+'''
+
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('search/', views.search, name='search'),
+    path('get/search', views.view_search),
+]
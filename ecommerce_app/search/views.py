@@ -0,0 +1,63 @@
+''' module for search views
+Includes:
+- Ranked product search page
+- Ranked product search in JSON format
+'''
+from django.shortcuts import render, redirect
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.http import urlencode
+from rest_framework.decorators import api_view
+from rest_framework import status
+from ecommerce_app.pagination import (
+    InvalidCursor, get_page_size, next_page_url, set_page_headers
+)
+from product.models import ProductSerializer
+from .index import search_products
+
+
+def search(request):
+    """Render ranked search results for the ``q`` parameter.
+
+    :param request: Django HttpRequest.
+    :return: Rendered search results page.
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        page = search_products(
+            query,
+            cursor=request.GET.get('cursor'),
+            limit=settings.PRODUCT_PAGE_SIZE,
+        )
+    except InvalidCursor:
+        return redirect(f"{request.path}?{urlencode({'q': query})}")
+    return render(request, 'search/search_results.html', {
+        'query': query,
+        'products': page.items,
+        'next_url': next_page_url(request, page),
+    })
+
+
+@api_view(['GET'])
+def view_search(request):
+    """Return ranked search results in JSON format.
+
+    :param request: Django HttpRequest.
+    :return: JsonResponse with matching products and their scores.
+    """
+    try:
+        page = search_products(
+            request.GET.get('q', ''),
+            cursor=request.GET.get('cursor'),
+            limit=get_page_size(
+                request, settings.API_PAGE_SIZE, settings.API_MAX_PAGE_SIZE
+            ),
+        )
+    except InvalidCursor as exc:
+        return JsonResponse(
+            {'cursor': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+    data = ProductSerializer(page.items, many=True).data
+    for item, product in zip(data, page.items):
+        item['score'] = product.score
+    response = JsonResponse(data=data, safe=False)
+    return set_page_headers(response, request, page)
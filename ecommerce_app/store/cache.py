@@ -0,0 +1,6 @@
+'''Cached primary-key lookups of stores.'''
+
+from ecommerce_app.object_cache import ObjectCache
+from .models import Store
+
+store_cache = ObjectCache(Store, 'store')
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Add modification timestamp to store model."""
+
+    dependencies = [
+        ('store', '0003_store_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='store',
+            name='updated_at',
+            field=models.DateTimeField(
+                auto_now=True, db_index=True,
+                default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-16 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Index stores by category for category browsing."""
+
+    dependencies = [
+        ('store', '0004_store_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='store',
+            index=models.Index(
+                fields=['store_category'], name='store_category_idx'),
+        ),
+    ]
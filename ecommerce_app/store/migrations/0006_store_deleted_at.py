@@ -0,0 +1,20 @@
+# Generated by Django 5.2.10 on 2026-10-17 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Add the soft-delete timestamp to stores."""
+
+    dependencies = [
+        ('store', '0005_store_category_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='store',
+            name='deleted_at',
+            field=models.DateTimeField(
+                blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -3,6 +3,9 @@ Includes fields:
 - store_id: AutoField (Primary Key)
 - store_name: CharField (max_length=100)
 - store_category: drop-down selection (max_length=50)
+- updated_at: DateTimeField (auto_now=True), drives API ETags
+- deleted_at: DateTimeField, set when the vendor deletes the store; the
+  row is removed later by ``purge_deleted``
 '''
 
 from django.db import models
@@ -10,6 +13,13 @@ from django.conf import settings
 from rest_framework import serializers
 
 
+class LiveStoreManager(models.Manager):
+    """Stores that have not been deleted."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Store(models.Model):
     STORE_CATEGORIES = [
         ('electronics', 'Electronics'),
@@ -33,6 +43,21 @@ class Store(models.Model):
         related_name='stores',
         limit_choices_to={'user_type': 'vendor'}
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    deleted_at = models.DateTimeField(
+        null=True, blank=True, editable=False, db_index=True
+    )
+
+    objects = LiveStoreManager()
+    # Includes deleted stores waiting to be purged
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['store_category'], name='store_category_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.store_name
@@ -47,6 +72,6 @@ class StoreSerializer(serializers.ModelSerializer):
         model = Store
         fields = [
             'store_id', 'store_name', 'store_description', 'store_category',
-            'vendor', 'vendor_username'
+            'vendor', 'vendor_username', 'updated_at'
         ]
         read_only_fields = ['vendor_username']
@@ -1,11 +1,43 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
+from .cache import store_cache
 from .models import Store
+from ecommerce_app.conditional import STORES, bump_collections
 from ecommerce_app.integrations.x_client import tweet_new_store
+from search.index import reindex_store
 
 
 @receiver(post_save, sender=Store)
 def store_created_tweet(sender, instance, created, **kwargs):
     if created:
         tweet_new_store(instance)
+
+
+@receiver(pre_save, sender=Store)
+def store_remember_name(sender, instance, **kwargs):
+    # Store names are part of every product's search terms
+    instance._previous_store_name = (
+        Store.objects.filter(pk=instance.pk)
+        .values_list('store_name', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Store)
+def store_search_reindex(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_store_name', None)
+    if not created and previous != instance.store_name:
+        reindex_store(instance)
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def store_cache_invalidate(sender, instance, **kwargs):
+    store_cache.invalidate(instance.store_id)
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+def store_collection_changed(sender, instance, **kwargs):
+    bump_collections(STORES)
@@ -1,18 +1,30 @@
 ''' module to define store views
 Includes:
-- List all stores
-- Store detail view
+- List stores with product counts and ratings, one keyset page at a time
+- Store detail view with a sorted, keyset-paginated product grid
 - Create new store
 - Update existing store
-- Delete store
+- Delete store, hiding it at once and leaving the rows to the purge
 '''
 
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from .cache import store_cache
 from .models import Store, StoreSerializer
 from .forms import StoreForm
 from django.http import JsonResponse
+from django.urls import reverse
+from ecommerce_app.conditional import STORES, conditional_collection
+from ecommerce_app.pagination import (
+    InvalidCursor, get_page_size, next_page_url, paginate_keyset,
+    set_page_headers
+)
+from ecommerce_app.streaming import stream_export
 from rest_framework.decorators import (
     api_view, renderer_classes, authentication_classes, permission_classes
 )
@@ -23,25 +35,108 @@ from rest_framework.authentication import BasicAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 
+def _store_page(request, page_size):
+    """Fetch one keyset page of stores with their catalog stats.
+
+    Product counts and review totals are summed in the same query from
+    the aggregates kept on each product, never from the reviews.
+
+    :param request: Django request carrying an optional cursor.
+    :param page_size: Number of stores per page.
+    :return: KeysetPage of stores with ``product_count``,
+        ``review_count`` and ``avg_rating`` set.
+    :raises InvalidCursor: If the cursor is malformed.
+    """
+    live = Q(products__deleted_at__isnull=True)
+    stores = Store.objects.annotate(
+        product_count=Count('products', filter=live),
+        review_count=Sum('products__review_count', filter=live),
+        rating_total=Sum('products__rating_total', filter=live),
+    )
+    page = paginate_keyset(
+        stores, ('store_id',),
+        cursor=request.GET.get('cursor'),
+        limit=page_size,
+    )
+    for store in page:
+        store.review_count = store.review_count or 0
+        store.avg_rating = (
+            (Decimal(store.rating_total) / store.review_count).quantize(
+                Decimal('0.01'), ROUND_HALF_UP)
+            if store.review_count else None
+        )
+    return page
+
+
+def _store_products_page(request, store_id, filters, page_size):
+    """Fetch one keyset page of a store's products, filtered and sorted.
+
+    :param request: Django or DRF request carrying an optional cursor.
+    :param store_id: Store identifier.
+    :param filters: Validated ProductFilterForm.
+    :param page_size: Number of products per page.
+    :return: KeysetPage of products.
+    :raises InvalidCursor: If the cursor is malformed.
+    """
+    from product.models import Product
+
+    products = filters.filter(Product.objects.filter(store_id=store_id))
+    return paginate_keyset(
+        products, filters.ordering,
+        cursor=request.GET.get('cursor'),
+        limit=page_size,
+    )
+
+
 def store_list(request):
-    """List all stores.
+    """List stores one keyset page at a time, with catalog stats.
 
     :param request: Django HttpRequest.
     :return: Rendered store list page.
     """
-    stores = Store.objects.all()
-    return render(request, 'store/store_list.html', {'stores': stores})
+    try:
+        page = _store_page(request, settings.STORE_PAGE_SIZE)
+    except InvalidCursor:
+        return redirect('store_list')
+    return render(request, 'store/store_list.html', {
+        'stores': page.items,
+        'next_url': next_page_url(request, page),
+        'first_url': reverse('store_list'),
+        'is_first_page': not request.GET.get('cursor'),
+    })
 
 
 def store_detail(request, store_id):
-    """Display details for a single store.
+    """Display a store with one sorted page of its products.
+
+    Invalid filter values are ignored, as on the product list.
 
     :param request: Django HttpRequest.
     :param store_id: Store identifier.
     :return: Rendered store detail page.
     """
-    store = get_object_or_404(Store, pk=store_id)
-    return render(request, 'store/store_detail.html', {'store': store})
+    from product.forms import ProductFilterForm
+
+    store = store_cache.get_or_404(store_id)
+    filters = ProductFilterForm(request.GET)
+    filters.is_valid()
+    try:
+        page = _store_products_page(
+            request, store.store_id, filters, settings.PRODUCT_PAGE_SIZE
+        )
+    except InvalidCursor:
+        return redirect('store_detail', store_id=store_id)
+    first_url = reverse('store_detail', args=[store_id])
+    if filters.cleaned_data.get('sort'):
+        first_url += f'?sort={filters.cleaned_data["sort"]}'
+    return render(request, 'store/store_detail.html', {
+        'store': store,
+        'products': page.items,
+        'filters': filters,
+        'next_url': next_page_url(request, page),
+        'first_url': first_url,
+        'is_first_page': not request.GET.get('cursor'),
+    })
 
 
 @login_required
@@ -108,6 +203,9 @@ def store_update(request, store_id):
 def store_delete(request, store_id):
     """Delete a store (vendors only).
 
+    The store and its products are hidden straight away;
+    ``purge_deleted`` removes them and their reviews and orders later.
+
     :param request: Django HttpRequest.
     :param store_id: Store identifier.
     :return: Rendered confirmation or redirect.
@@ -120,8 +218,10 @@ def store_delete(request, store_id):
         return redirect('store_detail', store_id=store_id)
 
     if request.method == 'POST':
+        from product.deletion import soft_delete_store
+
         store_name = store.store_name
-        store.delete()
+        soft_delete_store(store)
         messages.success(
             request, f'Store "{store_name}" deleted successfully!'
         )
@@ -130,27 +230,68 @@ def store_delete(request, store_id):
     return render(request, 'store/store_confirm_delete.html', {'store': store})
 
 
+def _api_store_page(request):
+    """Fetch the page of stores requested by an API client.
+
+    :param request: DRF request with optional ``cursor`` and ``limit``.
+    :return: KeysetPage of stores.
+    :raises InvalidCursor: If the cursor is malformed.
+    """
+    page_size = get_page_size(
+        request, settings.API_PAGE_SIZE, settings.API_MAX_PAGE_SIZE
+    )
+    return paginate_keyset(
+        Store.objects.select_related('vendor'), ('store_id',),
+        cursor=request.GET.get('cursor'),
+        limit=page_size,
+    )
+
+
+@conditional_collection(STORES)
 @api_view(['GET'])
 def view_stores(request):
-    """Return all stores in JSON format.
+    """Return one page of stores in JSON format.
+
+    The next page is advertised in the ``Link`` and ``X-Next-Cursor``
+    response headers. ``?stream=json`` or ``?stream=ndjson`` streams
+    every store in chunks instead.
 
     :param request: Django HttpRequest.
-    :return: JsonResponse with stores.
+    :return: JsonResponse or StreamingHttpResponse with stores.
     """
-    serializer = StoreSerializer(Store.objects.all(), many=True)
-    return JsonResponse(data=serializer.data, safe=False)
+    stores = Store.objects.select_related('vendor')
+    streamed = stream_export(request, stores, StoreSerializer, ('store_id',))
+    if streamed is not None:
+        return streamed
+    try:
+        page = _api_store_page(request)
+    except InvalidCursor as exc:
+        return JsonResponse(
+            {'cursor': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = StoreSerializer(page.items, many=True)
+    response = JsonResponse(data=serializer.data, safe=False)
+    return set_page_headers(response, request, page)
 
 
+@conditional_collection(STORES)
 @api_view(['GET'])
 @renderer_classes([XMLRenderer])
 def view_stores_xml(request):
-    """Return all stores in XML format.
+    """Return one page of stores in XML format.
+
+    Paged like :func:`view_stores`.
 
     :param request: Django HttpRequest.
     :return: DRF Response with stores in XML.
     """
-    serializer = StoreSerializer(Store.objects.all(), many=True)
-    return Response(data=serializer.data)
+    try:
+        page = _api_store_page(request)
+    except InvalidCursor as exc:
+        return Response(
+            {'cursor': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = StoreSerializer(page.items, many=True)
+    response = Response(data=serializer.data)
+    return set_page_headers(response, request, page)
 
 
 @api_view(['POST'])
@@ -176,28 +317,62 @@ def add_store(request):
         status=status.HTTP_403_FORBIDDEN)
 
 
+@conditional_collection(STORES)
 @api_view(['GET'])
 def view_stores_by_vendor(request, vendor_id):
-    """Return all stores for a specific vendor.
+    """Return one page of a vendor's stores.
+
+    Pages are ``limit`` stores long and ordered by ``store_id``; the next
+    page is advertised in the ``Link`` and ``X-Next-Cursor`` headers.
 
     :param request: Django HttpRequest.
     :param vendor_id: Vendor identifier.
     :return: JsonResponse with stores.
     """
-    stores = Store.objects.filter(vendor_id=vendor_id)
-    serializer = StoreSerializer(stores, many=True)
-    return JsonResponse(data=serializer.data, safe=False)
+    stores = Store.objects.filter(vendor_id=vendor_id).select_related('vendor')
+    page_size = get_page_size(
+        request, settings.API_PAGE_SIZE, settings.API_MAX_PAGE_SIZE
+    )
+    try:
+        page = paginate_keyset(
+            stores, ('store_id',),
+            cursor=request.GET.get('cursor'),
+            limit=page_size,
+        )
+    except InvalidCursor as exc:
+        return JsonResponse(
+            {'cursor': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = StoreSerializer(page.items, many=True)
+    response = JsonResponse(data=serializer.data, safe=False)
+    return set_page_headers(response, request, page)
 
 
 @api_view(['GET'])
 def view_products_by_store(request, store_id):
-    """Return all products for a specific store.
+    """Return one page of a store's products.
+
+    Accepts the ``min_price``, ``max_price`` and ``sort`` filters of the
+    products API, plus ``limit`` and ``cursor`` like every list API.
 
     :param request: Django HttpRequest.
     :param store_id: Store identifier.
     :return: JsonResponse with products.
     """
-    from product.models import Product, ProductSerializer
-    products = Product.objects.filter(store_id=store_id)
-    serializer = ProductSerializer(products, many=True)
-    return JsonResponse(data=serializer.data, safe=False)
+    from product.forms import ProductFilterForm
+    from product.models import ProductSerializer
+
+    filters = ProductFilterForm(request.GET)
+    if not filters.is_valid():
+        return JsonResponse(
+            filters.errors, status=status.HTTP_400_BAD_REQUEST)
+    page_size = get_page_size(
+        request, settings.API_PAGE_SIZE, settings.API_MAX_PAGE_SIZE
+    )
+    try:
+        page = _store_products_page(request, store_id, filters, page_size)
+    except InvalidCursor as exc:
+        return JsonResponse(
+            {'cursor': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = ProductSerializer(page.items, many=True)
+    response = JsonResponse(data=serializer.data, safe=False)
+    return set_page_headers(response, request, page)
@@ -12,8 +12,7 @@ from django.contrib import messages
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
-from django.conf import settings
+from outbox.mail import queue_mail
 from django.http import JsonResponse
 from rest_framework.decorators import (
     api_view, renderer_classes, authentication_classes, permission_classes
@@ -129,13 +128,8 @@ Best regards,
 eCommerce Team
 '''
 
-            send_mail(
-                subject=email_subject,
-                message=email_body,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                fail_silently=False,
-            )
+            # Delivered by the send_outbox worker
+            queue_mail(email_subject, email_body, [email])
 
             messages.success(
                 request,